@@ -2,36 +2,105 @@
 
 import logging
 from functools import partial
+from typing import Optional, Set
 
 from homeassistant.config_entries import ConfigEntry, ConfigType
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE, Platform
+from homeassistant.core import Event, HomeAssistant, SupportsResponse, callback
+from homeassistant.helpers import device_registry as dr
 
 from . import services
-from .client import Hp1820Client
+from .backend import Hp1820Backend
+from .client import Hp1820Client, create_session
 from .const import (
+    BACKEND_HTTP,
+    BACKEND_SNMP,
+    CONF_ADAPTIVE_POLLING,
+    CONF_BACKEND,
     CONF_SCAN_INTERVAL,
+    CONF_SCAN_INTERVAL_MAX,
+    CONF_SCAN_INTERVAL_MIN,
+    CONF_SNMP_COMMUNITY,
+    CONF_STALE_MAX_AGE,
+    CONF_SYSLOG_PORT,
     CONF_SYSTEM_IP,
+    CONF_VERIFY_WRITES,
     DOMAIN,
     KEY_COORDINATOR,
     KEY_DEVICE,
+    KEY_ENTRY_DATA,
+    KEY_HTTP_SESSION,
+    KEY_OPTIONS,
+    KEY_SCHEDULER,
+    KEY_SNAPSHOTS,
+    KEY_STORE,
+    KEY_SYSLOG,
     KEY_UNSUBSCRIBER,
+    OPTIONS_DEFAULTS,
+    OPTIONS_RELOAD,
     SCAN_INTERVAL_DEFAULT,
+    SCAN_INTERVAL_MAX_DEFAULT,
+    SCAN_INTERVAL_MIN_DEFAULT,
+    SNMP_COMMUNITY_DEFAULT,
+    STALE_MAX_AGE_DEFAULT,
+    SYSLOG_PORT_DEFAULT,
+    VERIFY_DELAY,
 )
-from .coordinator import Hp1820Coordinator
+from .coordinator import AdaptiveInterval, Hp1820Coordinator
 from .devices import Hp1820Device
+from .helpers import device_info
+from .scheduler import Hp1820Scheduler
+from .snmp import Hp1820SnmpClient
+from .store import Hp1820SnapshotStore, Hp1820Store
+from .syslog import Hp1820SyslogListener
 
 _LOGGER = logging.getLogger(__name__)
-PLATFORMS = [Platform.SWITCH]
+PLATFORMS = [Platform.SENSOR, Platform.SWITCH]
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Initialize the Hp1820 integration.
 
-    This method exposes eventual YAML configuration options under the DOMAIN key.
+    This method exposes eventual YAML configuration options under the DOMAIN key,
+    and registers the services shared by all switches.
     """
     hass.data[DOMAIN] = config.get(DOMAIN, {})
+
+    # Services are registered once for all switches, each call selects its switch
+    hass.services.async_register(
+        DOMAIN, "update_state", partial(services.update_state, hass), schema=services.UPDATE_STATE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, "set_ports", partial(services.set_ports, hass), schema=services.SET_PORTS_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "apply_config",
+        partial(services.apply_config, hass),
+        schema=services.APPLY_CONFIG_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "power_cycle",
+        partial(services.power_cycle, hass),
+        schema=services.POWER_CYCLE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "save_snapshot",
+        partial(services.save_snapshot, hass),
+        schema=services.SAVE_SNAPSHOT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "restore_snapshot",
+        partial(services.restore_snapshot, hass),
+        schema=services.RESTORE_SNAPSHOT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
     return True
 
 
@@ -42,6 +111,9 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
     It uses a DataUpdateCoordinator to aggregate status updates from different entities
     into a single request. The method also registers a listener to track changes in the configuration options.
 
+    If ports of a previous run are cached, entities are created from the cache and the first
+    refresh runs in the background. Otherwise, the setup waits for the first refresh.
+
     Args:
         hass (HomeAssistant): The Home Assistant instance.
         config (ConfigEntry): The configuration entry containing the setup details for the device.
@@ -55,12 +127,80 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
 
     # Initialize Components
     scan_interval = config.options.get(CONF_SCAN_INTERVAL, SCAN_INTERVAL_DEFAULT)
-    session = async_get_clientsession(hass, verify_ssl=False)
+    # Each switch has its own HTTP session, so that their `SID` cookies are isolated
+    session = create_session()
     ip = config.data[CONF_SYSTEM_IP]
-    client = Hp1820Client(session, ip)
+    client: Hp1820Backend
+    if config.data.get(CONF_BACKEND, BACKEND_HTTP) == BACKEND_SNMP:
+        client = Hp1820SnmpClient(ip, config.data.get(CONF_SNMP_COMMUNITY, SNMP_COMMUNITY_DEFAULT))
+    else:
+        client = Hp1820Client(session, ip)
     device = Hp1820Device(config, client)
-    coordinator = Hp1820Coordinator(hass, device, scan_interval)
-    await coordinator.async_config_entry_first_refresh()
+    # Polls of all switches are spread over time by a scheduler shared across entries
+    scheduler = hass.data[DOMAIN].setdefault(KEY_SCHEDULER, Hp1820Scheduler())
+    # Snapshots are shared across entries, to restore them on a replaced switch
+    hass.data[DOMAIN].setdefault(KEY_SNAPSHOTS, Hp1820SnapshotStore(hass))
+    coordinator = Hp1820Coordinator(
+        hass,
+        device,
+        scan_interval,
+        _adaptive_interval(config),
+        scheduler,
+        _verify_delay(config),
+        config.options.get(CONF_STALE_MAX_AGE, STALE_MAX_AGE_DEFAULT),
+    )
+    scheduler.register(config.entry_id, coordinator)
+    store = Hp1820Store(hass, config.entry_id)
+    cached = await store.async_load()
+    try:
+        if cached:
+            _LOGGER.debug(f"async_setup_entry | Restoring {len(cached)} ports from cache")
+            device.restore(cached)
+            coordinator.data = dict(device.ports)
+        else:
+            await coordinator.async_config_entry_first_refresh()
+    except Exception:
+        scheduler.unregister(config.entry_id)
+        await session.close()
+        raise
+
+    async def close_session(event: Event):
+        await session.close()
+
+    # Entries are not unloaded when Home Assistant stops
+    config.async_on_unload(hass.bus.async_listen(EVENT_HOMEASSISTANT_CLOSE, close_session))
+
+    @callback
+    def save_ports():
+        # Only ports confirmed by the switch are cached
+        if coordinator.last_update_success and not device.restored and not device.stale:
+            store.async_save(dict(device.ports))
+
+    config.async_on_unload(coordinator.async_add_listener(save_ports))
+
+    @callback
+    def update_model(ports: Set[str]):
+        # The model changes when ports are added or removed, e.g. when the switch is replaced
+        registry = dr.async_get(hass)
+        entry = registry.async_get_device(identifiers={(DOMAIN, config.entry_id)})
+        model = device_info(config, device.model)["model"]
+        if entry is not None and entry.model != model:
+            _LOGGER.debug(f"update_model | Detected model {model} with {len(ports)} PoE ports")
+            registry.async_update_device(entry.id, model=model)
+
+    config.async_on_unload(coordinator.async_add_inventory_listener(update_model))
+
+    # Events sent by the switch trigger a refresh, so the scan interval can be a long safety net
+    syslog_port = config.options.get(CONF_SYSLOG_PORT, SYSLOG_PORT_DEFAULT)
+    if syslog_port:
+        listener = (
+            hass.data[DOMAIN]
+            .setdefault(KEY_SYSLOG, {})
+            .setdefault(syslog_port, Hp1820SyslogListener(hass, syslog_port))
+        )
+        unregister = await listener.async_register(ip, coordinator.async_request_event_refresh)
+        if unregister is not None:
+            config.async_on_unload(unregister)
 
     # Store a device instance to access the LAN service.
     # It includes a DataUpdateCoordinator shared across entities to get a full
@@ -68,16 +208,22 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
     hass.data[DOMAIN][config.entry_id] = {
         KEY_DEVICE: device,
         KEY_COORDINATOR: coordinator,
+        KEY_HTTP_SESSION: session,
+        KEY_STORE: store,
+        # Configuration in use, to tell what changed on update
+        KEY_ENTRY_DATA: dict(config.data),
+        KEY_OPTIONS: dict(config.options),
     }
 
     # Register a listener when option changes
     unsub = config.add_update_listener(options_update_listener)
     hass.data[DOMAIN][config.entry_id][KEY_UNSUBSCRIBER] = unsub
 
-    # Register services
-    hass.services.async_register(DOMAIN, "update_state", partial(services.update_state, hass, config.entry_id))
-
     await hass.config_entries.async_forward_entry_setups(config, PLATFORMS)
+
+    if cached:
+        # Restored ports are confirmed (or replaced) as soon as the switch answers
+        config.async_create_background_task(hass, coordinator.async_refresh(), f"{DOMAIN} first refresh")
     return True
 
 
@@ -87,11 +233,75 @@ async def async_unload_entry(hass: HomeAssistant, config: ConfigEntry):
     if unload_ok:
         # Call the options unsubscriber and remove the configuration
         hass.data[DOMAIN][config.entry_id][KEY_UNSUBSCRIBER]()
-        hass.data[DOMAIN].pop(config.entry_id)
+        data = hass.data[DOMAIN].pop(config.entry_id)
+        hass.data[DOMAIN][KEY_SCHEDULER].unregister(config.entry_id)
+        await data[KEY_COORDINATOR].async_shutdown()
+
+        # Release the session kept open with the switch, which may be unreachable
+        try:
+            await data[KEY_DEVICE].close()
+        except Exception as err:
+            _LOGGER.warning(f"async_unload_entry | Unable to log out: {err!r}")
+        finally:
+            await data[KEY_HTTP_SESSION].close()
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, config: ConfigEntry):
+    """Remove the cached ports of a deleted config entry."""
+    await Hp1820Store(hass, config.entry_id).async_remove()
+
+
 async def options_update_listener(hass: HomeAssistant, config: ConfigEntry):
-    """Handle options update."""
-    await hass.config_entries.async_reload(config.entry_id)
+    """Handle options update.
+
+    Polling options are applied to the running coordinator and device, so that entities
+    stay available and the switch isn't logged in again. The config entry is reloaded
+    only if the connection settings or an option in `OPTIONS_RELOAD` changed.
+    """
+    data = hass.data[DOMAIN][config.entry_id]
+    previous = data[KEY_OPTIONS]
+    changed = {
+        key
+        for key in previous.keys() | config.options.keys()
+        if previous.get(key, OPTIONS_DEFAULTS.get(key)) != config.options.get(key, OPTIONS_DEFAULTS.get(key))
+    }
+    if data[KEY_ENTRY_DATA] != config.data:
+        _LOGGER.debug("options_update_listener | Reloading for changed connection settings")
+        await hass.config_entries.async_reload(config.entry_id)
+        return
+
+    if not changed:
+        # The entry was updated without changing the options (e.g. its title)
+        return
+
+    if changed.intersection(OPTIONS_RELOAD):
+        _LOGGER.debug(f"options_update_listener | Reloading for changed options {sorted(changed)}")
+        await hass.config_entries.async_reload(config.entry_id)
+        return
+
+    _LOGGER.debug(f"options_update_listener | Applying changed options {sorted(changed)}")
+    data[KEY_OPTIONS] = dict(config.options)
+    data[KEY_DEVICE].apply_options(config.options)
+    data[KEY_COORDINATOR].async_update_options(
+        config.options.get(CONF_SCAN_INTERVAL, SCAN_INTERVAL_DEFAULT),
+        _adaptive_interval(config),
+        _verify_delay(config),
+        config.options.get(CONF_STALE_MAX_AGE, STALE_MAX_AGE_DEFAULT),
+    )
+
+
+def _adaptive_interval(config: ConfigEntry) -> Optional[AdaptiveInterval]:
+    # None polls at the fixed scan interval
+    if not config.options.get(CONF_ADAPTIVE_POLLING, False):
+        return None
+    return AdaptiveInterval(
+        config.options.get(CONF_SCAN_INTERVAL_MIN, SCAN_INTERVAL_MIN_DEFAULT),
+        config.options.get(CONF_SCAN_INTERVAL_MAX, SCAN_INTERVAL_MAX_DEFAULT),
+    )
+
+
+def _verify_delay(config: ConfigEntry) -> Optional[float]:
+    # Written ports are read back to detect changes refused by the switch
+    return VERIFY_DELAY if config.options.get(CONF_VERIFY_WRITES, True) else None
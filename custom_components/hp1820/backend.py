@@ -0,0 +1,71 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import Hp1820Metrics
+from .models import CONFIG_FIELDS, PoePortState, PoePowerStatus
+
+
+class PartialWriteError(Exception):
+    """Raised when a write of many ports fails after some of them were written.
+
+    Ports are written in groups (e.g. one request per target configuration), and the
+    groups written before the failure are applied by the switch.
+    """
+
+    def __init__(self, written: List[str], message: str):
+        super().__init__(message)
+        self.written = written
+
+
+class Hp1820Backend(ABC):
+    """Hp1820Backend is the protocol used by `Hp1820Device` to read and write the switch.
+
+    Backends are stateless towards Home Assistant: they return the data read from the
+    switch, while `Hp1820Device` keeps the state. Operations run within the session
+    handled by `Hp1820Session`, so backends that don't need one can make `login` and
+    `logout` no-ops.
+    """
+
+    metrics: Hp1820Metrics
+    # Fields of `PoePortState` written by `set_ports_config`, the power limit is written along with `limit_type`
+    config_fields: Tuple[str, ...] = CONFIG_FIELDS
+
+    @abstractmethod
+    async def login(self, username: str, password: str):
+        """Open an authenticated session with the switch."""
+
+    @abstractmethod
+    async def logout(self):
+        """Close the session with the switch."""
+
+    @abstractmethod
+    async def get_poe_state(self) -> Dict[str, PoePortState]:
+        """Return the PoE configuration and status of each port, by port ID."""
+
+    @abstractmethod
+    async def get_poe_power(self) -> PoePowerStatus:
+        """Return the power drawn by the ports and the PoE budget of the switch.
+
+        Raises:
+            ValueError: If the switch doesn't report the power of the ports.
+        """
+
+    @abstractmethod
+    async def set_poe_state(self, port: str, status: bool, current: Optional[PoePortState] = None):
+        """Set the admin mode of a port, keeping its `current` settings if known."""
+
+    @abstractmethod
+    async def set_ports_state(self, states: Dict[str, bool], current: Optional[Dict[str, PoePortState]] = None):
+        """Set the admin mode of multiple ports, keeping their `current` settings if known.
+
+        Raises:
+            PartialWriteError: If the write fails after some of the ports were written.
+        """
+
+    @abstractmethod
+    async def set_ports_config(self, configs: Dict[str, Dict[str, str]]):
+        """Set the configuration of multiple ports, see `PoePortState.to_config`.
+
+        Raises:
+            PartialWriteError: If the write fails after some of the ports were written.
+        """
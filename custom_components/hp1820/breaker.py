@@ -0,0 +1,89 @@
+import logging
+import time
+from typing import Callable
+
+_LOGGER = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the switch while the circuit breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unreachable, next attempt in {retry_in:.0f} seconds")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """CircuitBreaker stops sending requests to a switch that keeps failing.
+
+    After `threshold` consecutive failures the circuit opens and requests fail fast with
+    `CircuitOpenError`. Once `reset_timeout` seconds have passed, a single probe request
+    is let through (half-open): if it succeeds the circuit closes, otherwise it opens again.
+
+    Args:
+        name: The name used in errors and logs (e.g. the switch address).
+        threshold: Consecutive failures that open the circuit.
+        reset_timeout: Seconds before a probe request is allowed.
+        clock: The monotonic clock, in seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._clock = clock
+        self._opened_at = 0.0
+
+    def check(self):
+        """Allow a request, or fail fast if the circuit is open.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or a probe is already in flight.
+        """
+        if self.state == CLOSED:
+            return
+
+        retry_in = self._opened_at + self.reset_timeout - self._clock()
+        if self.state == OPEN and retry_in <= 0:
+            _LOGGER.debug(f"check | Probing {self.name}")
+            self.state = HALF_OPEN
+            return
+
+        raise CircuitOpenError(self.name, max(retry_in, 0))
+
+    def success(self):
+        """Record a request that reached the switch."""
+        if self.state != CLOSED:
+            _LOGGER.info(f"success | {self.name} is reachable again")
+        self.state = CLOSED
+        self.failures = 0
+
+    def release(self):
+        """Record a request that ended without an answer, e.g. because it was cancelled.
+
+        An unfinished probe opens the circuit again, so that the next request is the new probe.
+        """
+        if self.state == HALF_OPEN:
+            _LOGGER.debug(f"release | Probe of {self.name} didn't complete")
+            self.state = OPEN
+
+    def failure(self):
+        """Record a request that failed because of the switch or the network."""
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            if self.state == CLOSED:
+                _LOGGER.warning(f"failure | {self.name} is unreachable, pausing requests for {self.reset_timeout}s")
+            self.state = OPEN
+            self._opened_at = self._clock()
@@ -1,59 +1,174 @@
-import json
+import asyncio
 import logging
-import re as regex
-from typing import Dict
+import random
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urljoin
 
-from aiohttp import ClientSession
-from aiohttp.client_exceptions import ClientResponseError
+from aiohttp import (
+    ClientResponse,
+    ClientSession,
+    ClientTimeout,
+    CookieJar,
+    TCPConnector,
+)
+from aiohttp.client_exceptions import ClientConnectionError, ClientResponseError
+
+from .backend import Hp1820Backend, PartialWriteError
+from .breaker import CircuitBreaker
+from .const import (
+    BREAKER_RESET_TIMEOUT,
+    BREAKER_THRESHOLD,
+    CONNECTION_KEEPALIVE_TIMEOUT,
+    CONNECTION_LIMIT_PER_HOST,
+    DNS_CACHE_TTL,
+    REQUEST_RETRIES,
+    REQUEST_TIMEOUT,
+    RETRY_BACKOFF,
+    WRITE_TIMEOUT,
+)
+from .helpers import format_interfaces
+from .metrics import Hp1820Metrics
+from .models import PoePortState, PoePowerStatus
+from .parser import find_data_set, parse_data_set
 
 _LOGGER = logging.getLogger(__name__)
 
+# Pages served by the switch when the `SID` is missing or expired
+LOGIN_PATH = "/htdocs/login/"
+
+
+class SessionExpiredError(ClientResponseError):
+    """Raised when the switch doesn't recognize the `SID` anymore."""
+
+
+def create_session() -> ClientSession:
+    """Create a `ClientSession` dedicated to a single switch.
+
+    Each switch gets its own cookie jar, so that the `SID` of a switch can't overwrite
+    the one of another switch, or of other integrations using the shared Home Assistant
+    session. The jar accepts cookies from IP addresses, which is how switches are usually
+    reached. The connector keeps connections alive between polls and caches DNS lookups.
+
+    The caller owns the session and must close it.
+
+    Returns:
+        ClientSession: A new session for a single switch.
+    """
+    connector = TCPConnector(
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout=CONNECTION_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        ssl=False,
+    )
+    return ClientSession(connector=connector, cookie_jar=CookieJar(unsafe=True))
+
+
+class Hp1820Client(Hp1820Backend):
+    """Hp1820Client reads and writes the PoE ports through the web interface of the switch."""
 
-class Hp1820Client:
     def __init__(self, session: ClientSession, host: str, protocol: str = "http"):
         self._base_url = f"{protocol}://{host}"
         self._session = session
+        # Raw text and parsed ports of the last PoE table, to skip parsing an unchanged table
+        self._poe_table: Optional[str] = None
+        self._poe_ports: Dict[str, PoePortState] = {}
+        self.metrics = Hp1820Metrics()
+        # Page reads are idempotent, so they are retried with a jittered exponential backoff
+        self.retries = REQUEST_RETRIES
+        self.retry_backoff = RETRY_BACKOFF
+        self.breaker = CircuitBreaker(host, BREAKER_THRESHOLD, BREAKER_RESET_TIMEOUT)
+
+    @property
+    def parse_skipped(self) -> int:
+        """Return how many times parsing was skipped because the PoE table didn't change."""
+        return self.metrics.counters["parse_skipped"]
 
     async def login(self, username: str, password: str):
         payload = {"username": username, "password": password}
 
+        self.metrics.increment("logins")
         try:
-            async with await self._httpPost("/htdocs/login/login.lua", payload) as raw_response:
-                response = await raw_response.json()
-                if response["error"]:
-                    raise ClientResponseError(raw_response)
-                self._session.cookie_jar.update_cookies({"SID": raw_response.cookies["SID"]})
+            with self.metrics.timer("login"):
+                async with await self._httpPost(
+                    "/htdocs/login/login.lua", payload, check_session=False
+                ) as raw_response:
+                    response = await raw_response.json()
+                    if response["error"]:
+                        raise ClientResponseError(
+                            raw_response.request_info, raw_response.history, status=401, message=response["error"]
+                        )
+                    self._session.cookie_jar.update_cookies({"SID": raw_response.cookies["SID"]})
         except ClientResponseError as err:
             _LOGGER.error(f"login | Login failed: {err}")
             raise err
 
     async def logout(self):
-        async with await self._httpGet("/htdocs/pages/main/logout.lsp"):
+        async with await self._httpGet("/htdocs/pages/main/logout.lsp", check_session=False, retry=False):
             _LOGGER.debug("logout | logged out")
 
-    async def get_poe_state(self) -> Dict[str, str]:
+    async def get_poe_state(self) -> Dict[str, PoePortState]:
         # first_row = [
         #   'Interface', 'Admin Mode', 'Priority', 'Schedule', 'High Power Mode',
         #   'Power Detect Type', 'Power Limit Type', 'Status', 'Fault Status'
         # ]
-        async with await self._httpGet("/htdocs/pages/base/poe_port_cfg.lsp") as raw_response:
-            text_response = await raw_response.text()
+        text_response = await self._get_page("/htdocs/pages/base/poe_port_cfg.lsp")
+        with self.metrics.timer("parse"):
+            start, end = find_data_set(text_response)
+            if self._poe_table is not None and self._is_same_table(text_response, start, end):
+                self.metrics.increment("parse_skipped")
+                _LOGGER.debug("get_poe_state | Table unchanged, parsing skipped")
+                return dict(self._poe_ports)
+
             rows = self._parse_status(text_response)
-            return {x[0]: x[1].lower() == "enabled" for x in rows}  # index 0 is port number, index 1 is enabled status
-
-    async def set_poe_state(self, port: str, status: bool):
-        config = {
-            "admin_mode_sel": "enabled" if status else "disabled",
-            "schedule_sel": "none",
-            "priority_sel": "low",
-            "high_power_mode_sel": "disable",
-            "power_detect_type_sel": "4pt_dot3af",
-            "power_limit_type_sel": "dot3af",
-            "power_limit": "",
-            "interface": port,
-        }
-        await self._set_poe_state_extended(config)
+            ports = (PoePortState.from_row(row) for row in rows)
+            self._poe_ports = {port.interface: port for port in ports}
+            self._poe_table = text_response[start:end]
+            return dict(self._poe_ports)
+
+    async def get_poe_power(self) -> PoePowerStatus:
+        # first_row = [
+        #   'Interface', 'Output Power (W)', 'Output Current (mA)', 'Output Voltage (V)', ...
+        # ]
+        # summary = ['Power Budget (W)', 'Consumed Power (W)', ...]
+        text_response = await self._get_page("/htdocs/pages/base/poe_port_status.lsp")
+        with self.metrics.timer("parse"):
+            rows = self._parse_status(text_response)
+            try:
+                summary = parse_data_set(text_response, "aPoeSummary")
+            except ValueError:
+                summary = None
+            return PoePowerStatus.from_rows(rows, summary)
+
+    async def set_poe_state(self, port: str, status: bool, current: Optional[PoePortState] = None):
+        await self.set_ports_state({port: status}, None if current is None else {port: current})
+
+    async def set_ports_state(self, states: Dict[str, bool], current: Optional[Dict[str, PoePortState]] = None):
+        # Settings other than the admin mode are kept from the current state, if known
+        current = current or {}
+        configs = {port: current.get(port, PoePortState(port)).to_config(status) for port, status in states.items()}
+        await self._set_poe_state_bulk(configs)
+
+    async def set_ports_config(self, configs: Dict[str, Dict[str, str]]):
+        # Each config holds all the values of the form, see `PoePortState.to_config`
+        await self._set_poe_state_bulk(configs)
+
+    async def _set_poe_state_bulk(self, configs: Dict[str, Dict[str, str]]):
+        # Ports sharing the same target config are updated with a single request
+        groups: Dict[Tuple[Tuple[str, str], ...], List[str]] = {}
+        for port, config in configs.items():
+            groups.setdefault(tuple(sorted(config.items())), []).append(port)
+
+        written: List[str] = []
+        with self.metrics.timer("write"):
+            for values, ports in groups.items():
+                try:
+                    await self._set_poe_state_extended({**dict(values), "interface": format_interfaces(ports)})
+                except Exception as err:
+                    # A failure of the first group is raised as is, so that an expired session is retried
+                    if not written:
+                        raise
+                    raise PartialWriteError(written, f"Unable to write ports {ports}: {err}") from err
+                written.extend(ports)
 
     async def _set_poe_state_extended(self, config):
         payload = {
@@ -68,31 +183,87 @@ class Hp1820Client:
             "b_modal1_clicked": "b_modal1_submit",
         }
 
-        async with await self._httpPost("/htdocs/pages/base/poe_port_cfg_modal.lsp", payload) as response:
+        async with await self._httpPost(
+            "/htdocs/pages/base/poe_port_cfg_modal.lsp", payload, timeout=WRITE_TIMEOUT
+        ) as response:
             _LOGGER.debug(
                 f"_set_poe_state_extended | Port {config['interface']}={config['admin_mode_sel']}: {response.status}"
             )
 
-    async def _httpGet(self, url: str):
-        full_url = self._getFullUrl(url)
-        response = await self._session.get(full_url)
-        response.raise_for_status()
-        return response
+    async def _get_page(self, url: str) -> str:
+        with self.metrics.timer("fetch"):
+            async with await self._httpGet(url) as raw_response:
+                text_response = await raw_response.text()
+        if "aDataSet" not in text_response and "login" in text_response:
+            # The switch renders the login page instead of the requested one
+            raise SessionExpiredError(raw_response.request_info, raw_response.history, status=401)
+        return text_response
+
+    async def _httpGet(self, url: str, check_session: bool = True, retry: bool = True):
+        retries = self.retries if retry else 0
+        return await self._request("GET", url, check_session, REQUEST_TIMEOUT, retries)
 
-    async def _httpPost(self, url: str, payload):
+    async def _httpPost(self, url: str, payload, check_session: bool = True, timeout: float = REQUEST_TIMEOUT):
+        # Posts are not retried, as they may have been applied before failing
+        return await self._request("POST", url, check_session, timeout, 0, data=payload)
+
+    async def _request(self, method: str, url: str, check_session: bool, timeout: float, retries: int, **kwargs):
         full_url = self._getFullUrl(url)
-        response = await self._session.post(full_url, data=payload)
-        response.raise_for_status()
-        return response
+        # Fails fast without contacting a switch that is known to be unreachable
+        self.breaker.check()
+        attempt = 0
+        try:
+            while True:
+                self.metrics.increment("requests")
+                try:
+                    response = await self._session.request(
+                        method, full_url, timeout=ClientTimeout(total=timeout), **kwargs
+                    )
+                    if check_session:
+                        self._check_session(response)
+                    response.raise_for_status()
+                except SessionExpiredError:
+                    # The switch answered, it's just the session that must be renewed
+                    self.breaker.success()
+                    raise
+                except (asyncio.TimeoutError, ClientConnectionError, ClientResponseError) as err:
+                    # Client errors (4xx) are answers of a working switch and are not retried
+                    transient = not isinstance(err, ClientResponseError) or err.status >= 500
+                    if not transient:
+                        self.breaker.success()
+                        raise
+                    if attempt < retries:
+                        attempt += 1
+                        self.metrics.increment("retries")
+                        delay = random.uniform(0, self.retry_backoff * 2**attempt)  # nosec B311
+                        _LOGGER.debug(f"_request | {method} {url} failed ({err!r}), retry {attempt} in {delay:.2f}s")
+                        await asyncio.sleep(delay)
+                        continue
+                    self.metrics.increment("request_failures")
+                    self.breaker.failure()
+                    raise
+
+                self.breaker.success()
+                return response
+        except BaseException:
+            # A probe cancelled (e.g. on shutdown) or failed unexpectedly must not keep the circuit half-open
+            self.breaker.release()
+            raise
+
+    def _check_session(self, response: ClientResponse):
+        # An expired `SID` is redirected to the login page
+        if response.status == 401 or response.url.path.startswith(LOGIN_PATH):
+            response.release()
+            raise SessionExpiredError(response.request_info, response.history, status=401)
 
     def _getFullUrl(self, path: str):
         return urljoin(self._base_url, path)
 
+    def _is_same_table(self, text: str, start: int, end: int) -> bool:
+        # Compares the table in place, without copying it out of the page
+        table = self._poe_table or ""
+        return end - start == len(table) and text.startswith(table, start)
+
     def _parse_status(self, text_response: str):
-        search_result = regex.search("aDataSet = (.*)var aColumns", text_response.replace("\n", ""))
-        string = "" if search_result is None else search_result.group(1)
-        # swap single quote and double quote because jQuery format is not compatible with JSON
-        string = string.replace("'", "`").replace('"', "'").replace("`", '"')
-        string = string.rstrip().rstrip(";")
-        obj = json.loads(string)
-        return [i[1:] for i in obj]
+        # the first item of each row is not a table column
+        return [i[1:] for i in parse_data_set(text_response)]
@@ -5,10 +5,37 @@ from aiohttp.client_exceptions import ClientResponseError
 from homeassistant import config_entries
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
 from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .client import Hp1820Client
-from .const import CONF_SCAN_INTERVAL, CONF_SYSTEM_IP, DOMAIN, SCAN_INTERVAL_DEFAULT
+from .client import Hp1820Client, create_session
+from .const import (
+    BACKEND_HTTP,
+    BACKEND_SNMP,
+    CONF_ADAPTIVE_POLLING,
+    CONF_BACKEND,
+    CONF_PORTS_SCAN_INTERVAL,
+    CONF_POWER_SCAN_INTERVAL,
+    CONF_SCAN_INTERVAL,
+    CONF_SCAN_INTERVAL_MAX,
+    CONF_SCAN_INTERVAL_MIN,
+    CONF_SESSION_IDLE_TIMEOUT,
+    CONF_SNMP_COMMUNITY,
+    CONF_STALE_MAX_AGE,
+    CONF_SYSLOG_PORT,
+    CONF_SYSTEM_IP,
+    CONF_VERIFY_WRITES,
+    DOMAIN,
+    PORTS_SCAN_INTERVAL_DEFAULT,
+    POWER_SCAN_INTERVAL_DEFAULT,
+    SCAN_INTERVAL_DEFAULT,
+    SCAN_INTERVAL_LOWEST,
+    SCAN_INTERVAL_MAX_DEFAULT,
+    SCAN_INTERVAL_MIN_DEFAULT,
+    SESSION_IDLE_TIMEOUT_DEFAULT,
+    SNMP_COMMUNITY_DEFAULT,
+    STALE_MAX_AGE_DEFAULT,
+    SYSLOG_PORT_DEFAULT,
+)
+from .snmp import Hp1820SnmpClient, SnmpError
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,30 +56,47 @@ class Hp1820ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ignor
         """Handle the initial configuration."""
         errors = {}
         if user_input is not None:
-            try:
-                # Validate credentials
-                session = async_get_clientsession(self.hass, verify_ssl=False)
-                ip = user_input.get(CONF_SYSTEM_IP)
-                username = user_input.get(CONF_USERNAME)
-                password = user_input.get(CONF_PASSWORD)
-                client = Hp1820Client(session, ip)
-                await client.login(username, password)
-                await client.logout()
-            except ClientResponseError as err:
-                if err.status == 401:
-                    errors["base"] = "invalid_auth"
-                elif 402 <= err.status <= 499:
-                    errors["base"] = "client_error"
-                elif 500 <= err.status <= 599:
-                    errors["base"] = "server_error"
-                else:
+            # Credentials are used only by the web interface
+            http = user_input.get(CONF_BACKEND, BACKEND_HTTP) == BACKEND_HTTP
+            if http and not (user_input.get(CONF_USERNAME) and user_input.get(CONF_PASSWORD)):
+                errors["base"] = "missing_credentials"
+            else:
+                try:
+                    # Validate credentials with a dedicated session, to not log out other entries
+                    ip = user_input.get(CONF_SYSTEM_IP)
+                    username = user_input.get(CONF_USERNAME)
+                    password = user_input.get(CONF_PASSWORD)
+                    if not http:
+                        # The PoE table must be readable with the community
+                        community = user_input.get(CONF_SNMP_COMMUNITY, SNMP_COMMUNITY_DEFAULT)
+                        snmp_client = Hp1820SnmpClient(ip, community)
+                        try:
+                            await snmp_client.get_poe_state()
+                        finally:
+                            await snmp_client.logout()
+                    else:
+                        async with create_session() as session:
+                            client = Hp1820Client(session, ip)
+                            await client.login(username, password)
+                            await client.logout()
+                except ClientResponseError as err:
+                    if err.status == 401:
+                        errors["base"] = "invalid_auth"
+                    elif 402 <= err.status <= 499:
+                        errors["base"] = "client_error"
+                    elif 500 <= err.status <= 599:
+                        errors["base"] = "server_error"
+                    else:
+                        _LOGGER.error(f"Unexpected exception {err}")
+                        errors["base"] = "unknown"
+                except SnmpError as err:
+                    _LOGGER.error(f"Unable to read the switch over SNMP: {err}")
+                    errors["base"] = "snmp_error"
+                except Exception as err:  # pylint: disable=broad-except
                     _LOGGER.error(f"Unexpected exception {err}")
                     errors["base"] = "unknown"
-            except Exception as err:  # pylint: disable=broad-except
-                _LOGGER.error(f"Unexpected exception {err}")
-                errors["base"] = "unknown"
-            else:
-                return self.async_create_entry(title="Hp1820", data=user_input)
+                else:
+                    return self.async_create_entry(title="Hp1820", data=user_input)
 
         # Populate with latest changes
         user_input = {} if user_input is None else user_input
@@ -64,14 +108,23 @@ class Hp1820ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ignor
                         CONF_SYSTEM_IP,
                         description={"suggested_value": user_input.get(CONF_SYSTEM_IP)},
                     ): str,
-                    vol.Required(
+                    vol.Optional(
                         CONF_USERNAME,
                         description={"suggested_value": user_input.get(CONF_USERNAME)},
                     ): str,
-                    vol.Required(
+                    vol.Optional(
                         CONF_PASSWORD,
                         description={"suggested_value": user_input.get(CONF_PASSWORD)},
                     ): str,
+                    vol.Optional(
+                        CONF_BACKEND,
+                        default=user_input.get(CONF_BACKEND, BACKEND_HTTP),
+                    ): vol.In([BACKEND_HTTP, BACKEND_SNMP]),
+                    vol.Optional(
+                        CONF_SNMP_COMMUNITY,
+                        description={"suggested_value": user_input.get(CONF_SNMP_COMMUNITY)},
+                        default=SNMP_COMMUNITY_DEFAULT,
+                    ): str,
                 }
             ),
             errors=errors,
@@ -83,6 +136,13 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
     Available options are:
         * Scan interval: sets the polling time
+        * Session idle timeout: closes the session with the switch when unused
+        * Adaptive polling: polls faster after changes and slower while the switch is idle
+        * Minimum and maximum scan interval: bounds of the adaptive polling time
+        * Ports and power scan interval: minimum time between two reads of each page
+        * Verify writes: reads written ports back to detect changes refused by the switch
+        * Syslog port: refreshes the switch when it reports a link or PoE event
+        * Stale max age: serves the last ports read while the switch is unreachable
     """
 
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
@@ -93,11 +153,31 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         """Manage the options."""
         errors = {}
         if user_input is not None:
-            return self.async_create_entry(title="Hp1820", data=user_input)
+            minimum = user_input.get(CONF_SCAN_INTERVAL_MIN, SCAN_INTERVAL_MIN_DEFAULT)
+            maximum = user_input.get(CONF_SCAN_INTERVAL_MAX, SCAN_INTERVAL_MAX_DEFAULT)
+            if minimum > maximum:
+                errors["base"] = "invalid_interval"
+            else:
+                return self.async_create_entry(title="Hp1820", data=user_input)
 
         # Populate with latest changes or previous settings
         user_input = user_input or {}
         suggest_scan_interval = user_input.get(CONF_SCAN_INTERVAL) or self.config_entry.options.get(CONF_SCAN_INTERVAL)
+        suggest_idle_timeout = user_input.get(CONF_SESSION_IDLE_TIMEOUT) or self.config_entry.options.get(
+            CONF_SESSION_IDLE_TIMEOUT
+        )
+        suggest_adaptive = user_input.get(CONF_ADAPTIVE_POLLING) or self.config_entry.options.get(CONF_ADAPTIVE_POLLING)
+        suggest_min = user_input.get(CONF_SCAN_INTERVAL_MIN) or self.config_entry.options.get(CONF_SCAN_INTERVAL_MIN)
+        suggest_max = user_input.get(CONF_SCAN_INTERVAL_MAX) or self.config_entry.options.get(CONF_SCAN_INTERVAL_MAX)
+        suggest_ports = user_input.get(CONF_PORTS_SCAN_INTERVAL) or self.config_entry.options.get(
+            CONF_PORTS_SCAN_INTERVAL
+        )
+        suggest_power = user_input.get(CONF_POWER_SCAN_INTERVAL) or self.config_entry.options.get(
+            CONF_POWER_SCAN_INTERVAL
+        )
+        suggest_verify = user_input.get(CONF_VERIFY_WRITES, self.config_entry.options.get(CONF_VERIFY_WRITES))
+        suggest_syslog = user_input.get(CONF_SYSLOG_PORT) or self.config_entry.options.get(CONF_SYSLOG_PORT)
+        suggest_stale = user_input.get(CONF_STALE_MAX_AGE) or self.config_entry.options.get(CONF_STALE_MAX_AGE)
 
         return self.async_show_form(
             step_id="init",
@@ -107,7 +187,52 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                         CONF_SCAN_INTERVAL,
                         description={"suggested_value": suggest_scan_interval},
                         default=SCAN_INTERVAL_DEFAULT,
-                    ): int,
+                    ): vol.All(int, vol.Range(min=SCAN_INTERVAL_LOWEST)),
+                    vol.Optional(
+                        CONF_SESSION_IDLE_TIMEOUT,
+                        description={"suggested_value": suggest_idle_timeout},
+                        default=SESSION_IDLE_TIMEOUT_DEFAULT,
+                    ): vol.All(int, vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_ADAPTIVE_POLLING,
+                        description={"suggested_value": suggest_adaptive},
+                        default=False,
+                    ): bool,
+                    vol.Optional(
+                        CONF_SCAN_INTERVAL_MIN,
+                        description={"suggested_value": suggest_min},
+                        default=SCAN_INTERVAL_MIN_DEFAULT,
+                    ): vol.All(int, vol.Range(min=SCAN_INTERVAL_LOWEST)),
+                    vol.Optional(
+                        CONF_SCAN_INTERVAL_MAX,
+                        description={"suggested_value": suggest_max},
+                        default=SCAN_INTERVAL_MAX_DEFAULT,
+                    ): vol.All(int, vol.Range(min=SCAN_INTERVAL_LOWEST)),
+                    vol.Optional(
+                        CONF_PORTS_SCAN_INTERVAL,
+                        description={"suggested_value": suggest_ports},
+                        default=PORTS_SCAN_INTERVAL_DEFAULT,
+                    ): vol.All(int, vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_POWER_SCAN_INTERVAL,
+                        description={"suggested_value": suggest_power},
+                        default=POWER_SCAN_INTERVAL_DEFAULT,
+                    ): vol.All(int, vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_VERIFY_WRITES,
+                        description={"suggested_value": suggest_verify},
+                        default=True,
+                    ): bool,
+                    vol.Optional(
+                        CONF_SYSLOG_PORT,
+                        description={"suggested_value": suggest_syslog},
+                        default=SYSLOG_PORT_DEFAULT,
+                    ): vol.All(int, vol.Range(min=0, max=65535)),
+                    vol.Optional(
+                        CONF_STALE_MAX_AGE,
+                        description={"suggested_value": suggest_stale},
+                        default=STALE_MAX_AGE_DEFAULT,
+                    ): vol.All(int, vol.Range(min=0)),
                 }
             ),
             errors=errors,
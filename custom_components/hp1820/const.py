@@ -2,6 +2,19 @@
 
 CONF_SYSTEM_IP = "system_ip"
 CONF_SCAN_INTERVAL = "scan_interval"
+CONF_SESSION_IDLE_TIMEOUT = "session_idle_timeout"
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_SCAN_INTERVAL_MIN = "scan_interval_min"
+CONF_SCAN_INTERVAL_MAX = "scan_interval_max"
+CONF_PORTS_SCAN_INTERVAL = "ports_scan_interval"
+CONF_POWER_SCAN_INTERVAL = "power_scan_interval"
+CONF_VERIFY_WRITES = "verify_writes"
+CONF_SYSLOG_PORT = "syslog_port"
+CONF_STALE_MAX_AGE = "stale_max_age"
+CONF_BACKEND = "backend"
+CONF_SNMP_COMMUNITY = "snmp_community"
+BACKEND_HTTP = "http"
+BACKEND_SNMP = "snmp"
 DOMAIN = "hp1820"
 NOTIFICATION_MESSAGE = "Toggling the switch failed. Please check the device and try again."
 NOTIFICATION_TITLE = "Unable to toggle the switch"
@@ -9,5 +22,105 @@ NOTIFICATION_IDENTIFIER = "hp1820_output_fail"
 KEY_DEVICE = "device"
 KEY_COORDINATOR = "coordinator"
 KEY_UNSUBSCRIBER = "options_unsubscriber"
+KEY_HTTP_SESSION = "http_session"
+KEY_SCHEDULER = "scheduler"
+KEY_STORE = "store"
+KEY_SNAPSHOTS = "snapshots"
+KEY_SYSLOG = "syslog"
+KEY_OPTIONS = "options"
+KEY_ENTRY_DATA = "entry_data"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_DEVICE_ID = "device_id"
+ATTR_PORTS = "ports"
+ATTR_STATE = "state"
+ATTR_ADMIN_MODE = "admin_mode"
+ATTR_PRIORITY = "priority"
+ATTR_SCHEDULE = "schedule"
+ATTR_LIMIT_TYPE = "limit_type"
+ATTR_POWER_LIMIT = "power_limit"
+ATTR_NAME = "name"
+ATTR_OFF_TIME = "off_time"
+ATTR_BATCH_SIZE = "batch_size"
+ATTR_BATCH_DELAY = "batch_delay"
+ATTR_WAIT = "wait_for_power"
+ATTR_TIMEOUT = "timeout"
+REFRESH_GROUP_PORTS = "ports"
+REFRESH_GROUP_POWER = "power"
+EVENT_WRITE_MISMATCH = "hp1820_write_mismatch"
 # Defines the default scan interval in seconds.
 SCAN_INTERVAL_DEFAULT = 120
+# Defines the lowest scan interval in seconds, so that polls don't keep the switch busy.
+SCAN_INTERVAL_LOWEST = 5
+# Defines after how many seconds an unused session is closed (0 keeps it open).
+SESSION_IDLE_TIMEOUT_DEFAULT = 0
+# Defines the connection pool of the session dedicated to each switch.
+CONNECTION_LIMIT_PER_HOST = 2
+CONNECTION_KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+# Defines the storage of the last known ports, and how many seconds writes are delayed.
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+# Defines how many seconds a request can take, writes may be slower as the switch applies them.
+REQUEST_TIMEOUT = 10
+WRITE_TIMEOUT = 20
+# Defines how many times a failed page read is retried, and the base backoff in seconds.
+REQUEST_RETRIES = 2
+RETRY_BACKOFF = 0.5
+# Defines after how many failures a switch is considered unreachable, and for how many seconds.
+BREAKER_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT = 60
+# Defines how many switches can be polled at the same time.
+FLEET_MAX_CONCURRENT_POLLS = 4
+# Defines for how many seconds port changes are collected before writing them together.
+WRITE_DEBOUNCE = 0.1
+# Defines the bounds in seconds of the adaptive scan interval.
+SCAN_INTERVAL_MIN_DEFAULT = 10
+SCAN_INTERVAL_MAX_DEFAULT = 600
+# Defines for how many seconds the switch is polled at the minimum interval after a change.
+ADAPTIVE_FAST_WINDOW = 60
+# Defines how much the adaptive scan interval grows after each unchanged or failed poll.
+ADAPTIVE_BACKOFF_FACTOR = 1.5
+ADAPTIVE_FAILURE_FACTOR = 2
+# Defines how many times the maximum interval a failing switch can be polled at.
+# Without adaptive polling, a failing switch served as stale backs off up to this many times the scan interval.
+ADAPTIVE_FAILURE_MAX_FACTOR = 4
+# Defines how many samples are kept to compute the latency percentiles of each switch.
+METRICS_WINDOW = 100
+# Defines the minimum seconds between two reads of each page, 0 reads it on every poll.
+PORTS_SCAN_INTERVAL_DEFAULT = 0
+POWER_SCAN_INTERVAL_DEFAULT = 0
+# Defines how many seconds after the last write of a burst the written ports are read back.
+VERIFY_DELAY = 5
+# Defines the default seconds a port stays off during a power cycle, and how long ports can take to power up.
+POWER_CYCLE_OFF_TIME = 5
+POWER_CYCLE_TIMEOUT = 60
+# Defines how many seconds pass between two reads of the switch while waiting for ports to power up.
+POWER_CYCLE_POLL_INTERVAL = 2
+# Defines the UDP port of the syslog listener (0 disables it), and the messages that trigger a refresh.
+SYSLOG_PORT_DEFAULT = 0
+SYSLOG_EVENT_PATTERN = r"\b(link|poe|power|port|interface)\b"
+# Defines for how many seconds syslog events are collected before refreshing the switch.
+SYSLOG_DEBOUNCE = 1
+# Defines for how many seconds the last ports read are served while the switch is unreachable (0 disables it).
+STALE_MAX_AGE_DEFAULT = 0
+# Defines the options that need a reload of the config entry, the others are applied live.
+OPTIONS_RELOAD = (CONF_SYSLOG_PORT,)
+# Defines the value of the options that are not set, so that saving a default doesn't count as a change.
+OPTIONS_DEFAULTS = {
+    CONF_SCAN_INTERVAL: SCAN_INTERVAL_DEFAULT,
+    CONF_SESSION_IDLE_TIMEOUT: SESSION_IDLE_TIMEOUT_DEFAULT,
+    CONF_ADAPTIVE_POLLING: False,
+    CONF_SCAN_INTERVAL_MIN: SCAN_INTERVAL_MIN_DEFAULT,
+    CONF_SCAN_INTERVAL_MAX: SCAN_INTERVAL_MAX_DEFAULT,
+    CONF_PORTS_SCAN_INTERVAL: PORTS_SCAN_INTERVAL_DEFAULT,
+    CONF_POWER_SCAN_INTERVAL: POWER_SCAN_INTERVAL_DEFAULT,
+    CONF_VERIFY_WRITES: True,
+    CONF_SYSLOG_PORT: SYSLOG_PORT_DEFAULT,
+    CONF_STALE_MAX_AGE: STALE_MAX_AGE_DEFAULT,
+}
+# Defines the SNMP agent of the switch, and the community used when none is configured.
+SNMP_PORT = 161
+SNMP_COMMUNITY_DEFAULT = "private"
+# Defines how many rows are read by each GETBULK, and how many values are written by each SET.
+SNMP_MAX_REPETITIONS = 25
+SNMP_SET_CHUNK = 24
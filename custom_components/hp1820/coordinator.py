@@ -1,35 +1,485 @@
 import logging
 from datetime import timedelta
-from typing import Any, Dict, Optional
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Set
 
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
+from .breaker import CircuitOpenError
+from .const import (
+    ADAPTIVE_BACKOFF_FACTOR,
+    ADAPTIVE_FAILURE_FACTOR,
+    ADAPTIVE_FAILURE_MAX_FACTOR,
+    ADAPTIVE_FAST_WINDOW,
+    DOMAIN,
+    EVENT_WRITE_MISMATCH,
+    REFRESH_GROUP_PORTS,
+    SCAN_INTERVAL_LOWEST,
+    SYSLOG_DEBOUNCE,
+)
 from .devices import Hp1820Device
+from .models import PoePortState
+from .scheduler import Hp1820Scheduler
+from .snmp import SnmpError
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class AdaptiveInterval:
+    """AdaptiveInterval computes the polling interval from the recent activity of the switch.
+
+    The switch is polled at the minimum interval for a short window after a write or a
+    detected change. Then the interval grows step by step while the table stays the same,
+    up to the maximum interval, and grows further while the switch keeps failing.
+
+    Bounds are clamped to `SCAN_INTERVAL_LOWEST`, so that a minimum of 0 doesn't poll the
+    switch continuously.
+    """
+
+    def __init__(
+        self,
+        minimum: float,
+        maximum: float,
+        fast_window: float = ADAPTIVE_FAST_WINDOW,
+        backoff: float = ADAPTIVE_BACKOFF_FACTOR,
+        failure_backoff: float = ADAPTIVE_FAILURE_FACTOR,
+        failure_maximum: float = ADAPTIVE_FAILURE_MAX_FACTOR,
+    ):
+        self.minimum = max(minimum, SCAN_INTERVAL_LOWEST)
+        self.maximum = max(self.minimum, maximum)
+        self._fast_window = fast_window
+        self._backoff = backoff
+        self._failure_backoff = failure_backoff
+        self._failure_maximum = self.maximum * failure_maximum
+        self._fast_until = 0.0
+        self.current = self.minimum
+
+    def activity(self, now: float) -> float:
+        """Start a fast polling window, after a write or a detected change."""
+        self._fast_until = now + self._fast_window
+        self.current = self.minimum
+        return self.current
+
+    def success(self, changed: bool, now: float) -> float:
+        """Compute the next interval after a successful poll."""
+        if changed:
+            return self.activity(now)
+        if now < self._fast_until:
+            self.current = self.minimum
+        else:
+            self.current = min(max(self.current, self.minimum) * self._backoff, self.maximum)
+        return self.current
+
+    def failure(self, now: float) -> float:
+        """Compute the next interval after a failed poll."""
+        self._fast_until = 0.0
+        self.current = min(max(self.current, self.minimum) * self._failure_backoff, self._failure_maximum)
+        return self.current
+
+
 class Hp1820Coordinator(DataUpdateCoordinator):
-    def __init__(self, hass: HomeAssistant, device: Hp1820Device, scan_interval: int) -> None:
+    # Property of the base class, which is not typed
+    update_interval: Optional[timedelta]
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        device: Hp1820Device,
+        scan_interval: int,
+        adaptive: Optional[AdaptiveInterval] = None,
+        scheduler: Optional[Hp1820Scheduler] = None,
+        verify_delay: Optional[float] = None,
+        stale_max_age: float = 0,
+    ) -> None:
         self._device = device
+        self._adaptive = adaptive
+        self._scheduler = scheduler
+        # Event loop time of the scheduled refresh, aligned to the phase assigned by the scheduler
+        self._next_refresh: Optional[float] = None
+        # Ports state when listeners were last notified, used to notify only changed ports
+        self._snapshot: Dict[str, PoePortState] = {}
+        self._notified_success: Optional[bool] = None
+        self._notified_restored: Optional[bool] = None
+        self._notified_stale: Optional[bool] = None
+        self._notified_pending: Set[str] = set()
+        # Written ports are read back after a burst of writes, if a delay is set
+        self._verify_delay = verify_delay
+        self._verify_job = HassJob(self._async_verify, f"{DOMAIN} verify writes", cancel_on_shutdown=True)
+        self._unsub_verify: Optional[CALLBACK_TYPE] = None
+        # Events reported by the switch (e.g. via syslog) trigger a refresh of all pages
+        self._event_job = HassJob(self._async_event_refresh, f"{DOMAIN} event refresh", cancel_on_shutdown=True)
+        self._unsub_event: Optional[CALLBACK_TYPE] = None
+        # Port IDs when inventory listeners were last notified, used to add and remove entities
+        self._inventory: Set[str] = set()
+        self._inventory_listeners: List[Callable[[Set[str]], None]] = []
+        # Ports state of the last poll, used to detect changes in adaptive mode
+        self._polled: Optional[Dict[str, PoePortState]] = None
+        # The last ports read are served for this many seconds while the switch is unreachable
+        self._stale_max_age = stale_max_age
+        self._serving_stale = False
+        # Entities become unavailable once the last ports are too old, also if no poll runs by then
+        self._expire_job = HassJob(self._async_expire_stale, f"{DOMAIN} expire stale", cancel_on_shutdown=True)
+        self._unsub_expire: Optional[CALLBACK_TYPE] = None
+        # Interval restored once a failing switch answers again
+        self._scan_interval = scan_interval
+        interval: float = scan_interval
+        if adaptive is not None:
+            adaptive.current = min(max(scan_interval, adaptive.minimum), adaptive.maximum)
+            interval = adaptive.current
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
-            update_interval=timedelta(seconds=scan_interval),
+            update_interval=timedelta(seconds=interval),
         )
 
+    @property
+    def current_interval(self) -> Optional[float]:
+        """Return the polling interval in seconds currently in use."""
+        return self.update_interval.total_seconds() if self.update_interval else None
+
+    @property
+    def next_refresh(self) -> Optional[float]:
+        """Return the event loop time of the scheduled refresh, None if no refresh is scheduled."""
+        return self._next_refresh if self._unsub_refresh is not None else None
+
     async def _async_update_data(self) -> Optional[Dict[str, Any]]:
         """Update device data asynchronously.
 
+        If a stale max age is set, a failed poll returns the last data until it is older than
+        the max age, so that entities stay available while the switch is unreachable. Failed
+        polls are retried less often, either by the adaptive interval or by a backoff of the
+        scan interval.
+
         Returns:
             A dictionary containing the updated data.
 
         Raises:
             InvalidToken: When the token used for the connection is invalid.
-            UpdateFailed: When there's an error in updating the data.
+            UpdateFailed: When there's an error in updating the data, or the switch is unreachable.
+        """
+
+        try:
+            data = await self._update_device()
+        except Exception as err:
+            self._backoff()
+            if not self._serve_stale(err):
+                raise
+            return self.data
+
+        if self._serving_stale:
+            _LOGGER.info("_async_update_data | The switch answered again, ports are up to date")
+            self._serving_stale = False
+            self._cancel_expiry()
+        if self._adaptive is None:
+            self._set_interval(self._scan_interval)
+            return data
+
+        ports = dict(self._device.ports)
+        changed = self._polled is not None and ports != self._polled
+        self._polled = ports
+        self._set_interval(self._adaptive.success(changed, monotonic()))
+        return data
+
+    def _backoff(self):
+        # Failed polls are retried less often, to not add load to a switch that is struggling
+        if self._adaptive is not None:
+            self._set_interval(self._adaptive.failure(monotonic()))
+        elif self._stale_max_age:
+            interval = self.current_interval * ADAPTIVE_FAILURE_FACTOR
+            self._set_interval(min(interval, self._scan_interval * ADAPTIVE_FAILURE_MAX_FACTOR))
+
+    def _serve_stale(self, err: Exception) -> bool:
+        # Returns True if the last data can be served in place of the failed poll
+        confirmed = self._device.last_confirmed
+        if not self._stale_max_age or self.data is None or confirmed is None:
+            return False
+
+        age = (dt_util.utcnow() - confirmed).total_seconds()
+        if age > self._stale_max_age:
+            if self._serving_stale:
+                _LOGGER.warning(f"_serve_stale | Ports confirmed {age:.0f} seconds ago are too old to be served")
+                self._serving_stale = False
+            return False
+
+        if not self._serving_stale:
+            _LOGGER.warning(f"_serve_stale | Serving ports confirmed {age:.0f} seconds ago: {err}")
+            self._serving_stale = True
+            self._schedule_expiry()
+        return True
+
+    def _schedule_expiry(self):
+        self._cancel_expiry()
+        confirmed = self._device.last_confirmed
+        if confirmed is None:
+            return
+        age = (dt_util.utcnow() - confirmed).total_seconds()
+        self._unsub_expire = async_call_later(self.hass, max(self._stale_max_age - age, 0), self._expire_job)
+
+    def _cancel_expiry(self):
+        if self._unsub_expire is not None:
+            self._unsub_expire()
+            self._unsub_expire = None
+
+    @callback
+    def _async_expire_stale(self, _now) -> None:
+        self._unsub_expire = None
+        if not self._serving_stale:
+            return
+        _LOGGER.warning(f"_async_expire_stale | Ports are older than {self._stale_max_age} seconds, no longer served")
+        self._serving_stale = False
+        self.async_set_update_error(UpdateFailed("The switch didn't answer within the stale max age"))
+
+    @property
+    def skipped_updates(self) -> int:
+        """Return how many listener updates were skipped because their port didn't change."""
+        return self._device.metrics.counters["skipped_updates"]
+
+    async def _update_device(self):
+        metrics = self._device.metrics
+        requests = metrics.counters["requests"]
+        metrics.increment("polls")
+        try:
+            if self._scheduler is None:
+                with metrics.timer("poll"):
+                    data = await self._device.update()
+            else:
+                # Queued writes are sent first, so that they don't hold the slot of another switch
+                await self._device.wait_writes()
+                # Caps how many switches are polled at the same time, waiting for a slot is not timed
+                async with self._scheduler.limiter:
+                    with metrics.timer("poll"):
+                        data = await self._device.update()
+        except (CircuitOpenError, SnmpError) as err:
+            # The switch is unreachable, or not contacted until the circuit breaker allows a probe
+            metrics.increment("poll_failures")
+            raise UpdateFailed(str(err)) from err
+        except Exception:
+            metrics.increment("poll_failures")
+            raise
+        finally:
+            metrics.requests_per_poll.add(metrics.counters["requests"] - requests)
+
+        self._fire_mismatches()
+        return data
+
+    def _fire_mismatches(self):
+        entry_id = self.config_entry.entry_id if self.config_entry else None
+        for port, (expected, actual) in self._device.pop_mismatches().items():
+            _LOGGER.warning(
+                f"_fire_mismatches | Port {port} is {actual.admin_mode.value} after a write, "
+                f"status: {actual.status.value}, fault: {actual.fault_status.value}"
+            )
+            self._device.metrics.increment("write_mismatches")
+            self.hass.bus.async_fire(
+                EVENT_WRITE_MISMATCH,
+                {
+                    "entry_id": entry_id,
+                    "port": port,
+                    "expected": expected,
+                    "actual": actual.enabled,
+                    "status": actual.status.value,
+                    "fault_status": actual.fault_status.value,
+                },
+            )
+
+    @callback
+    def _schedule_verification(self):
+        # The delay restarts on each write, so that a burst of writes is verified with a single read
+        if self._unsub_verify is not None:
+            self._unsub_verify()
+        self._unsub_verify = async_call_later(self.hass, self._verify_delay, self._verify_job)
+
+    async def _async_verify(self, _now) -> None:
+        self._unsub_verify = None
+        if not self._device.pending:
+            # A poll already read the written ports
+            return
+
+        _LOGGER.debug(f"_async_verify | Verifying written ports {list(self._device.pending)}")
+        self._device.invalidate(REFRESH_GROUP_PORTS)
+        await self.async_refresh()
+
+    @callback
+    def async_request_event_refresh(self, message: str) -> None:
+        """Refresh the switch shortly after it reports an event.
+
+        The delay restarts on each event, so that a burst of events (e.g. a link and a PoE
+        change of the same port) is read with a single refresh.
+        """
+        _LOGGER.debug(f"async_request_event_refresh | Switch event: {message}")
+        if self._unsub_event is not None:
+            self._unsub_event()
+        self._unsub_event = async_call_later(self.hass, SYSLOG_DEBOUNCE, self._event_job)
+
+    async def _async_event_refresh(self, _now) -> None:
+        self._unsub_event = None
+        # Pages changed by the event may not be due yet
+        self._device.invalidate()
+        await self.async_refresh()
+
+    async def async_shutdown(self) -> None:
+        """Cancel any scheduled refresh or verification."""
+        if self._unsub_verify is not None:
+            self._unsub_verify()
+            self._unsub_verify = None
+        if self._unsub_event is not None:
+            self._unsub_event()
+            self._unsub_event = None
+        self._cancel_expiry()
+        await super().async_shutdown()
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Schedule the next refresh aligned to the phase assigned by the fleet scheduler.
+
+        Every reschedule goes through here, also after a write or an event refresh, so the
+        refreshes of a switch keep their phase.
+        """
+        if self._scheduler is None or self.update_interval is None:
+            super()._schedule_refresh()
+            return
+
+        if self.config_entry and self.config_entry.pref_disable_polling:
+            return
+
+        self._async_unsub_refresh()
+        loop = self.hass.loop
+        now = loop.time()
+        self._next_refresh = now + self._scheduler.delay(self, now, self.update_interval.total_seconds())
+        self._unsub_refresh = loop.call_at(self._next_refresh, self.hass.async_run_hass_job, self._job).cancel
+
+    @callback
+    def async_align_phase(self) -> None:
+        """Move the scheduled refresh to the current phase, e.g. after switches were added or removed."""
+        if self._unsub_refresh is not None:
+            self._schedule_refresh()
+
+    @callback
+    def async_set_updated_data(self, data) -> None:
+        """Manually update data after a write, starting a fast polling window in adaptive mode.
+
+        Written ports are pending until a read of the switch confirms them, and a verification
+        read is scheduled if enabled.
+        """
+        if self._adaptive is not None:
+            self._polled = dict(self._device.ports)
+            self._set_interval(self._adaptive.activity(monotonic()))
+        super().async_set_updated_data(data)
+        if self._verify_delay is not None and self._device.pending:
+            self._schedule_verification()
+
+    @callback
+    def async_update_options(
+        self,
+        scan_interval: int,
+        adaptive: Optional[AdaptiveInterval] = None,
+        verify_delay: Optional[float] = None,
+        stale_max_age: float = 0,
+    ) -> None:
+        """Apply changed polling options, without a reload of the config entry.
+
+        The next refresh is scheduled again with the new interval, aligned to the phase of
+        the switch if there is a scheduler.
+
+        Args:
+            scan_interval: The polling interval in seconds, or the initial one in adaptive mode.
+            adaptive: The bounds of the adaptive interval, None polls at a fixed interval.
+            verify_delay: Seconds after which written ports are read back, None disables it.
+            stale_max_age: Seconds the last data is served while the switch is unreachable, 0 disables it.
         """
+        self._verify_delay = verify_delay
+        if verify_delay is None and self._unsub_verify is not None:
+            self._unsub_verify()
+            self._unsub_verify = None
+
+        self._stale_max_age = stale_max_age
+        if self._serving_stale and stale_max_age:
+            self._schedule_expiry()
+        elif self._serving_stale:
+            self._async_expire_stale(None)
+        self._scan_interval = scan_interval
+        self._adaptive = adaptive
+        self._polled = None
+        interval: float = scan_interval
+        if adaptive is not None:
+            adaptive.current = min(max(scan_interval, adaptive.minimum), adaptive.maximum)
+            interval = adaptive.current
+        self._set_interval(interval)
+        self.async_align_phase()
+
+    def _set_interval(self, seconds: float):
+        interval = timedelta(seconds=seconds)
+        if interval != self.update_interval:
+            _LOGGER.debug(f"_set_interval | Polling every {seconds:.1f} seconds")
+            self.update_interval = interval
+
+    @callback
+    def async_add_inventory_listener(self, update_callback: Callable[[Set[str]], None]) -> CALLBACK_TYPE:
+        """Listen for ports that appear or disappear from the switch.
+
+        The callback receives all the port IDs, once ports are known and then every time
+        an update adds or removes a port.
+
+        Returns:
+            A callback to remove the listener.
+        """
+        self._inventory_listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._inventory_listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners of ports that changed since the last notification.
+
+        Entities register their port ID as listener context. Listeners without a context
+        are always updated, as well as all listeners when the availability changes, restored
+        ports are confirmed by the switch, or ports become or stop being stale. Ports that
+        become or stop being pending are updated too. Inventory listeners are notified first
+        if ports were added or removed.
+        """
+        inventory = {port for port, _ in self._device.ports}
+        if inventory != self._inventory:
+            _LOGGER.debug(f"async_update_listeners | Ports changed from {len(self._inventory)} to {len(inventory)}")
+            self._inventory = inventory
+            for inventory_callback in list(self._inventory_listeners):
+                inventory_callback(set(inventory))
+
+        changed = self._changed_ports()
+        skipped = 0
+        for update_callback, context in list(self._listeners.values()):
+            if changed is None or context is None or context in changed:
+                update_callback()
+            else:
+                skipped += 1
+
+        self._device.metrics.increment("skipped_updates", skipped)
+        _LOGGER.debug(f"async_update_listeners | Changed ports: {changed}, skipped updates: {skipped}")
+
+    def _changed_ports(self) -> Optional[Set[str]]:
+        # Returns None when every listener must be updated
+        ports = dict(self._device.ports)
+        pending = set(self._device.pending)
+        changed: Optional[Set[str]] = {
+            port for port in ports.keys() | self._snapshot.keys() if ports.get(port) != self._snapshot.get(port)
+        } | (pending ^ self._notified_pending)
+        if (
+            self._notified_success != self.last_update_success
+            or self._notified_restored != self._device.restored
+            or self._notified_stale != self._device.stale
+        ):
+            changed = None
 
-        return await self._device.update()
+        self._snapshot = ports
+        self._notified_pending = pending
+        self._notified_success = self.last_update_success
+        self._notified_restored = self._device.restored
+        self._notified_stale = self._device.stale
+        return changed
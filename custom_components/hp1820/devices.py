@@ -1,47 +1,120 @@
+import asyncio
 import logging
-from typing import Dict
+from datetime import datetime
+from time import monotonic
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 
 from aiohttp.client_exceptions import ClientResponseError
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.util import dt as dt_util
 
-from .client import Hp1820Client
+from .backend import Hp1820Backend, PartialWriteError
+from .client import SessionExpiredError
+from .const import (
+    CONF_PORTS_SCAN_INTERVAL,
+    CONF_POWER_SCAN_INTERVAL,
+    CONF_SESSION_IDLE_TIMEOUT,
+    PORTS_SCAN_INTERVAL_DEFAULT,
+    POWER_CYCLE_POLL_INTERVAL,
+    POWER_CYCLE_TIMEOUT,
+    POWER_SCAN_INTERVAL_DEFAULT,
+    REFRESH_GROUP_PORTS,
+    REFRESH_GROUP_POWER,
+    SESSION_IDLE_TIMEOUT_DEFAULT,
+    WRITE_DEBOUNCE,
+)
+from .metrics import Hp1820Metrics
+from .models import PoePortState, PoePowerStatus, PoeStatus, SwitchModel
+from .refresh import RefreshGroup
+from .session import Hp1820Session
+from .writer import Hp1820WriteQueue
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class Hp1820Device:
     """Hp1820Device class represents an Hp1820 switch. This method wraps around
-    a Hp1820Client so that it can be stateless and just return data,
-    while this class persists the status of the switch.
+    a Hp1820Backend (the web interface or SNMP client) so that it can be stateless and
+    just return data, while this class persists the status of the switch.
     """
 
-    def __init__(self, config: ConfigEntry, client: Hp1820Client):
-        self._ports: Dict[str, bool] = {}
+    def __init__(self, config: ConfigEntry, client: Hp1820Backend):
+        self._ports: Dict[str, PoePortState] = {}
+        # True while ports come from the cache and are not confirmed by the switch yet
+        self.restored = False
+        # Power drawn by the ports, None until read or if the firmware doesn't have the status page
+        self.power: Optional[PoePowerStatus] = None
+        self.power_supported = True
+        # Model detected from the ports, None until ports are known or if they match no model
+        self.model: Optional[SwitchModel] = None
+        # When the switch last answered a poll, and True while polls fail after that
+        self.last_confirmed: Optional[datetime] = None
+        self.stale = False
+        # Admin state of written ports, until a read of the switch confirms it
+        self.pending: Dict[str, bool] = {}
+        self._mismatches: Dict[str, Tuple[bool, PoePortState]] = {}
         self._config = config
         self._client = client
+        self._session = Hp1820Session(
+            client,
+            # Credentials are not used by SNMP, so they are optional with that backend
+            config.data.get(CONF_USERNAME, ""),
+            config.data.get(CONF_PASSWORD, ""),
+            config.options.get(CONF_SESSION_IDLE_TIMEOUT, SESSION_IDLE_TIMEOUT_DEFAULT),
+        )
+        self._writes = Hp1820WriteQueue(self._write_ports, WRITE_DEBOUNCE)
+        # Pages of the switch, each refreshed at its own cadence
+        self._groups = {
+            REFRESH_GROUP_PORTS: RefreshGroup(
+                REFRESH_GROUP_PORTS,
+                self._read_ports,
+                config.options.get(CONF_PORTS_SCAN_INTERVAL, PORTS_SCAN_INTERVAL_DEFAULT),
+            ),
+            REFRESH_GROUP_POWER: RefreshGroup(
+                REFRESH_GROUP_POWER,
+                self._read_power,
+                config.options.get(CONF_POWER_SCAN_INTERVAL, POWER_SCAN_INTERVAL_DEFAULT),
+            ),
+        }
 
     @property
     def ports(self):
         """Iterate over the device's ports.
         This property provides an iterator over the device's inventory, where each item is a tuple
-        containing the port's ID and its name.
+        containing the port's ID and its PoE state.
         Yields:
-            tuple: A tuple where the first item is the port ID and the second item is the port name.
+            tuple: A tuple where the first item is the port ID and the second item is the `PoePortState`.
         Example:
             >>> device = Hp1820Device()
             >>> list(device.ports)
-            [(1, 'enabled'), (2, 'disabled')]
+            [('1', PoePortState(interface='1', admin_mode=<AdminMode.ENABLED: 'enabled'>, ...)), ...]
         """
         _LOGGER.debug(f"ports | Ports: {self._ports.items()}")
         return self._ports.items()
 
+    @property
+    def metrics(self) -> Hp1820Metrics:
+        """Return the counters and latencies collected while talking to the switch."""
+        return self._client.metrics
+
+    def restore(self, ports: Dict[str, PoePortState]):
+        """Restore the last known ports, until the next update confirms them.
+
+        Args:
+            ports: The cached ports by ID.
+        """
+        self._ports = dict(ports)
+        self.model = SwitchModel.detect(self._ports)
+        self.restored = True
+
     async def update(self):
         """Updates the internal state of the device based on the latest data.
 
         This method performs the following actions:
-        1. Queries for the latest port status using the client.
-        2. Updates internal state for ports' status.
+        1. Waits for queued writes, so that the poll doesn't race with them.
+        2. Queries for the latest port status and power using the client, within a single session.
+        3. Updates internal state for ports' status and power.
 
         Returns:
             dict: A dictionary containing the latest retrieved port status.
@@ -51,19 +124,114 @@ class Hp1820Device:
 
         Attributes updated:
             _ports (dict): Updated ports.
+            power (PoePowerStatus): Updated power drawn by the ports.
+            last_confirmed (datetime): When the switch answered, if it did.
+            stale (bool): True if the switch didn't answer, so that ports are the last known ones.
         """
+        await self._writes.wait_idle()
+        started = monotonic()
+        due = [group for group in self._groups.values() if group.due(started)]
+        if not due:
+            _LOGGER.debug("update | No page is due, serving the last read")
+            return self._ports
+
         try:
-            await self._login()
-            ports = await self._client.get_poe_state()
-            _LOGGER.debug(f"update | Succesfully fetched ports status: {ports}")
-            self._ports.update(ports)
+            results = await self._session.call(self._read_pages, due)
         except ClientResponseError as err:
+            self.stale = True
             _LOGGER.error(f"update | Error getting ports status: {err.message}")
             raise err
-        finally:
-            await self._logout()
+        except Exception:
+            self.stale = True
+            raise
+
+        self.last_confirmed = dt_util.utcnow()
+        self.stale = False
+
+        for group in due:
+            group.refreshed(started)
+        if REFRESH_GROUP_PORTS in results:
+            ports = results[REFRESH_GROUP_PORTS]
+            _LOGGER.debug(f"update | Succesfully fetched ports status: {ports}")
+            self._apply_read(ports)
+        if REFRESH_GROUP_POWER in results:
+            self.power = results[REFRESH_GROUP_POWER]
         return self._ports
 
+    def invalidate(self, *groups: str):
+        """Read pages on the next update, regardless of their refresh interval.
+
+        Args:
+            *groups: The refresh groups to read (e.g. `REFRESH_GROUP_PORTS`), all if none is given.
+        """
+        for name, group in self._groups.items():
+            if not groups or name in groups:
+                group.invalidate()
+
+    def apply_options(self, options: Mapping[str, Any]):
+        """Apply changed options without recreating the device.
+
+        The refresh intervals of the pages take effect from the next update, while the
+        idle timeout restarts the countdown of the open session.
+
+        Args:
+            options: The options of the config entry.
+        """
+        self._groups[REFRESH_GROUP_PORTS].interval = options.get(CONF_PORTS_SCAN_INTERVAL, PORTS_SCAN_INTERVAL_DEFAULT)
+        self._groups[REFRESH_GROUP_POWER].interval = options.get(CONF_POWER_SCAN_INTERVAL, POWER_SCAN_INTERVAL_DEFAULT)
+        self._session.set_idle_timeout(options.get(CONF_SESSION_IDLE_TIMEOUT, SESSION_IDLE_TIMEOUT_DEFAULT))
+
+    def pop_mismatches(self) -> Dict[str, Tuple[bool, PoePortState]]:
+        """Return and forget the written ports that the switch didn't apply.
+
+        Returns:
+            dict: The expected admin state and the state read from the switch, by port ID.
+        """
+        mismatches, self._mismatches = self._mismatches, {}
+        return mismatches
+
+    def _apply_read(self, ports: Dict[str, PoePortState]):
+        # The table lists all the ports, so ports that are gone (e.g. a smaller switch) are dropped
+        self._confirm_pending(ports)
+        self._ports = dict(ports)
+        self.model = SwitchModel.detect(self._ports)
+        self.restored = False
+
+    def _confirm_pending(self, ports: Dict[str, PoePortState]):
+        # The switch may refuse a change (e.g. when the power budget is exceeded)
+        for port, expected in self.pending.items():
+            if port in ports and ports[port].enabled != expected:
+                self._mismatches[port] = (expected, ports[port])
+        self.pending = {port: state for port, state in self.pending.items() if port not in ports}
+
+    async def _read_pages(self, groups: List[RefreshGroup]) -> Dict[str, Any]:
+        # Due pages are read within the same session call, so that a poll logs in at most once
+        return {group.name: await group.fetch() for group in groups}
+
+    async def _read_ports(self) -> Dict[str, PoePortState]:
+        return await self._client.get_poe_state()
+
+    async def _read_power(self) -> Optional[PoePowerStatus]:
+        if not self.power_supported:
+            return None
+
+        try:
+            return await self._client.get_poe_power()
+        except SessionExpiredError:
+            # Some firmwares answer with the login page instead of a missing page. If the ports
+            # page can still be read the session is alive, otherwise its error renews the session.
+            await self._client.get_poe_state()
+            _LOGGER.warning("_read_power | PoE power is not available on this switch: the page requires a login")
+            self.power_supported = False
+            return None
+        except (ClientResponseError, ValueError) as err:
+            # Only a missing page or table means that the firmware doesn't have it, other errors fail the poll
+            if isinstance(err, ClientResponseError) and err.status != 404:
+                raise
+            _LOGGER.warning(f"_read_power | PoE power is not available on this switch: {err}")
+            self.power_supported = False
+            return None
+
     def get_port_state(self, port: str) -> bool:
         """Get the status of a port specified by id.
 
@@ -74,8 +242,24 @@ class Hp1820Device:
             bool: True if enabled, False if disabled.
         """
 
+        return self.get_port(port).enabled
+
+    def has_port(self, port: str) -> bool:
+        """Return True if the switch reported the port in its last table."""
+        return port in self._ports
+
+    def get_port(self, port: str) -> PoePortState:
+        """Get the full PoE state of a port specified by id.
+
+        Parameters:
+            port (str): The port ID.
+
+        Returns:
+            PoePortState: All the columns of the PoE configuration table for the port.
+        """
+
         if port not in self._ports:
-            raise ValueError(f"get_port_state | Port {port} not found")
+            raise ValueError(f"get_port | Port {port} not found")
 
         return self._ports[port]
 
@@ -83,6 +267,8 @@ class Hp1820Device:
         """
         Set poe status for a specified port.
 
+        Concurrent requests are queued and written together, see `Hp1820WriteQueue`.
+
         Args:
             port: The ID of the port to change.
             status: The status to set the port to.
@@ -101,37 +287,301 @@ class Hp1820Device:
         if port not in self._ports:
             raise ValueError(f"set_port_state | Port {port} not found")
 
+        return await self._writes.submit({port: state})
+
+    async def set_ports_state(self, states: Dict[str, bool]) -> bool:
+        """
+        Set poe status for multiple ports at once.
+
+        Ports that share the same target status are updated with a single request, and
+        concurrent requests are queued and written together.
+
+        Args:
+            states: A dictionary mapping each port ID to the status to set.
+
+        Raises:
+            ValueError: If any of the ports is unknown.
+
+        Example:
+            To turn off ports with ID '1' and '2' and turn on port '3', use:
+            >>> await device.set_ports_state({"1": False, "2": False, "3": True})
+        """
+
+        unknown = [port for port in states if port not in self._ports]
+        if unknown:
+            raise ValueError(f"set_ports_state | Ports {unknown} not found")
+
+        return await self._writes.submit(dict(states))
+
+    async def apply_config(
+        self,
+        config: Dict[str, str],
+        ports: Optional[List[str]] = None,
+        power_limit: Optional[float] = None,
+    ) -> Dict[str, bool]:
+        """
+        Apply a PoE configuration to ports, writing only the ports that don't have it yet.
+
+        Ports are compared with the last read of the switch, and ports that end up with the
+        same configuration are written with a single request.
+
+        Args:
+            config: The values to set by `PoePortState` field (e.g. `{"priority": "high"}`),
+                    using the identifiers of the configuration form.
+            ports: The IDs of the ports to configure, all ports if None.
+            power_limit: The user defined limit in W. As it's not part of the PoE table, it
+                         can't be compared and all the ports are written when it's set.
+
+        Returns:
+            dict: Whether each port that needed a change was written, by port ID. Ports are
+                  written in groups, so a failure affects only the ports of the failed groups.
+
+        Raises:
+            ValueError: If any of the ports or of the fields is unknown, or if the backend
+                        can't write a field (e.g. SNMP only writes the admin mode and the priority).
+
+        Example:
+            To set the priority of all ports to high and turn on port '3', use:
+            >>> await device.apply_config({"priority": "high"})
+            >>> await device.apply_config({"admin_mode": "enabled"}, ["3"])
+        """
+
+        ports = list(self._ports) if ports is None else ports
+        unknown = [port for port in ports if port not in self._ports]
+        if unknown:
+            raise ValueError(f"apply_config | Ports {unknown} not found")
+        fields = PoePortState.__annotations__
+        invalid = [field for field in config if field not in self._client.config_fields]
+        if power_limit is not None and "limit_type" not in self._client.config_fields:
+            invalid.append("power_limit")
+        if invalid:
+            raise ValueError(f"apply_config | Fields {invalid} not supported")
+
+        desired = {field: fields[field].parse(value) for field, value in config.items()}
+        unsupported = {field: value for field, value in config.items() if desired[field].value == "unknown"}
+        if unsupported:
+            raise ValueError(f"apply_config | Values {unsupported} not supported")
+        targets = {}
+        for port in ports:
+            current = self._ports[port]
+            if power_limit is not None or any(getattr(current, field) != value for field, value in desired.items()):
+                targets[port] = current._replace(**desired)
+        if not targets:
+            _LOGGER.debug(f"apply_config | Ports {ports} already have {config}")
+            return {}
+
+        return await self._write_config(targets, power_limit)
+
+    async def apply_states(self, states: Dict[str, PoePortState], ports: Optional[List[str]] = None) -> Dict[str, bool]:
+        """
+        Apply the configuration of each port, e.g. from a snapshot, writing only the ports that differ.
+
+        Only the fields set by the configuration form and written by the backend are applied, while
+        the status of the ports and settings with unknown values are kept. Ports that are not on the switch are skipped,
+        so that a snapshot of a larger switch can be applied to a smaller one.
+
+        Args:
+            states: The target `PoePortState` of each port.
+            ports: The IDs of the ports to apply, all ports of `states` if None.
+
+        Returns:
+            dict: Whether each port that needed a change was written, by port ID.
+        """
+
+        ports = list(states) if ports is None else [port for port in ports if port in states]
+        missing = [port for port in ports if port not in self._ports]
+        if missing:
+            _LOGGER.warning(f"apply_states | Skipping ports {missing} not found on the switch")
+
+        targets = {}
+        for port in ports:
+            current = self._ports.get(port)
+            if current is None:
+                continue
+            # Values that were unknown when the snapshot was taken keep the current setting
+            values = {field: getattr(states[port], field) for field in self._client.config_fields}
+            target = current._replace(**{field: value for field, value in values.items() if value != "unknown"})
+            if target != current:
+                targets[port] = target
+        if not targets:
+            _LOGGER.debug(f"apply_states | Ports {ports} already have the target configuration")
+            return {}
+
+        return await self._write_config(targets)
+
+    async def _write_config(
+        self, targets: Dict[str, PoePortState], power_limit: Optional[float] = None
+    ) -> Dict[str, bool]:
+        # Writes the whole configuration of the ports within a single session
+        # Queued changes are written first, so that they are not overwritten by this write
+        await self._writes.wait_idle()
+        configs = {port: target.to_config(power_limit=power_limit) for port, target in targets.items()}
+        written = list(targets)
         try:
-            await self._login()
-            await self._client.set_poe_state(port, state)
-            self._ports[port] = state
-            _LOGGER.debug(f"set_port_state | Succesfully set poe status for port: {port} to {state}")
-            return True
+            await self._session.call(self._client.set_ports_config, configs)
+        except PartialWriteError as err:
+            _LOGGER.error(f"_write_config | Error while configuring ports {list(targets)}: {err}")
+            written = err.written
         except Exception as err:
-            _LOGGER.error(f"set_port_state | Error while setting poe status for port {port} to {state}: {err}")
-            return False
-        finally:
-            await self._logout()
+            _LOGGER.error(f"_write_config | Error while configuring ports {list(targets)}: {err}")
+            return {port: False for port in targets}
+
+        # Groups written before a failure are applied by the switch
+        self._ports.update({port: targets[port] for port in written})
+        self.pending.update({port: targets[port].enabled for port in written})
+        _LOGGER.debug(f"_write_config | Succesfully configured ports {written}")
+        return {port: port in written for port in targets}
 
-    async def _login(self):
-        """Establish a connection with the Hp1820 switch, to retrieve an access
-        token. This method stores the auth information in the client object
-        and is used automatically when other methods are called.
+    async def power_cycle(
+        self,
+        ports: List[str],
+        off_time: float,
+        batch_size: Optional[int] = None,
+        batch_delay: float = 0,
+        wait: bool = False,
+        timeout: float = POWER_CYCLE_TIMEOUT,
+        on_change: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
         """
-        try:
-            username = self._config.data[CONF_USERNAME]
-            password = self._config.data[CONF_PASSWORD]
-            await self._client.login(username, password)
-            _LOGGER.debug("_login | Succesfully logged in")
-        except ClientResponseError as err:
-            _LOGGER.error(f"_login | Error while logging: {err}")
-            raise err
+        Power cycle ports in batches, to limit the inrush current drawn from the PoE budget.
+
+        Each batch is turned off and on again with a bulk write, within the session kept open
+        with the switch. Ports that are turned off are skipped, so that they stay off. If a
+        write fails, the remaining batches are not cycled.
+
+        Args:
+            ports: The IDs of the ports to power cycle.
+            off_time: Seconds each port stays off.
+            batch_size: How many ports are cycled together, all ports if None.
+            batch_delay: Seconds between the end of a batch and the start of the next one.
+            wait: If True, the next batch starts only after the ports of the current one deliver
+                  power again, or after `timeout` seconds.
+            timeout: Seconds to wait for the ports of a batch to deliver power.
+            on_change: Called every time the state of the ports changes, e.g. to update entities.
+
+        Returns:
+            dict: The result of each port, by port ID. Each result has a `status` (`cycled`,
+                  `skipped`, `failed`, `timeout` or `not_run`), and the seconds since the start
+                  when the port was turned `off`, turned `on` and started `delivering` power.
+
+        Raises:
+            ValueError: If any of the ports is unknown.
+        """
+
+        unknown = [port for port in ports if port not in self._ports]
+        if unknown:
+            raise ValueError(f"power_cycle | Ports {unknown} not found")
+
+        started = monotonic()
+
+        def elapsed() -> float:
+            return round(monotonic() - started, 2)
 
-    async def _logout(self):
-        """Close the connection with the Hp1820 switch."""
+        results: Dict[str, Dict[str, Any]] = {
+            port: {"status": "not_run", "off": None, "on": None, "delivering": None} for port in ports
+        }
+        enabled = [port for port in dict.fromkeys(ports) if self._ports[port].enabled]
+        for port in set(ports) - set(enabled):
+            results[port]["status"] = "skipped"
+        size = batch_size or len(enabled) or 1
+        batches = []
+        for start in range(0, len(enabled), size):
+            end = start + size
+            batches.append(enabled[start:end])
+
+        for index, batch in enumerate(batches):
+            if index and batch_delay:
+                await asyncio.sleep(batch_delay)
+
+            _LOGGER.debug(f"power_cycle | Turning off ports {batch}")
+            if not await self.set_ports_state({port: False for port in batch}):
+                for port in batch:
+                    results[port]["status"] = "failed"
+                break
+            for port in batch:
+                results[port]["off"] = elapsed()
+            if on_change is not None:
+                on_change()
+
+            await asyncio.sleep(off_time)
+            _LOGGER.debug(f"power_cycle | Turning on ports {batch}")
+            if not await self.set_ports_state({port: True for port in batch}):
+                # Ports are left off, the user must be aware of it
+                _LOGGER.error(f"power_cycle | Unable to turn on ports {batch} after a power cycle")
+                for port in batch:
+                    results[port]["status"] = "failed"
+                break
+            for port in batch:
+                results[port]["on"] = elapsed()
+                results[port]["status"] = "cycled"
+            if on_change is not None:
+                on_change()
+
+            if wait and not await self._wait_delivering(batch, timeout, results, elapsed, on_change):
+                _LOGGER.warning(f"power_cycle | Ports of batch {batch} not delivering power after {timeout}s")
+
+        return results
+
+    async def _wait_delivering(
+        self,
+        ports: List[str],
+        timeout: float,
+        results: Dict[str, Dict[str, Any]],
+        elapsed: Callable[[], float],
+        on_change: Optional[Callable[[], None]],
+    ) -> bool:
+        # Reads the switch until the ports deliver power, recording when each of them does
+        waiting = set(ports)
+        deadline = monotonic() + timeout
+        while waiting:
+            await asyncio.sleep(POWER_CYCLE_POLL_INTERVAL)
+            try:
+                read = await self._session.call(self._read_ports)
+            except Exception as err:
+                _LOGGER.warning(f"_wait_delivering | Error while reading ports status: {err}")
+            else:
+                self._apply_read(read)
+                if on_change is not None:
+                    on_change()
+                for port in list(waiting):
+                    if port in read and read[port].status is PoeStatus.DELIVERING:
+                        results[port]["delivering"] = elapsed()
+                        waiting.discard(port)
+            if waiting and monotonic() >= deadline:
+                for port in waiting:
+                    results[port]["status"] = "timeout"
+                return False
+        return True
+
+    async def _write_ports(self, states: Dict[str, bool]) -> Dict[str, bool]:
+        # Writes a batch of the queue within a single session, returning the result of each port
+        written = list(states)
         try:
-            await self._client.logout()
-            _LOGGER.debug("_logout | Succesfully logged out")
-        except ClientResponseError as err:
-            _LOGGER.error(f"_logout | Error while logging out: {err}")
-            raise err
+            current = {port: self._ports[port] for port in states}
+            if len(states) == 1:
+                [(port, state)] = states.items()
+                await self._session.call(self._client.set_poe_state, port, state, current[port])
+            else:
+                await self._session.call(self._client.set_ports_state, states, current)
+        except PartialWriteError as err:
+            _LOGGER.error(f"_write_ports | Error while setting poe status for ports {states}: {err}")
+            written = err.written
+        except Exception as err:
+            _LOGGER.error(f"_write_ports | Error while setting poe status for ports {states}: {err}")
+            return {port: False for port in states}
+
+        # Groups written before a failure are applied by the switch
+        for port in written:
+            self._ports[port] = current[port].with_enabled(states[port])
+            self.pending[port] = states[port]
+        _LOGGER.debug(f"_write_ports | Succesfully set poe status for ports: {written}")
+        return {port: port in written for port in states}
+
+    async def wait_writes(self):
+        """Wait until the queued writes are sent to the switch."""
+        await self._writes.wait_idle()
+
+    async def close(self):
+        """Close the session with the Hp1820 switch, once queued writes are done."""
+        await self._writes.wait_idle()
+        await self._session.close()
@@ -0,0 +1,41 @@
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CONF_SNMP_COMMUNITY,
+    DOMAIN,
+    KEY_COORDINATOR,
+    KEY_DEVICE,
+    KEY_SCHEDULER,
+)
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD, CONF_SNMP_COMMUNITY}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, config: ConfigEntry) -> Dict[str, Any]:
+    """Return diagnostics for a config entry.
+
+    Credentials are redacted. The polling schedule covers all switches, so that the
+    phase of this switch can be compared with the others. Metrics are included also
+    when their sensors are disabled, latencies are in seconds.
+    """
+    device = hass.data[DOMAIN][config.entry_id][KEY_DEVICE]
+    coordinator = hass.data[DOMAIN][config.entry_id][KEY_COORDINATOR]
+    scheduler = hass.data[DOMAIN][KEY_SCHEDULER]
+    return {
+        "data": async_redact_data(dict(config.data), TO_REDACT),
+        "options": async_redact_data(dict(config.options), TO_REDACT),
+        "interval": coordinator.current_interval,
+        "schedule": scheduler.schedule(hass.loop.time()),
+        "metrics": {
+            "counters": dict(device.metrics.counters),
+            "latencies": {
+                name: {"p50": samples.percentile(50), "p95": samples.percentile(95), "samples": len(samples)}
+                for name, samples in device.metrics.latencies.items()
+            },
+        },
+    }
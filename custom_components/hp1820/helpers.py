@@ -1,7 +1,11 @@
+from typing import Iterable, List, Optional
+
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.util import slugify
 
 from .const import CONF_SYSTEM_IP, DOMAIN
+from .models import SwitchModel
 
 
 def generate_entity_id(config: ConfigEntry, name: str) -> str:
@@ -35,3 +39,68 @@ def generate_entity_id(config: ConfigEntry, name: str) -> str:
     # See: https://www.home-assistant.io/faq/unique_id/#can-be-changed
     entity_name = slugify(f"{ip}_{name}")
     return f"{DOMAIN}.{entity_name}"
+
+
+def device_info(config: ConfigEntry, model: Optional[SwitchModel] = None) -> DeviceInfo:
+    """Describe the switch of a config entry, so that its entities are grouped in a single device.
+
+    Args:
+        config (ConfigEntry): The configuration entry of the switch.
+        model (SwitchModel): The model detected from the ports of the switch, if known.
+
+    Returns:
+        DeviceInfo: The device registry entry of the switch, identified by the config entry.
+
+    Example:
+        >>> config.data = {"system_ip": "192.168.1.2"}
+        >>> device_info(config)
+        {"identifiers": {("hp1820", "<entry_id>")}, "name": "HP 1820 192.168.1.2", ...}
+    """
+    ip = config.data.get(CONF_SYSTEM_IP)
+    return DeviceInfo(
+        identifiers={(DOMAIN, config.entry_id)},
+        name=f"HP 1820 {ip}",
+        manufacturer="HP",
+        model=model.name if model else "1820",
+        configuration_url=f"http://{ip}",
+    )
+
+
+def format_interfaces(ports: Iterable[str]) -> str:
+    """Format a list of ports as the compact interface string accepted by the switch.
+
+    Consecutive numeric ports are collapsed into ranges, while any other identifier
+    is kept as it is.
+
+    Args:
+        ports (Iterable[str]): The port IDs to format.
+
+    Returns:
+        str: A comma separated list of ports and port ranges.
+
+    Raises:
+        ValueError: If no ports are provided
+
+    Example:
+        >>> format_interfaces(["1", "2", "3", "5", "7", "8"])
+        "1-3,5,7-8"
+    """
+    ports = list(ports)
+    numbers = sorted({int(port) for port in ports if port.isdigit()})
+    others = sorted({port for port in ports if not port.isdigit()})
+    if not numbers and not others:
+        raise ValueError("ports are mandatory")
+
+    ranges: List[str] = []
+    start = end = None
+    for number in numbers:
+        if end is not None and number == end + 1:
+            end = number
+            continue
+        if start is not None:
+            ranges.append(f"{start}" if start == end else f"{start}-{end}")
+        start = end = number
+    if start is not None:
+        ranges.append(f"{start}" if start == end else f"{start}-{end}")
+
+    return ",".join(ranges + others)
@@ -0,0 +1,75 @@
+import logging
+from typing import Callable, Dict, Iterable, List, Set
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .coordinator import Hp1820Coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Hp1820PortInventory:
+    """Hp1820PortInventory keeps the port entities of a platform in line with the ports of the switch.
+
+    Entities are created for ports reported by the switch, and removed when a port is no
+    longer reported (e.g. after the switch is replaced by a smaller model). Removed entities
+    keep their registry entry and are shown as unavailable, so that a port that comes back
+    keeps its name and settings.
+
+    Args:
+        hass: The Home Assistant instance.
+        config: The config entry of the switch.
+        create: Builds the entities of a port, given its ID.
+        async_add_entities: Adds the entities to the platform.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config: ConfigEntry,
+        create: Callable[[str], List[Entity]],
+        async_add_entities: AddEntitiesCallback,
+    ):
+        self._hass = hass
+        self._config = config
+        self._create = create
+        self._add_entities = async_add_entities
+        self._entities: Dict[str, List[Entity]] = {}
+
+    @property
+    def ports(self) -> Set[str]:
+        """Return the IDs of the ports that have entities."""
+        return set(self._entities)
+
+    @callback
+    def async_track(self, coordinator: Hp1820Coordinator, ports: Iterable[str]) -> CALLBACK_TYPE:
+        """Create the entities of the known ports, and follow the inventory of the coordinator.
+
+        Returns:
+            A callback to stop following the inventory.
+        """
+        self.async_update(set(ports))
+        return coordinator.async_add_inventory_listener(self.async_update)
+
+    @callback
+    def async_update(self, ports: Set[str]) -> None:
+        """Add the entities of new ports and remove the ones of ports that are gone."""
+        added = sorted(ports - self._entities.keys(), key=lambda port: port.zfill(2))
+        removed = self._entities.keys() - ports
+        entities: List[Entity] = []
+        for port in added:
+            self._entities[port] = self._create(port)
+            entities += self._entities[port]
+        if entities:
+            _LOGGER.debug(f"async_update | Adding entities of ports {added}")
+            self._add_entities(entities)
+
+        for port in removed:
+            _LOGGER.debug(f"async_update | Removing entities of port {port}")
+            for entity in self._entities.pop(port):
+                # Entities that were not added yet have nothing to remove
+                if entity.platform is not None:
+                    self._config.async_create_task(self._hass, entity.async_remove(), f"remove {entity.entity_id}")
@@ -0,0 +1,80 @@
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional
+
+from .const import METRICS_WINDOW
+
+
+class RingBuffer:
+    """RingBuffer keeps the last `size` samples of a measure, to compute rolling percentiles."""
+
+    def __init__(self, size: int = METRICS_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, value: float):
+        """Add a sample, dropping the oldest one if the buffer is full."""
+        self._samples.append(value)
+
+    @property
+    def last(self) -> Optional[float]:
+        """Return the last sample, or None if there are no samples."""
+        return self._samples[-1] if self._samples else None
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Return the percentile of the samples, using the nearest-rank method.
+
+        Args:
+            percent: The percentile to compute, between 0 and 100.
+
+        Returns:
+            float: The sample at the given percentile, or None if there are no samples.
+        """
+        if not self._samples:
+            return None
+
+        samples = sorted(self._samples)
+        rank = max(int(-(-percent * len(samples) // 100)), 1)
+        return samples[min(rank, len(samples)) - 1]
+
+
+class Hp1820Metrics:
+    """Hp1820Metrics collects counters and latencies of a switch.
+
+    Counters grow for the whole life of the entry, while latencies, in seconds, are kept
+    in fixed-size ring buffers so that the cost of collecting them doesn't grow over time.
+
+    Example:
+        >>> metrics = Hp1820Metrics()
+        >>> with metrics.timer("login"):
+        ...     await client.login(username, password)
+        >>> metrics.latencies["login"].percentile(95)
+        0.042
+    """
+
+    LATENCIES = ("poll", "login", "fetch", "parse", "write")
+
+    def __init__(self, size: int = METRICS_WINDOW):
+        self.counters: Counter = Counter()
+        self.latencies: Dict[str, RingBuffer] = {name: RingBuffer(size) for name in self.LATENCIES}
+        self.requests_per_poll = RingBuffer(size)
+
+    def increment(self, name: str, value: int = 1):
+        """Increment a counter."""
+        self.counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        """Add a latency sample, in seconds."""
+        self.latencies[name].add(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Measure the time spent in the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
@@ -0,0 +1,283 @@
+from enum import Enum
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+
+class PoeEnum(str, Enum):
+    """Base class for the values shown in the PoE configuration table.
+
+    Each member value is the identifier used by the configuration form, while labels
+    rendered in the table are mapped through `_aliases`. Any label that is not known
+    is parsed as `UNKNOWN`, so that a firmware update can't break the polling.
+    """
+
+    @classmethod
+    def _aliases(cls) -> Dict[str, str]:
+        return {}
+
+    @classmethod
+    def parse(cls, label: str):
+        """Return the member matching a label of the PoE configuration table."""
+        key = " ".join(str(label).lower().split())
+        key = cls._aliases().get(key, key)
+        for member in cls:
+            if key in (member.value, member.name.lower().replace("_", " ")):
+                return member
+        return cls("unknown")
+
+
+class AdminMode(PoeEnum):
+    ENABLED = "enabled"
+    DISABLED = "disabled"
+    UNKNOWN = "unknown"
+
+    @classmethod
+    def _aliases(cls) -> Dict[str, str]:
+        return {"enable": "enabled", "disable": "disabled"}
+
+
+class Priority(PoeEnum):
+    CRITICAL = "critical"
+    HIGH = "high"
+    LOW = "low"
+    UNKNOWN = "unknown"
+
+
+class Schedule(PoeEnum):
+    NONE = "none"
+    SCHEDULE_1 = "1"
+    SCHEDULE_2 = "2"
+    UNKNOWN = "unknown"
+
+
+class HighPowerMode(PoeEnum):
+    DOT3AT = "dot3at"
+    DISABLE = "disable"
+    UNKNOWN = "unknown"
+
+    @classmethod
+    def _aliases(cls) -> Dict[str, str]:
+        return {"enable": "dot3at", "enabled": "dot3at", "802.3at": "dot3at", "disabled": "disable"}
+
+
+class DetectType(PoeEnum):
+    DOT3AF = "4pt_dot3af"
+    DOT3AF_LEGACY = "4pt_dot3af_leg"
+    UNKNOWN = "unknown"
+
+    @classmethod
+    def _aliases(cls) -> Dict[str, str]:
+        return {"4pt 802.3af": "4pt_dot3af", "4pt 802.3af + legacy": "4pt_dot3af_leg"}
+
+
+class LimitType(PoeEnum):
+    DOT3AF = "dot3af"
+    USER = "user"
+    UNKNOWN = "unknown"
+
+    @classmethod
+    def _aliases(cls) -> Dict[str, str]:
+        return {"class based": "dot3af", "802.3af": "dot3af", "user defined": "user"}
+
+
+class PoeStatus(PoeEnum):
+    DELIVERING = "delivering"
+    SEARCHING = "searching"
+    DISABLED = "disabled"
+    FAULT = "fault"
+    OTHER_FAULT = "other_fault"
+    TEST = "test"
+    UNKNOWN = "unknown"
+
+    @classmethod
+    def _aliases(cls) -> Dict[str, str]:
+        return {"delivering power": "delivering", "other fault": "other_fault"}
+
+
+class FaultStatus(PoeEnum):
+    NO_ERROR = "no_error"
+    MPS_ABSENT = "mps_absent"
+    SHORT = "short"
+    OVERLOAD = "overload"
+    POWER_DENIED = "power_denied"
+    THERMAL_SHUTDOWN = "thermal_shutdown"
+    STARTUP_FAILURE = "startup_failure"
+    UNKNOWN = "unknown"
+
+
+class PoePortState(NamedTuple):
+    """PoePortState holds a row of the PoE configuration table (`poe_port_cfg.lsp`).
+
+    Columns are, in order: 'Interface', 'Admin Mode', 'Priority', 'Schedule', 'High Power Mode',
+    'Power Detect Type', 'Power Limit Type', 'Status', 'Fault Status'.
+    """
+
+    interface: str
+    admin_mode: AdminMode = AdminMode.UNKNOWN
+    priority: Priority = Priority.UNKNOWN
+    schedule: Schedule = Schedule.UNKNOWN
+    high_power_mode: HighPowerMode = HighPowerMode.UNKNOWN
+    detect_type: DetectType = DetectType.UNKNOWN
+    limit_type: LimitType = LimitType.UNKNOWN
+    status: PoeStatus = PoeStatus.UNKNOWN
+    fault_status: FaultStatus = FaultStatus.UNKNOWN
+
+    @classmethod
+    def from_row(cls, row: List[str]) -> "PoePortState":
+        """Build the record from a row of the table, missing columns are parsed as unknown."""
+        columns = list(row) + [""] * (9 - len(row))
+        return cls(
+            str(columns[0]),
+            AdminMode.parse(columns[1]),
+            Priority.parse(columns[2]),
+            Schedule.parse(columns[3]),
+            HighPowerMode.parse(columns[4]),
+            DetectType.parse(columns[5]),
+            LimitType.parse(columns[6]),
+            PoeStatus.parse(columns[7]),
+            FaultStatus.parse(columns[8]),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PoePortState":
+        """Build the record from the output of `to_dict`, missing fields are parsed as unknown."""
+        values: Dict[str, Any] = {}
+        for field, kind in cls.__annotations__.items():
+            if field == "interface":
+                values[field] = str(data[field])
+            else:
+                values[field] = kind.parse(data.get(field, "unknown"))
+        return cls(**values)
+
+    def to_dict(self) -> Dict[str, str]:
+        """Return the record as a JSON serializable dictionary."""
+        return {field: str(getattr(value, "value", value)) for field, value in self._asdict().items()}
+
+    @property
+    def enabled(self) -> bool:
+        """Return True if PoE is administratively enabled on the port."""
+        return self.admin_mode is AdminMode.ENABLED
+
+    def with_enabled(self, enabled: bool) -> "PoePortState":
+        """Return a copy of the record with the given admin mode."""
+        return self._replace(admin_mode=AdminMode.ENABLED if enabled else AdminMode.DISABLED)
+
+    def to_config(self, enabled: Optional[bool] = None, power_limit: Optional[float] = None) -> Dict[str, str]:
+        """Return the configuration form values that keep the current port settings.
+
+        Args:
+            enabled: The admin mode to set, or None to keep the current one.
+            power_limit: The user defined limit in W, or None to leave it to the switch.
+
+        Returns:
+            dict: The values expected by `Hp1820Client._set_poe_state_extended`.
+        """
+        enabled = self.enabled if enabled is None else enabled
+        return {
+            "admin_mode_sel": "enabled" if enabled else "disabled",
+            "schedule_sel": _known(self.schedule, Schedule.NONE),
+            "priority_sel": _known(self.priority, Priority.LOW),
+            "high_power_mode_sel": _known(self.high_power_mode, HighPowerMode.DISABLE),
+            "power_detect_type_sel": _known(self.detect_type, DetectType.DOT3AF),
+            "power_limit_type_sel": _known(self.limit_type, LimitType.DOT3AF),
+            # The user defined limit is not part of the table
+            "power_limit": "" if power_limit is None else f"{power_limit:g}",
+        }
+
+
+# Fields of `PoePortState` that are set by the configuration form, the others are read-only status
+CONFIG_FIELDS = ("admin_mode", "priority", "schedule", "high_power_mode", "detect_type", "limit_type")
+
+
+def _known(value: PoeEnum, default: PoeEnum) -> str:
+    # Unknown values can't be submitted, so the firmware default is used instead
+    return default.value if value.value == "unknown" else value.value
+
+
+class SwitchModel(NamedTuple):
+    """SwitchModel describes a PoE model of the HP 1820 family.
+
+    The PoE table lists only the ports that can supply power, which are the first half of
+    the ports of each model.
+    """
+
+    name: str
+    ports: int
+    poe_ports: int
+
+    @classmethod
+    def detect(cls, ports: Iterable[str]) -> Optional["SwitchModel"]:
+        """Return the smallest model with all the given PoE ports, None if no model has them.
+
+        Example:
+            >>> SwitchModel.detect(["1", "2", "12"])
+            SwitchModel(name='1820-24G-PoE+', ports=24, poe_ports=12)
+        """
+        numbers = [int(port) for port in ports if port.isdigit()]
+        if not numbers:
+            return None
+        highest = max(max(numbers), len(numbers))
+        return next((model for model in SWITCH_MODELS if highest <= model.poe_ports), None)
+
+
+SWITCH_MODELS = (
+    SwitchModel("1820-8G-PoE+", 8, 4),
+    SwitchModel("1820-24G-PoE+", 24, 12),
+    SwitchModel("1820-48G-PoE+", 48, 24),
+)
+
+
+class PoePortPower(NamedTuple):
+    """PoePortPower holds a row of the PoE status table (`poe_port_status.lsp`).
+
+    Columns are, in order: 'Interface', 'Output Power (W)', 'Output Current (mA)', 'Output Voltage (V)'.
+    Values that are missing or not numeric (e.g. on a port without a powered device) are None.
+    """
+
+    interface: str
+    power: Optional[float] = None
+    current: Optional[float] = None
+    voltage: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row: List[str]) -> "PoePortPower":
+        """Build the record from a row of the table, missing columns are parsed as None."""
+        columns = list(row) + [""] * (4 - len(row))
+        return cls(str(columns[0]), _number(columns[1]), _number(columns[2]), _number(columns[3]))
+
+
+class PoePowerStatus(NamedTuple):
+    """PoePowerStatus holds the power drawn by each port and the PoE budget of the switch.
+
+    The budget comes from the summary of the PoE status page, which lists the 'Power Budget (W)'
+    and the 'Consumed Power (W)'. If the summary is missing, the consumed power is the sum
+    of the power drawn by each port.
+    """
+
+    ports: Dict[str, PoePortPower]
+    budget: Optional[float] = None
+    consumed: Optional[float] = None
+
+    @classmethod
+    def from_rows(cls, rows: List[List[str]], summary: Optional[List[str]] = None) -> "PoePowerStatus":
+        """Build the record from the rows of the status table and its optional summary."""
+        ports = {port.interface: port for port in (PoePortPower.from_row(row) for row in rows)}
+        summary = list(summary or []) + [""] * 2
+        budget, consumed = _number(summary[0]), _number(summary[1])
+        if consumed is None:
+            consumed = sum(port.power or 0.0 for port in ports.values())
+        return cls(ports, budget, consumed)
+
+    @property
+    def remaining(self) -> Optional[float]:
+        """Return the power still available to other devices, if the budget is known."""
+        if self.budget is None or self.consumed is None:
+            return None
+        return round(self.budget - self.consumed, 1)
+
+
+def _number(value: Any) -> Optional[float]:
+    # Numbers may be followed by their unit (e.g. '4.2 W'), dashes are shown when not applicable
+    try:
+        return float(str(value).split()[0])
+    except (ValueError, IndexError):
+        return None
@@ -0,0 +1,142 @@
+import re as regex
+from functools import lru_cache
+from typing import Any, List, Match, Pattern, Tuple
+
+# A single token of a JavaScript array literal, including the separator that follows it
+_TOKEN = regex.compile(
+    r"""\s*(?:(\[)|(\])|'([^'\\]*(?:\\.[^'\\]*)*)'|"([^"\\]*(?:\\.[^"\\]*)*)"|([^\s,\[\]'"]+))\s*,?""",
+    regex.DOTALL,
+)
+_OPEN, _CLOSE, _SINGLE_QUOTED, _DOUBLE_QUOTED, _LITERAL = range(1, 6)
+# A row made only of single quoted strings without escape sequences, which is what the
+# switch renders for its tables: such rows are read with a single `findall` call
+_SIMPLE_ROW = regex.compile(r"""\s*\[\s*((?:'[^'\\]*'\s*(?:,\s*)?)*)\]\s*,?""")
+_SIMPLE_STRING = regex.compile(r"'([^'\\]*)'")
+_ESCAPE_SEQUENCE = regex.compile(r"\\(u[0-9a-fA-F]{4}|.)", regex.DOTALL)
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+_LITERALS = {"true": True, "false": False, "null": None, "undefined": None}
+
+
+def parse_data_set(text: str, name: str = "aDataSet") -> List[Any]:
+    """Parse a JavaScript array literal assigned to a variable in an HTML page.
+
+    The page is tokenized in a single pass starting from the variable assignment, and the
+    array is read directly into Python lists without copying the page. Strings can be
+    single or double quoted and may contain escaped quotes.
+
+    Args:
+        text (str): The HTML page returned by the switch.
+        name (str): The name of the JavaScript variable holding the table.
+
+    Returns:
+        list: The parsed array, usually a list of rows where each row is a list of strings.
+
+    Raises:
+        ValueError: If the variable is not found or the array literal is malformed.
+
+    Example:
+        >>> parse_data_set("var aDataSet = [['', '1', 'Enabled']];")
+        [['', '1', 'Enabled']]
+    """
+    value, _ = _parse_array(text, _find_table(text, name))
+    return value
+
+
+def find_data_set(text: str, name: str = "aDataSet") -> Tuple[int, int]:
+    """Locate a JavaScript array literal without parsing it.
+
+    The returned span starts at the opening bracket of the table and ends where the
+    enclosing script ends, so it always covers the whole table. It's meant to cheaply
+    detect if a table has changed since the last time it was parsed.
+
+    Args:
+        text (str): The HTML page returned by the switch.
+        name (str): The name of the JavaScript variable holding the table.
+
+    Returns:
+        tuple: The start and end positions of the table within the page.
+
+    Raises:
+        ValueError: If the variable is not found.
+    """
+    start = _find_table(text, name) - 1
+    end = text.find("</script>", start)
+    return start, len(text) if end < 0 else end
+
+
+def _find_table(text: str, name: str) -> int:
+    # Returns the position right after the opening bracket of the table
+    table_start = _table_start(name)
+    position = text.find(name)
+    while position >= 0:
+        match = table_start.match(text, position)
+        if match is not None and (position == 0 or not (text[position - 1].isalnum() or text[position - 1] == "_")):
+            return match.end()
+        position = text.find(name, position + 1)
+
+    raise ValueError(f"parse_data_set | Table {name} not found")
+
+
+@lru_cache(maxsize=8)
+def _table_start(name: str) -> Pattern[str]:
+    # Matches the beginning of a JavaScript table such as `aDataSet = [`
+    return regex.compile(rf"{regex.escape(name)}\s*=\s*\[")
+
+
+def _parse_array(text: str, position: int) -> Tuple[List[Any], int]:
+    # `position` points right after the opening bracket of the outermost array
+    result: List[Any] = []
+    stack: List[List[Any]] = []
+    match = _TOKEN.match
+    match_row = _SIMPLE_ROW.match
+    find_strings = _SIMPLE_STRING.findall
+    while True:
+        if not stack:
+            row = match_row(text, position)
+            if row is not None:
+                result.append(find_strings(text, row.start(1), row.end(1)))
+                position = row.end()
+                continue
+
+        token = match(text, position)
+        if token is None:
+            raise ValueError(f"parse_data_set | Unexpected character at {position}")
+        position = token.end()
+        kind = token.lastindex
+        if kind == _SINGLE_QUOTED or kind == _DOUBLE_QUOTED:
+            value = token.group(kind)
+            result.append(_unescape(value) if "\\" in value else value)
+        elif kind == _OPEN:
+            stack.append(result)
+            result = []
+        elif kind == _CLOSE:
+            if not stack:
+                return result, position
+            stack[-1].append(result)
+            result = stack.pop()
+        else:
+            result.append(_parse_literal(token.group(_LITERAL)))
+
+
+def _unescape(value: str) -> str:
+    return _ESCAPE_SEQUENCE.sub(_replace_escape, value)
+
+
+def _replace_escape(match: Match[str]) -> str:
+    escaped = match.group(1)
+    if escaped[0] == "u":
+        return chr(int(escaped[1:], 16))
+    return _ESCAPES.get(escaped, escaped)
+
+
+def _parse_literal(token: str) -> Any:
+    if token in _LITERALS:
+        return _LITERALS[token]
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        raise ValueError(f"parse_data_set | Unexpected token {token!r}") from None
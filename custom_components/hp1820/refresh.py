@@ -0,0 +1,46 @@
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RefreshGroup:
+    """RefreshGroup is a page of the switch that is refreshed at its own cadence.
+
+    Data that changes constantly (e.g. the power drawn by the ports) can be read on every
+    poll, while data that rarely changes (e.g. the PoE configuration) is read less often
+    and served from the last read in between. A group is due on the first poll after its
+    interval has elapsed, so an interval of 0 reads the page on every poll.
+
+    Args:
+        name: The name used in logs.
+        fetch: The coroutine function that reads the page, within an authenticated session.
+        interval: Seconds between two reads of the page.
+    """
+
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[Any]], interval: float = 0):
+        self.name = name
+        self.interval = interval
+        self.last_refresh: Optional[float] = None
+        self._fetch = fetch
+
+    def due(self, now: float) -> bool:
+        """Return True if the page must be read by a poll starting at `now`."""
+        return self.last_refresh is None or now - self.last_refresh >= self.interval
+
+    def invalidate(self):
+        """Read the page on the next poll, regardless of the interval."""
+        self.last_refresh = None
+
+    async def fetch(self) -> Any:
+        """Read the page.
+
+        The refresh time is not recorded here, so that a poll failing on another page reads
+        this page again. Call `refreshed` once all the pages of the poll are read.
+        """
+        _LOGGER.debug(f"fetch | Refreshing {self.name}")
+        return await self._fetch()
+
+    def refreshed(self, now: float):
+        """Record that the page was read by a successful poll started at `now`."""
+        self.last_refresh = now
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from .const import FLEET_MAX_CONCURRENT_POLLS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Hp1820Scheduler:
+    """Hp1820Scheduler spreads the polls of all configured switches over time.
+
+    A single instance is stored in `hass.data[DOMAIN]` and shared by every config entry.
+    Each registered coordinator gets a phase, evenly distributed in the order of
+    registration, and its refreshes are aligned to that phase within its own interval.
+    This keeps switches from being polled all at the same moment after a restart. Phases
+    change when switches are added or removed, so every coordinator is aligned again. On
+    top of that, `limiter` caps how many switches are polled concurrently.
+    """
+
+    def __init__(self, max_concurrent: int = FLEET_MAX_CONCURRENT_POLLS):
+        self._coordinators: Dict[str, Any] = {}
+        self.max_concurrent = max_concurrent
+        self.limiter = asyncio.Semaphore(max_concurrent)
+
+    def register(self, key: str, coordinator: Any):
+        """Add a coordinator to the schedule, phases of other coordinators are redistributed."""
+        self._coordinators[key] = coordinator
+        _LOGGER.debug(f"register | Scheduling {len(self._coordinators)} switches")
+        self._align()
+
+    def unregister(self, key: str):
+        """Remove a coordinator from the schedule."""
+        if self._coordinators.pop(key, None) is not None:
+            self._align()
+
+    def phase(self, coordinator: Any) -> Optional[float]:
+        """Return the phase of a coordinator, as a fraction of its interval.
+
+        Returns:
+            float: A value in [0, 1), or None if the coordinator is not registered.
+        """
+        for index, registered in enumerate(self._coordinators.values()):
+            if registered is coordinator:
+                return index / len(self._coordinators)
+        return None
+
+    def delay(self, coordinator: Any, now: float, interval: float) -> float:
+        """Compute how long a coordinator must wait for its next refresh.
+
+        Refreshes of a coordinator happen at multiples of its interval, shifted by its phase.
+        The closest one is picked, so the refresh happens between half and one and a half
+        intervals from now.
+
+        Args:
+            coordinator: The coordinator to schedule.
+            now: The current time of the event loop.
+            interval: The refresh interval of the coordinator, in seconds.
+
+        Returns:
+            float: Seconds until the next refresh.
+        """
+        phase = self.phase(coordinator)
+        if phase is None or interval <= 0:
+            return interval
+
+        half = interval / 2
+        return half + (phase * interval - now - half) % interval
+
+    def schedule(self, now: float) -> List[Dict[str, Any]]:
+        """Return the planned refreshes, sorted by time.
+
+        Args:
+            now: The current time of the event loop.
+
+        Returns:
+            list: One item per switch with its phase, interval and seconds until the scheduled
+                refresh, None if no refresh is scheduled.
+        """
+        items = []
+        for key, coordinator in self._coordinators.items():
+            next_refresh = coordinator.next_refresh
+            items.append(
+                {
+                    "entry_id": key,
+                    "phase": self.phase(coordinator),
+                    "interval": coordinator.current_interval,
+                    "next_refresh": None if next_refresh is None else max(next_refresh - now, 0.0),
+                }
+            )
+        return sorted(items, key=lambda item: (item["next_refresh"] is None, item["next_refresh"] or 0.0))
+
+    def _align(self):
+        for coordinator in self._coordinators.values():
+            coordinator.async_align_phase()
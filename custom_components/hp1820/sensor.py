@@ -0,0 +1,389 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    EntityCategory,
+    UnitOfElectricCurrent,
+    UnitOfElectricPotential,
+    UnitOfPower,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import (
+    CoordinatorEntity,
+    DataUpdateCoordinator,
+)
+
+from .const import DOMAIN, KEY_COORDINATOR, KEY_DEVICE
+from .devices import Hp1820Device
+from .helpers import device_info, generate_entity_id
+from .inventory import Hp1820PortInventory
+from .metrics import Hp1820Metrics, RingBuffer
+from .models import PoePortPower, PoePowerStatus
+
+
+@dataclass(frozen=True, kw_only=True)
+class MetricSensorEntityDescription(SensorEntityDescription):
+    """Describes a metric of the switch, and how to read it from `Hp1820Metrics`."""
+
+    value_fn: Callable[[Hp1820Metrics], Any]
+    attributes_fn: Optional[Callable[[Hp1820Metrics], Dict[str, Any]]] = None
+
+
+def _milliseconds(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1000, 1)
+
+
+def _latency(name: str) -> MetricSensorEntityDescription:
+    # The median is the state, other percentiles are attributes to keep the number of entities low
+    def percentiles(metrics: Hp1820Metrics) -> Dict[str, Any]:
+        samples = metrics.latencies[name]
+        return {
+            "p95": _milliseconds(samples.percentile(95)),
+            "p99": _milliseconds(samples.percentile(99)),
+            "last": _milliseconds(samples.last),
+            "samples": len(samples),
+        }
+
+    return MetricSensorEntityDescription(
+        key=f"{name}_time",
+        name=f"{name.capitalize()} time",
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        entity_registry_enabled_default=name == "poll",
+        value_fn=lambda metrics: _milliseconds(metrics.latencies[name].percentile(50)),
+        attributes_fn=percentiles,
+    )
+
+
+def _counter(name: str, label: str) -> MetricSensorEntityDescription:
+    return MetricSensorEntityDescription(
+        key=name,
+        name=label,
+        icon="mdi:counter",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False,
+        value_fn=lambda metrics: metrics.counters[name],
+    )
+
+
+def _requests_per_poll(samples: RingBuffer) -> Dict[str, Any]:
+    return {"p95": samples.percentile(95), "last": samples.last, "samples": len(samples)}
+
+
+# Metrics are opt-in, except the poll time that sums up how the switch is doing
+SENSORS = (
+    *(_latency(name) for name in Hp1820Metrics.LATENCIES),
+    MetricSensorEntityDescription(
+        key="requests_per_poll",
+        name="Requests per poll",
+        icon="mdi:swap-horizontal",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+        value_fn=lambda metrics: metrics.requests_per_poll.percentile(50),
+        attributes_fn=lambda metrics: _requests_per_poll(metrics.requests_per_poll),
+    ),
+    _counter("polls", "Polls"),
+    _counter("poll_failures", "Poll failures"),
+    _counter("logins", "Logins"),
+    _counter("requests", "Requests"),
+    _counter("retries", "Retries"),
+    _counter("request_failures", "Request failures"),
+    _counter("parse_skipped", "Skipped parses"),
+    _counter("skipped_updates", "Skipped updates"),
+    _counter("write_mismatches", "Write mismatches"),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class PortPowerSensorEntityDescription(SensorEntityDescription):
+    """Describes a power reading of a port, and how to read it from `PoePortPower`."""
+
+    value_fn: Callable[[PoePortPower], Optional[float]]
+
+
+@dataclass(frozen=True, kw_only=True)
+class BudgetSensorEntityDescription(SensorEntityDescription):
+    """Describes a power reading of the whole switch, and how to read it from `PoePowerStatus`."""
+
+    value_fn: Callable[[PoePowerStatus], Optional[float]]
+
+
+PORT_POWER_SENSORS = (
+    PortPowerSensorEntityDescription(
+        key="power",
+        name="power",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        value_fn=lambda port: port.power,
+    ),
+    # Current and voltage are mostly useful to troubleshoot a device, so they are opt-in
+    PortPowerSensorEntityDescription(
+        key="current",
+        name="current",
+        device_class=SensorDeviceClass.CURRENT,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricCurrent.MILLIAMPERE,
+        entity_registry_enabled_default=False,
+        value_fn=lambda port: port.current,
+    ),
+    PortPowerSensorEntityDescription(
+        key="voltage",
+        name="voltage",
+        device_class=SensorDeviceClass.VOLTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        entity_registry_enabled_default=False,
+        value_fn=lambda port: port.voltage,
+    ),
+)
+
+BUDGET_SENSORS = (
+    BudgetSensorEntityDescription(
+        key="poe_budget",
+        name="PoE budget",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        value_fn=lambda power: power.budget,
+    ),
+    BudgetSensorEntityDescription(
+        key="poe_consumed",
+        name="PoE consumed power",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        value_fn=lambda power: power.consumed,
+    ),
+    BudgetSensorEntityDescription(
+        key="poe_remaining",
+        name="PoE remaining power",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        value_fn=lambda power: power.remaining,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    device = hass.data[DOMAIN][entry.entry_id][KEY_DEVICE]
+    coordinator = hass.data[DOMAIN][entry.entry_id][KEY_COORDINATOR]
+
+    sensors: List[SensorEntity] = [
+        MetricSensor(hass, f"{entry.entry_id}_{DOMAIN}_{description.key}", entry, description, coordinator, device)
+        for description in SENSORS
+    ]
+    sensors.append(LastConfirmedSensor(hass, f"{entry.entry_id}_{DOMAIN}_last_confirmed", entry, coordinator, device))
+    sensors += [
+        BudgetSensor(hass, f"{entry.entry_id}_{DOMAIN}_{description.key}", entry, description, coordinator, device)
+        for description in BUDGET_SENSORS
+    ]
+
+    async_add_entities(sensors)
+
+    def create(port_id: str) -> List[Entity]:
+        return [
+            PortPowerSensor(
+                hass,
+                f"{entry.entry_id}_{DOMAIN}_{port_id}_{description.key}",
+                port_id,
+                entry,
+                description,
+                coordinator,
+                device,
+            )
+            for description in PORT_POWER_SENSORS
+        ]
+
+    # Create a sensor for each power reading of the ports, only for ports listed by the PoE status
+    # page, which the SNMP backend and some firmwares don't have
+    inventory = Hp1820PortInventory(hass, entry, create, async_add_entities)
+
+    @callback
+    def update_power_ports():
+        inventory.async_update(set(device.power.ports) if device.power is not None else set())
+
+    update_power_ports()
+    entry.async_on_unload(coordinator.async_add_listener(update_power_ports))
+
+
+class MetricSensor(CoordinatorEntity, SensorEntity):
+    """Representation of a diagnostic metric of the switch."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    entity_description: MetricSensorEntityDescription
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        unique_id: str,
+        config: ConfigEntry,
+        description: MetricSensorEntityDescription,
+        coordinator: DataUpdateCoordinator,
+        device: Hp1820Device,
+    ) -> None:
+        """Construct."""
+        # No listener context, so metrics are refreshed after every poll even if ports didn't change
+        super().__init__(coordinator)
+        self.entity_description = description
+        self.entity_id = generate_entity_id(config, description.key)
+        self._attr_unique_id = unique_id
+        self._attr_device_info = device_info(config, device.model)
+        self._device = device
+        self.hass = hass
+
+    @property
+    def available(self) -> bool:
+        """Metrics are available also while the switch is unreachable, to count its failures."""
+        return True
+
+    @property
+    def native_value(self) -> Any:
+        """Return the current value of the metric."""
+        return self.entity_description.value_fn(self._device.metrics)
+
+    @property
+    def extra_state_attributes(self) -> Optional[Dict[str, Any]]:
+        """Return the other percentiles of latency metrics."""
+        if self.entity_description.attributes_fn is None:
+            return None
+        return self.entity_description.attributes_fn(self._device.metrics)
+
+
+class LastConfirmedSensor(CoordinatorEntity, SensorEntity):
+    """Representation of when the switch last answered a read."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_icon = "mdi:clock-check-outline"
+    _attr_name = "Last confirmed"
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        unique_id: str,
+        config: ConfigEntry,
+        coordinator: DataUpdateCoordinator,
+        device: Hp1820Device,
+    ) -> None:
+        """Construct."""
+        # No listener context, the time advances on every read even if ports didn't change
+        super().__init__(coordinator)
+        self.entity_id = generate_entity_id(config, "last_confirmed")
+        self._attr_unique_id = unique_id
+        self._attr_device_info = device_info(config, device.model)
+        self._device = device
+        self.hass = hass
+
+    @property
+    def available(self) -> bool:
+        """Available also while the switch is unreachable, to tell since when."""
+        return True
+
+    @property
+    def native_value(self) -> Optional[datetime]:
+        """Return when the switch last answered a read, None until it does."""
+        return self._device.last_confirmed
+
+
+class BudgetSensor(CoordinatorEntity, SensorEntity):
+    """Representation of the PoE budget of the switch, and how much of it is used."""
+
+    _attr_has_entity_name = True
+    entity_description: BudgetSensorEntityDescription
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        unique_id: str,
+        config: ConfigEntry,
+        description: BudgetSensorEntityDescription,
+        coordinator: DataUpdateCoordinator,
+        device: Hp1820Device,
+    ) -> None:
+        """Construct."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self.entity_id = generate_entity_id(config, description.key)
+        self._attr_unique_id = unique_id
+        self._attr_device_info = device_info(config, device.model)
+        self._device = device
+        self.hass = hass
+
+    @property
+    def available(self) -> bool:
+        """Return True if the switch answered and has the PoE status page."""
+        return super().available and self._device.power is not None
+
+    @property
+    def native_value(self) -> Optional[float]:
+        """Return the current reading."""
+        if self._device.power is None:
+            return None
+        return self.entity_description.value_fn(self._device.power)
+
+
+class PortPowerSensor(CoordinatorEntity, SensorEntity):
+    """Representation of a power reading of a poe port."""
+
+    _attr_has_entity_name = True
+    entity_description: PortPowerSensorEntityDescription
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        unique_id: str,
+        port_id: str,
+        config: ConfigEntry,
+        description: PortPowerSensorEntityDescription,
+        coordinator: DataUpdateCoordinator,
+        device: Hp1820Device,
+    ) -> None:
+        """Construct."""
+        # Power changes on every poll, so the port ID is not used as listener context
+        super().__init__(coordinator)
+        name = f"{port_id.zfill(2)} {description.name}"
+        self.entity_description = description
+        self.entity_id = generate_entity_id(config, name)
+        self._attr_name = name
+        self._attr_unique_id = unique_id
+        self._attr_device_info = device_info(config, device.model)
+        self._device = device
+        self._port_id = port_id
+        self.hass = hass
+
+    @property
+    def available(self) -> bool:
+        """Return True if the switch answered and reported the power of the port."""
+        return super().available and self._port is not None
+
+    @property
+    def native_value(self) -> Optional[float]:
+        """Return the current reading."""
+        port = self._port
+        return None if port is None else self.entity_description.value_fn(port)
+
+    @property
+    def _port(self) -> Optional[PoePortPower]:
+        power = self._device.power
+        return None if power is None else power.ports.get(self._port_id)
@@ -1,13 +1,247 @@
 import logging
+from typing import Any, Dict
 
-from homeassistant.core import HomeAssistant, ServiceCall
+import voluptuous as vol
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import device_registry as dr
 
-from .const import DOMAIN, KEY_COORDINATOR
+from .const import (
+    ATTR_ADMIN_MODE,
+    ATTR_BATCH_DELAY,
+    ATTR_BATCH_SIZE,
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_DEVICE_ID,
+    ATTR_LIMIT_TYPE,
+    ATTR_NAME,
+    ATTR_OFF_TIME,
+    ATTR_PORTS,
+    ATTR_POWER_LIMIT,
+    ATTR_PRIORITY,
+    ATTR_SCHEDULE,
+    ATTR_STATE,
+    ATTR_TIMEOUT,
+    ATTR_WAIT,
+    CONF_SYSTEM_IP,
+    DOMAIN,
+    KEY_COORDINATOR,
+    KEY_DEVICE,
+    KEY_SNAPSHOTS,
+    NOTIFICATION_IDENTIFIER,
+    NOTIFICATION_MESSAGE,
+    NOTIFICATION_TITLE,
+    POWER_CYCLE_OFF_TIME,
+    POWER_CYCLE_TIMEOUT,
+    REFRESH_GROUP_PORTS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# Services are shared by all switches, each call selects its switch with one of these fields
+TARGET_FIELDS = {
+    vol.Exclusive(ATTR_DEVICE_ID, "target"): cv.string,
+    vol.Exclusive(ATTR_CONFIG_ENTRY_ID, "target"): cv.string,
+}
 
-async def update_state(hass: HomeAssistant, config_id: str, call: ServiceCall):
+UPDATE_STATE_SCHEMA = vol.Schema(TARGET_FIELDS)
+
+SET_PORTS_SCHEMA = vol.Schema(
+    {
+        **TARGET_FIELDS,
+        vol.Required(ATTR_PORTS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Required(ATTR_STATE): cv.boolean,
+    }
+)
+
+# Values are the identifiers of the PoE configuration form
+APPLY_CONFIG_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            **TARGET_FIELDS,
+            vol.Optional(ATTR_PORTS): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional(ATTR_ADMIN_MODE): cv.boolean,
+            vol.Optional(ATTR_PRIORITY): vol.In(["critical", "high", "low"]),
+            vol.Optional(ATTR_SCHEDULE): vol.All(cv.string, vol.In(["none", "1", "2"])),
+            vol.Optional(ATTR_LIMIT_TYPE): vol.In(["dot3af", "user"]),
+            vol.Optional(ATTR_POWER_LIMIT): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_ADMIN_MODE, ATTR_PRIORITY, ATTR_SCHEDULE, ATTR_LIMIT_TYPE, ATTR_POWER_LIMIT),
+)
+
+SAVE_SNAPSHOT_SCHEMA = vol.Schema(
+    {
+        **TARGET_FIELDS,
+        vol.Required(ATTR_NAME): cv.string,
+    }
+)
+
+POWER_CYCLE_SCHEMA = vol.Schema(
+    {
+        **TARGET_FIELDS,
+        vol.Required(ATTR_PORTS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_OFF_TIME, default=POWER_CYCLE_OFF_TIME): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(ATTR_BATCH_SIZE): cv.positive_int,
+        vol.Optional(ATTR_BATCH_DELAY, default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(ATTR_WAIT, default=False): cv.boolean,
+        vol.Optional(ATTR_TIMEOUT, default=POWER_CYCLE_TIMEOUT): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+)
+
+RESTORE_SNAPSHOT_SCHEMA = vol.Schema(
+    {
+        **TARGET_FIELDS,
+        vol.Required(ATTR_NAME): cv.string,
+        vol.Optional(ATTR_PORTS): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+
+def target_entry_id(hass: HomeAssistant, call: ServiceCall) -> str:
+    """Return the config entry of the switch targeted by a service call.
+
+    The switch is selected by its device or its config entry, and can be omitted if a
+    single switch is set up.
+
+    Args:
+        hass: The Home Assistant instance.
+        call: The service call, with the optional `device_id` or `config_entry_id` fields.
+
+    Returns:
+        str: The ID of the config entry, which is set up.
+
+    Raises:
+        ServiceValidationError: If the switch is not set up, or the call doesn't select one of many switches.
+    """
+    loaded = [
+        entry.entry_id for entry in hass.config_entries.async_entries(DOMAIN) if entry.entry_id in hass.data[DOMAIN]
+    ]
+    if ATTR_DEVICE_ID in call.data:
+        device = dr.async_get(hass).async_get(call.data[ATTR_DEVICE_ID])
+        targets = [entry_id for entry_id in loaded if device is not None and entry_id in device.config_entries]
+    elif ATTR_CONFIG_ENTRY_ID in call.data:
+        targets = [entry_id for entry_id in loaded if entry_id == call.data[ATTR_CONFIG_ENTRY_ID]]
+    elif len(loaded) > 1:
+        raise ServiceValidationError(
+            f"{call.service} | Many switches are set up, select one with device_id or config_entry_id",
+            translation_domain=DOMAIN,
+            translation_key="many_switches",
+        )
+    else:
+        targets = loaded
+
+    if not targets:
+        raise ServiceValidationError(
+            f"{call.service} | The selected switch is not set up",
+            translation_domain=DOMAIN,
+            translation_key="switch_not_loaded",
+        )
+    return targets[0]
+
+
+async def update_state(hass: HomeAssistant, call: ServiceCall):
     _LOGGER.debug(f"update_state | Triggered action {call.service}")
+    config_id = target_entry_id(hass, call)
+    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
     coordinator = hass.data[DOMAIN][config_id][KEY_COORDINATOR]
+    # A manual update reads all pages, also those that are not due yet
+    device.invalidate()
     await coordinator.async_refresh()
+
+
+async def set_ports(hass: HomeAssistant, call: ServiceCall):
+    _LOGGER.debug(f"set_ports | Triggered action {call.service}")
+    config_id = target_entry_id(hass, call)
+    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
+    coordinator = hass.data[DOMAIN][config_id][KEY_COORDINATOR]
+    states = {port: call.data[ATTR_STATE] for port in call.data[ATTR_PORTS]}
+    result = await device.set_ports_state(states)
+    if not result:
+        persistent_notification.async_create(hass, NOTIFICATION_MESSAGE, NOTIFICATION_TITLE, NOTIFICATION_IDENTIFIER)
+    else:
+        coordinator.async_set_updated_data(device.ports)
+
+
+async def apply_config(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    _LOGGER.debug(f"apply_config | Triggered action {call.service}")
+    config_id = target_entry_id(hass, call)
+    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
+    coordinator = hass.data[DOMAIN][config_id][KEY_COORDINATOR]
+    config: Dict[str, Any] = {
+        field: call.data[field] for field in (ATTR_PRIORITY, ATTR_SCHEDULE, ATTR_LIMIT_TYPE) if field in call.data
+    }
+    if ATTR_ADMIN_MODE in call.data:
+        config[ATTR_ADMIN_MODE] = "enabled" if call.data[ATTR_ADMIN_MODE] else "disabled"
+
+    results = await device.apply_config(config, call.data.get(ATTR_PORTS), call.data.get(ATTR_POWER_LIMIT))
+    return _write_response(hass, coordinator, device, results)
+
+
+async def save_snapshot(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    _LOGGER.debug(f"save_snapshot | Triggered action {call.service}")
+    config_id = target_entry_id(hass, call)
+    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
+    coordinator = hass.data[DOMAIN][config_id][KEY_COORDINATOR]
+    snapshots = hass.data[DOMAIN][KEY_SNAPSHOTS]
+    # The snapshot is taken from a fresh read, and never from ports restored from the cache
+    device.invalidate(REFRESH_GROUP_PORTS)
+    await coordinator.async_refresh()
+    if not coordinator.last_update_success or device.restored:
+        _LOGGER.error(f"save_snapshot | Unable to read the switch, snapshot {call.data[ATTR_NAME]} not saved")
+        return {"success": False, "ports": []}
+
+    ports = dict(device.ports)
+    source = hass.config_entries.async_get_entry(config_id).data[CONF_SYSTEM_IP]
+    created = await snapshots.async_set(call.data[ATTR_NAME], ports, source)
+    return {"success": True, "ports": list(ports), "created": created}
+
+
+async def restore_snapshot(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    _LOGGER.debug(f"restore_snapshot | Triggered action {call.service}")
+    config_id = target_entry_id(hass, call)
+    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
+    coordinator = hass.data[DOMAIN][config_id][KEY_COORDINATOR]
+    snapshots = hass.data[DOMAIN][KEY_SNAPSHOTS]
+    states = await snapshots.async_get(call.data[ATTR_NAME])
+    if states is None:
+        raise ValueError(f"restore_snapshot | Snapshot {call.data[ATTR_NAME]} not found")
+
+    results = await device.apply_states(states, call.data.get(ATTR_PORTS))
+    return _write_response(hass, coordinator, device, results)
+
+
+async def power_cycle(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    _LOGGER.debug(f"power_cycle | Triggered action {call.service}")
+    config_id = target_entry_id(hass, call)
+    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
+    coordinator = hass.data[DOMAIN][config_id][KEY_COORDINATOR]
+
+    def on_change():
+        coordinator.async_set_updated_data(device.ports)
+
+    results = await device.power_cycle(
+        call.data[ATTR_PORTS],
+        call.data[ATTR_OFF_TIME],
+        call.data.get(ATTR_BATCH_SIZE),
+        call.data[ATTR_BATCH_DELAY],
+        call.data[ATTR_WAIT],
+        call.data[ATTR_TIMEOUT],
+        on_change,
+    )
+    success = all(result["status"] in ("cycled", "skipped") for result in results.values())
+    if any(result["status"] == "failed" for result in results.values()):
+        persistent_notification.async_create(hass, NOTIFICATION_MESSAGE, NOTIFICATION_TITLE, NOTIFICATION_IDENTIFIER)
+    return {"success": success, "ports": results}
+
+
+def _write_response(hass: HomeAssistant, coordinator, device, results: Dict[str, bool]) -> ServiceResponse:
+    # Ports written before a failure are applied by the switch, so entities are updated anyway
+    ports = [port for port, written in results.items() if written]
+    if ports:
+        coordinator.async_set_updated_data(device.ports)
+    if not all(results.values()):
+        persistent_notification.async_create(hass, NOTIFICATION_MESSAGE, NOTIFICATION_TITLE, NOTIFICATION_IDENTIFIER)
+        return {"success": False, "ports": ports}
+    return {"success": True, "ports": ports}
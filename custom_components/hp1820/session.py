@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from aiohttp.client_exceptions import ClientResponseError
+
+from .backend import Hp1820Backend
+from .client import SessionExpiredError
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Hp1820Session:
+    """Hp1820Session keeps an authenticated session with the switch alive between
+    operations. The `SID` cookie is reused until the switch reports it as expired,
+    and only then a new login is performed. An optional idle timeout closes the
+    session when no operation runs for a while.
+    """
+
+    def __init__(
+        self,
+        client: Hp1820Backend,
+        username: str,
+        password: str,
+        idle_timeout: Optional[int] = None,
+    ):
+        self._client = client
+        self._username = username
+        self._password = password
+        self._idle_timeout = idle_timeout
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+        self._idle_task: Optional[asyncio.Task] = None
+        self._authenticated = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def authenticated(self) -> bool:
+        """Return True if a `SID` is expected to be valid."""
+        return self._authenticated
+
+    async def call(self, operation: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Run a client operation within an authenticated session.
+
+        A login is performed only if there is no active session. If the switch reports
+        the `SID` as expired, the session is established again and the operation is
+        retried once.
+
+        Args:
+            operation: The client coroutine function to call.
+            *args: Positional arguments forwarded to the operation.
+
+        Returns:
+            The value returned by the operation.
+
+        Raises:
+            ClientResponseError: If the login or the operation fail.
+        """
+        async with self._lock:
+            self._cancel_idle_timeout()
+            try:
+                if not self._authenticated:
+                    await self._login()
+
+                try:
+                    return await operation(*args)
+                except SessionExpiredError:
+                    _LOGGER.debug("call | Session expired, logging in again")
+                    self._authenticated = False
+                    await self._login()
+                    return await operation(*args)
+            finally:
+                self._schedule_idle_timeout()
+
+    def set_idle_timeout(self, idle_timeout: Optional[int]):
+        """Change the idle timeout, restarting the countdown of an open session.
+
+        Args:
+            idle_timeout: Seconds after which an unused session is closed, 0 or None keeps it open.
+        """
+        self._idle_timeout = idle_timeout
+        if self._lock.locked():
+            # The running operation schedules the timeout when it ends
+            return
+        self._cancel_idle_timeout()
+        self._schedule_idle_timeout()
+
+    async def close(self):
+        """Close the session with the Hp1820 switch, if any."""
+        async with self._lock:
+            self._cancel_idle_timeout()
+            await self._logout()
+
+    async def _login(self):
+        try:
+            await self._client.login(self._username, self._password)
+            self._authenticated = True
+            _LOGGER.debug("_login | Succesfully logged in")
+        except ClientResponseError as err:
+            _LOGGER.error(f"_login | Error while logging: {err}")
+            raise err
+
+    async def _logout(self):
+        if not self._authenticated:
+            return
+
+        # The session is dropped even if logout fails, so that next call logs in again
+        self._authenticated = False
+        try:
+            await self._client.logout()
+            _LOGGER.debug("_logout | Succesfully logged out")
+        except ClientResponseError as err:
+            _LOGGER.error(f"_logout | Error while logging out: {err}")
+            raise err
+
+    def _schedule_idle_timeout(self):
+        if not self._idle_timeout or not self._authenticated:
+            return
+
+        loop = asyncio.get_running_loop()
+        self._idle_handle = loop.call_later(self._idle_timeout, self._on_idle_timeout)
+
+    def _cancel_idle_timeout(self):
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    def _on_idle_timeout(self):
+        self._idle_handle = None
+        self._idle_task = asyncio.get_running_loop().create_task(self._close_idle())
+
+    async def _close_idle(self):
+        _LOGGER.debug("_close_idle | Session idle, logging out")
+        try:
+            await self.close()
+        except ClientResponseError:
+            # Already logged by `_logout`, the session is considered closed anyway
+            pass
+        except Exception as err:
+            # The switch may be unreachable, the session is considered closed anyway
+            _LOGGER.debug(f"_close_idle | Unable to log out: {err!r}")
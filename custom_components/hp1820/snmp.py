@@ -0,0 +1,278 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from .backend import Hp1820Backend, PartialWriteError
+from .const import (
+    REQUEST_RETRIES,
+    REQUEST_TIMEOUT,
+    SNMP_MAX_REPETITIONS,
+    SNMP_PORT,
+    SNMP_SET_CHUNK,
+)
+from .metrics import Hp1820Metrics
+from .models import (
+    AdminMode,
+    FaultStatus,
+    PoePortState,
+    PoePowerStatus,
+    PoeStatus,
+    Priority,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Columns of `pethPsePortTable` (POWER-ETHERNET-MIB, RFC 3621), indexed by group and port
+PSE_PORT_ADMIN_ENABLE = "1.3.6.1.2.1.105.1.1.1.3"
+PSE_PORT_DETECTION_STATUS = "1.3.6.1.2.1.105.1.1.1.6"
+PSE_PORT_POWER_PRIORITY = "1.3.6.1.2.1.105.1.1.1.7"
+# Columns of `pethMainPseTable`, indexed by group
+MAIN_PSE_POWER = "1.3.6.1.2.1.105.1.3.1.1.2"
+MAIN_PSE_CONSUMPTION_POWER = "1.3.6.1.2.1.105.1.3.1.1.4"
+
+# TruthValue of `pethPsePortAdminEnable`
+ADMIN_MODES = {1: AdminMode.ENABLED, 2: AdminMode.DISABLED}
+DETECTION_STATUSES = {
+    1: PoeStatus.DISABLED,
+    2: PoeStatus.SEARCHING,
+    3: PoeStatus.DELIVERING,
+    4: PoeStatus.FAULT,
+    5: PoeStatus.TEST,
+    6: PoeStatus.OTHER_FAULT,
+}
+PRIORITIES = {1: Priority.CRITICAL, 2: Priority.HIGH, 3: Priority.LOW}
+
+
+class SnmpError(Exception):
+    """Raised when the switch can't be reached over SNMP, or reports an error."""
+
+
+def _hlapi():
+    # pysnmp is imported only by switches using the SNMP backend
+    try:
+        import pysnmp.hlapi.asyncio as hlapi
+    except ImportError as err:
+        raise SnmpError(f"pysnmp is not available: {err}") from err
+    return hlapi
+
+
+class Hp1820SnmpClient(Hp1820Backend):
+    """Hp1820SnmpClient reads and writes the PoE ports through the standard POWER-ETHERNET-MIB.
+
+    A poll is a GETBULK walk of the port table, and writes are SET requests that change
+    many ports at once. SNMP has no session, so `login` does nothing and `logout` only
+    closes the SNMP engine.
+
+    The MIB has the admin mode, the priority and the status of each port, and the budget
+    of the switch. The other settings of the PoE table are reported as unknown, and writes
+    only change the admin mode and the priority.
+
+    The port can be changed to test the client against a local SNMP simulator.
+    """
+
+    config_fields = ("admin_mode", "priority")
+
+    def __init__(self, host: str, community: str, port: int = SNMP_PORT):
+        self._host = host
+        self._port = port
+        self._community = community
+        self._snmp: Optional[Tuple[Any, Any, Any, Any]] = None
+        self.metrics = Hp1820Metrics()
+
+    async def login(self, username: str, password: str):
+        pass
+
+    async def logout(self):
+        # The engine is closed to release its socket and timer, it's created again by the next request
+        if self._snmp is not None:
+            engine = self._snmp[1]
+            if engine.transportDispatcher is not None:
+                engine.transportDispatcher.closeDispatcher()
+            self._snmp = None
+
+    async def get_poe_state(self) -> Dict[str, PoePortState]:
+        with self.metrics.timer("fetch"):
+            columns = await self._walk(PSE_PORT_ADMIN_ENABLE, PSE_PORT_DETECTION_STATUS, PSE_PORT_POWER_PRIORITY)
+        with self.metrics.timer("parse"):
+            admin_modes, statuses, priorities = columns
+            ports = {}
+            # Values missing in a column (0 is not a valid value) are reported as unknown
+            for index, admin_mode in admin_modes.items():
+                status = DETECTION_STATUSES.get(statuses.get(index, 0), PoeStatus.UNKNOWN)
+                port = _port_id(index)
+                ports[port] = PoePortState(
+                    port,
+                    admin_mode=ADMIN_MODES.get(admin_mode, AdminMode.UNKNOWN),
+                    priority=PRIORITIES.get(priorities.get(index, 0), Priority.UNKNOWN),
+                    status=status,
+                    fault_status=_fault_status(status),
+                )
+            return ports
+
+    async def get_poe_power(self) -> PoePowerStatus:
+        with self.metrics.timer("fetch"):
+            power, consumption = await self._walk(MAIN_PSE_POWER, MAIN_PSE_CONSUMPTION_POWER)
+        if not power:
+            raise ValueError("get_poe_power | The switch doesn't report its PoE budget")
+
+        # The standard MIB doesn't have the power of each port
+        group = min(power)
+        consumed = consumption.get(group)
+        return PoePowerStatus({}, float(power[group]), None if consumed is None else float(consumed))
+
+    async def set_poe_state(self, port: str, status: bool, current: Optional[PoePortState] = None):
+        await self.set_ports_state({port: status})
+
+    async def set_ports_state(self, states: Dict[str, bool], current: Optional[Dict[str, PoePortState]] = None):
+        # Only the admin mode is written, so the other settings are kept anyway
+        values = {
+            port: [(f"{PSE_PORT_ADMIN_ENABLE}.{_index(port)}", 1 if state else 2)] for port, state in states.items()
+        }
+        with self.metrics.timer("write"):
+            await self._set_ports(values)
+
+    async def set_ports_config(self, configs: Dict[str, Dict[str, str]]):
+        values = {}
+        for port, config in configs.items():
+            index = _index(port)
+            priority = next(key for key, value in PRIORITIES.items() if value.value == config["priority_sel"])
+            values[port] = [
+                (f"{PSE_PORT_ADMIN_ENABLE}.{index}", 1 if config["admin_mode_sel"] == "enabled" else 2),
+                (f"{PSE_PORT_POWER_PRIORITY}.{index}", priority),
+            ]
+        with self.metrics.timer("write"):
+            await self._set_ports(values)
+
+    async def _set_ports(self, values: Dict[str, List[Tuple[str, int]]]):
+        # The objects of each port are written with the SET requests of `_set`
+        try:
+            await self._set([value for port_values in values.values() for value in port_values])
+        except PartialWriteError as err:
+            # A port is written once all of its objects are
+            written = set(err.written)
+            ports = [port for port, port_values in values.items() if all(oid in written for oid, _ in port_values)]
+            raise PartialWriteError(ports, str(err)) from err
+
+    async def _walk(self, *columns: str) -> List[Dict[str, int]]:
+        """Read table columns with GETBULK requests, walking them side by side.
+
+        Returns:
+            list: The values of each column, by row index (the OID suffix after the column).
+        """
+        values: List[Dict[str, int]] = [{} for _ in columns]
+        # Last OID read of each column that didn't end yet
+        cursors = dict(enumerate(columns))
+        while cursors:
+            positions = list(cursors)
+            rows = await self._bulk([cursors[position] for position in positions])
+            progress = False
+            for row in rows:
+                for position, (oid, value) in zip(positions, row):
+                    prefix = f"{columns[position]}."
+                    if position not in cursors:
+                        continue
+                    if value is None or not oid.startswith(prefix) or oid == cursors[position]:
+                        # Past the end of the column
+                        del cursors[position]
+                        continue
+                    values[position][oid.removeprefix(prefix)] = value
+                    cursors[position] = oid
+                    progress = True
+            if not progress:
+                break
+        return values
+
+    async def _bulk(self, oids: List[str]) -> List[List[Tuple[str, Optional[int]]]]:
+        # Sends a single GETBULK, returning for each row the OID and integer value of each column
+        hlapi, engine, auth, target = self._transport()
+        self.metrics.increment("requests")
+        try:
+            error_indication, error_status, error_index, table = await hlapi.bulkCmd(
+                engine,
+                auth,
+                target,
+                hlapi.ContextData(),
+                0,
+                SNMP_MAX_REPETITIONS,
+                *(hlapi.ObjectType(hlapi.ObjectIdentity(oid)) for oid in oids),
+            )
+        except Exception as err:
+            self.metrics.increment("request_failures")
+            raise SnmpError(f"GETBULK failed: {err}") from err
+        self._check(error_indication, error_status, error_index)
+
+        # Values past the end of the MIB are not integers, so they end the walk
+        return [[(str(name), _integer(value)) for name, value in row] for row in table]
+
+    async def _set(self, values: List[Tuple[str, int]]):
+        # Many ports are written with a single SET, split to keep the request within the agent limits
+        written: List[str] = []
+        for start in range(0, len(values), SNMP_SET_CHUNK):
+            end = start + SNMP_SET_CHUNK
+            chunk = values[start:end]
+            try:
+                await self._set_chunk(chunk)
+            except SnmpError as err:
+                # Each SET is applied as a whole, so the previous chunks are written
+                if not written:
+                    raise
+                raise PartialWriteError(written, str(err)) from err
+            written.extend(oid for oid, _ in chunk)
+
+    async def _set_chunk(self, values: List[Tuple[str, int]]):
+        # Sends a single SET of integer values
+        hlapi, engine, auth, target = self._transport()
+        self.metrics.increment("requests")
+        try:
+            error_indication, error_status, error_index, _ = await hlapi.setCmd(
+                engine,
+                auth,
+                target,
+                hlapi.ContextData(),
+                *(hlapi.ObjectType(hlapi.ObjectIdentity(oid), hlapi.Integer(value)) for oid, value in values),
+            )
+        except Exception as err:
+            self.metrics.increment("request_failures")
+            raise SnmpError(f"SET failed: {err}") from err
+        self._check(error_indication, error_status, error_index)
+
+    def _check(self, error_indication, error_status, error_index):
+        if error_indication:
+            self.metrics.increment("request_failures")
+            raise SnmpError(str(error_indication))
+        if error_status:
+            self.metrics.increment("request_failures")
+            raise SnmpError(f"{error_status.prettyPrint()} at variable {error_index}")
+
+    def _transport(self) -> Tuple[Any, Any, Any, Any]:
+        # The engine is created on first use, and reused by all the requests to the switch
+        if self._snmp is None:
+            hlapi = _hlapi()
+            self._snmp = (
+                hlapi,
+                hlapi.SnmpEngine(),
+                hlapi.CommunityData(self._community, mpModel=1),
+                hlapi.UdpTransportTarget((self._host, self._port), timeout=REQUEST_TIMEOUT, retries=REQUEST_RETRIES),
+            )
+        return self._snmp
+
+
+def _index(port: str) -> str:
+    # Ports are numbered within the first PSE group, e.g. port '5' is row '1.5'
+    return port.replace("/", ".") if "/" in port else f"1.{port}"
+
+
+def _port_id(index: str) -> str:
+    group, _, port = index.partition(".")
+    return port if group == "1" else f"{group}/{port}"
+
+
+def _integer(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fault_status(status: PoeStatus) -> FaultStatus:
+    # The MIB doesn't have the reason of a fault
+    return FaultStatus.UNKNOWN if status in (PoeStatus.FAULT, PoeStatus.OTHER_FAULT) else FaultStatus.NO_ERROR
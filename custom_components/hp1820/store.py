@@ -0,0 +1,114 @@
+import logging
+from typing import Any, Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, STORAGE_SAVE_DELAY, STORAGE_VERSION
+from .models import PoePortState
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Hp1820Store:
+    """Hp1820Store persists the last known ports of a switch in Home Assistant storage.
+
+    The cache is used at startup to create entities without waiting for the switch.
+    Writes are delayed and skipped when the ports didn't change since the last write.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self._store: Store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+        self._saved: Optional[Dict[str, PoePortState]] = None
+
+    async def async_load(self) -> Optional[Dict[str, PoePortState]]:
+        """Load the cached ports.
+
+        Returns:
+            dict: The ports by ID, or None if the cache is missing or invalid.
+        """
+        data = await self._store.async_load()
+        if not data:
+            return None
+
+        try:
+            ports = {port: PoePortState.from_dict(state) for port, state in data["ports"].items()}
+        except (KeyError, TypeError, AttributeError) as err:
+            _LOGGER.warning(f"async_load | Ignoring invalid ports cache: {err}")
+            return None
+
+        self._saved = ports
+        return ports or None
+
+    @callback
+    def async_save(self, ports: Dict[str, PoePortState]):
+        """Schedule a write of the ports, if they changed since the last one."""
+        if ports == self._saved:
+            return
+
+        self._saved = dict(ports)
+        snapshot = {port: state.to_dict() for port, state in self._saved.items()}
+        self._store.async_delay_save(lambda: {"ports": snapshot}, STORAGE_SAVE_DELAY)
+
+    async def async_remove(self):
+        """Remove the cache from the storage."""
+        await self._store.async_remove()
+
+
+class Hp1820SnapshotStore:
+    """Hp1820SnapshotStore persists named snapshots of the PoE configuration of switches.
+
+    Snapshots are shared by all config entries, so that the snapshot of a switch can be
+    restored on the switch that replaces it. Each snapshot is written as soon as it's taken.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self._store: Store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.snapshots")
+        self._snapshots: Optional[Dict[str, Dict[str, Any]]] = None
+
+    async def _async_snapshots(self) -> Dict[str, Dict[str, Any]]:
+        if self._snapshots is None:
+            data = await self._store.async_load() or {}
+            self._snapshots = data.get("snapshots", {})
+        return self._snapshots
+
+    async def async_get(self, name: str) -> Optional[Dict[str, PoePortState]]:
+        """Load the ports of a snapshot.
+
+        Args:
+            name: The name of the snapshot.
+
+        Returns:
+            dict: The ports by ID, or None if the snapshot is missing or invalid.
+        """
+        snapshot = (await self._async_snapshots()).get(name)
+        if snapshot is None:
+            return None
+
+        try:
+            return {port: PoePortState.from_dict(state) for port, state in snapshot["ports"].items()}
+        except (KeyError, TypeError, AttributeError) as err:
+            _LOGGER.warning(f"async_get | Ignoring invalid snapshot {name}: {err}")
+            return None
+
+    async def async_set(self, name: str, ports: Dict[str, PoePortState], source: str) -> str:
+        """Save the ports as a snapshot, replacing any snapshot with the same name.
+
+        Args:
+            name: The name of the snapshot.
+            ports: The ports by ID.
+            source: The switch the ports were read from, for reference.
+
+        Returns:
+            str: When the snapshot was taken, in ISO format.
+        """
+        created = dt_util.utcnow().isoformat()
+        snapshots = await self._async_snapshots()
+        snapshots[name] = {
+            "created": created,
+            "source": source,
+            "ports": {port: state.to_dict() for port, state in ports.items()},
+        }
+        await self._store.async_save({"snapshots": snapshots})
+        return created
@@ -1,7 +1,10 @@
+from typing import Any, Dict, List
+
 from homeassistant.components import persistent_notification
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
@@ -17,7 +20,8 @@ from .const import (
     NOTIFICATION_TITLE,
 )
 from .devices import Hp1820Device
-from .helpers import generate_entity_id
+from .helpers import device_info, generate_entity_id
+from .inventory import Hp1820PortInventory
 
 
 async def async_setup_entry(
@@ -27,14 +31,14 @@ async def async_setup_entry(
 ) -> None:
     device = hass.data[DOMAIN][entry.entry_id][KEY_DEVICE]
     coordinator = hass.data[DOMAIN][entry.entry_id][KEY_COORDINATOR]
-    ports = []
 
-    # Iterate through the ports of the device and create PortPoeSwitch objects
-    for port_id, _ in device.ports:
+    def create(port_id: str) -> List[Entity]:
         unique_id = f"{entry.entry_id}_{DOMAIN}_{port_id}"
-        ports.append(PoePortSwitch(hass, unique_id, port_id, entry, port_id.zfill(2), coordinator, device))
+        return [PoePortSwitch(hass, unique_id, port_id, entry, port_id.zfill(2), coordinator, device)]
 
-    async_add_entities(ports)
+    # Create a PoePortSwitch for each port of the device, also when the switch reports new ports
+    inventory = Hp1820PortInventory(hass, entry, create, async_add_entities)
+    entry.async_on_unload(inventory.async_track(coordinator, (port_id for port_id, _ in device.ports)))
 
 
 class PoePortSwitch(CoordinatorEntity, SwitchEntity):
@@ -53,8 +57,10 @@ class PoePortSwitch(CoordinatorEntity, SwitchEntity):
         device: Hp1820Device,
     ) -> None:
         """Construct."""
-        super().__init__(coordinator)
+        # The port ID is the listener context, so the coordinator notifies only changed ports
+        super().__init__(coordinator, port_id)
         self.entity_id = generate_entity_id(config, name)
+        self._attr_device_info = device_info(config, device.model)
         self._name = name
         self._device = device
         self._unique_id = unique_id
@@ -76,6 +82,28 @@ class PoePortSwitch(CoordinatorEntity, SwitchEntity):
         """Return the icon used by this entity."""
         return "hass:power-standby"
 
+    @property
+    def available(self) -> bool:
+        """Return True if the switch answered and still has the port."""
+        return super().available and self._device.has_port(self._port_id)
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return the PoE settings and status of the port."""
+        port = self._device.get_port(self._port_id)
+        return {
+            "priority": port.priority.value,
+            "schedule": port.schedule.value,
+            "high_power_mode": port.high_power_mode.value,
+            "detect_type": port.detect_type.value,
+            "limit_type": port.limit_type.value,
+            "poe_status": port.status.value,
+            "fault_status": port.fault_status.value,
+            "restored": self._device.restored,
+            "pending": self._port_id in self._device.pending,
+            "stale": self._device.stale,
+        }
+
     @property
     def is_on(self) -> bool:
         """Return the switch status (on/off)."""
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import re
+from typing import Callable, Dict, Optional, Tuple
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import SYSLOG_EVENT_PATTERN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Strips the priority and the header of RFC 3164 messages, e.g. `<190>Jan  1 00:00:00 switch `
+_PRIORITY = re.compile(r"^<\d{1,3}>")
+_EVENT = re.compile(SYSLOG_EVENT_PATTERN, re.IGNORECASE)
+
+
+class _SyslogProtocol(asyncio.DatagramProtocol):
+    """Forwards the received datagrams to the listener."""
+
+    def __init__(self, listener: "Hp1820SyslogListener"):
+        self._listener = listener
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        self._listener.handle(data, addr[0])
+
+    def error_received(self, exc: Exception) -> None:
+        _LOGGER.debug(f"error_received | Syslog socket error: {exc}")
+
+
+class Hp1820SyslogListener:
+    """Hp1820SyslogListener receives the syslog messages sent by the switches on a UDP port.
+
+    A single socket is shared by all config entries that use the same port. Each entry
+    registers the IP address of its switch, and is notified only for messages sent from
+    that address that report a link or PoE event. The socket is closed when the last
+    entry unregisters.
+
+    Args:
+        hass: The Home Assistant instance.
+        port: The UDP port to listen on.
+    """
+
+    def __init__(self, hass: HomeAssistant, port: int):
+        self._hass = hass
+        self.port = port
+        self._callbacks: Dict[str, Callable[[str], None]] = {}
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+    async def async_register(self, host: str, event_callback: Callable[[str], None]) -> Optional[CALLBACK_TYPE]:
+        """Call `event_callback` with each relevant message sent by `host`.
+
+        Args:
+            host: The IP address the switch sends the messages from.
+            event_callback: Called in the event loop with the message.
+
+        Returns:
+            A callback to unregister, or None if the port can't be opened.
+        """
+        if self._transport is None:
+            try:
+                self._transport, _ = await self._hass.loop.create_datagram_endpoint(
+                    lambda: _SyslogProtocol(self), local_addr=("0.0.0.0", self.port)  # nosec
+                )
+            except OSError as err:
+                _LOGGER.error(f"async_register | Unable to listen for syslog messages on port {self.port}: {err}")
+                return None
+            _LOGGER.debug(f"async_register | Listening for syslog messages on port {self.port}")
+
+        self._callbacks[host] = event_callback
+
+        @callback
+        def unregister():
+            if self._callbacks.get(host) is event_callback:
+                del self._callbacks[host]
+            if not self._callbacks and self._transport is not None:
+                _LOGGER.debug(f"unregister | Closing the syslog listener on port {self.port}")
+                self._transport.close()
+                self._transport = None
+
+        return unregister
+
+    @callback
+    def handle(self, data: bytes, host: str):
+        """Notify the entry of `host` if the message reports a link or PoE event."""
+        event_callback = self._callbacks.get(host)
+        if event_callback is None:
+            return
+
+        message = _PRIORITY.sub("", data.decode("utf-8", errors="replace")).strip()
+        if not _EVENT.search(message):
+            _LOGGER.debug(f"handle | Ignoring syslog message from {host}: {message}")
+            return
+
+        event_callback(message)
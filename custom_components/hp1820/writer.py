@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _Batch:
+    """A group of port changes sent to the switch together."""
+
+    def __init__(self, future: asyncio.Future):
+        self.states: Dict[str, bool] = {}
+        self.future = future
+        self.callers = 0
+
+    def accepts(self, states: Dict[str, bool]) -> bool:
+        # A port can't be changed twice in the same batch, otherwise an off/on
+        # sequence (e.g. a power cycle) would be lost
+        return all(self.states.get(port, state) == state for port, state in states.items())
+
+
+class Hp1820WriteQueue:
+    """Hp1820WriteQueue serializes and coalesces PoE writes for a switch.
+
+    Requests received within the debounce window are merged into a single batch, that
+    is sent with one call of the writer (i.e. one session and the smallest set of bulk
+    POSTs). Batches run one at a time, in order, and the writer returns the result of
+    each port, so that each caller gets the result of its own ports.
+    """
+
+    def __init__(self, writer: Callable[[Dict[str, bool]], Awaitable[Dict[str, bool]]], debounce: float):
+        self._writer = writer
+        self._debounce = debounce
+        self._batches: List[_Batch] = []
+        self._worker: Optional[asyncio.Task] = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.batches = 0
+        self.coalesced = 0
+
+    @property
+    def pending(self) -> bool:
+        """Return True while a batch is waiting or being written."""
+        return not self._idle.is_set()
+
+    async def submit(self, states: Dict[str, bool]) -> bool:
+        """Queue a change of ports state and wait until it's written to the switch.
+
+        Args:
+            states: A dictionary mapping each port ID to the status to set.
+
+        Returns:
+            bool: True if all the ports of the change were written.
+        """
+        loop = asyncio.get_running_loop()
+        # Only the last batch is still open, the others are already sealed
+        if self._batches and self._batches[-1].accepts(states):
+            batch = self._batches[-1]
+            self.coalesced += 1
+        else:
+            batch = _Batch(loop.create_future())
+            self._batches.append(batch)
+
+        batch.states.update(states)
+        batch.callers += 1
+        self._idle.clear()
+        if self._worker is None:
+            self._worker = loop.create_task(self._run())
+
+        # Cancelling a caller must not cancel the write shared with other callers
+        results = await asyncio.shield(batch.future)
+        return all(results.get(port, False) for port in states)
+
+    async def wait_idle(self):
+        """Wait until all queued batches are written."""
+        await self._idle.wait()
+
+    async def _run(self):
+        try:
+            while self._batches:
+                await asyncio.sleep(self._debounce)
+                batch = self._batches.pop(0)
+                self.batches += 1
+                _LOGGER.debug(f"_run | Writing {batch.states} for {batch.callers} requests")
+                try:
+                    results = await self._writer(batch.states)
+                except Exception as err:
+                    _LOGGER.error(f"_run | Error while writing {batch.states}: {err}")
+                    results = {port: False for port in batch.states}
+                batch.future.set_result(results)
+        finally:
+            self._worker = None
+            self._idle.set()
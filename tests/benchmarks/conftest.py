@@ -0,0 +1,41 @@
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from custom_components.hp1820.models import SWITCH_MODELS, SwitchModel
+
+PAGES = Path(__file__).parent / "pages"
+
+
+def load_page(model: SwitchModel) -> str:
+    """Load the PoE configuration page of a switch model, with a row for each of its PoE ports.
+
+    Pages are rendered with the layout served by the firmware, including 32 KiB of markup
+    around the table, and some ports disabled or with non-default settings.
+    """
+    return (PAGES / f"poe_port_cfg_{model.ports}.html").read_text()
+
+
+def peak_memory(function: Callable[[], object]) -> int:
+    """Return the peak memory, in bytes, allocated while calling `function`."""
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+@pytest.fixture(params=SWITCH_MODELS, ids=lambda model: model.name)
+def model(request):
+    """Parametrize a benchmark with each switch model."""
+    return request.param
+
+
+@pytest.fixture
+def ports(model):
+    """Return the number of PoE ports of the switch model."""
+    return model.poe_ports
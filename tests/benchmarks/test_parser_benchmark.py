@@ -0,0 +1,64 @@
+import json
+import re as regex
+
+import pytest
+
+from custom_components.hp1820.client import Hp1820Client
+from custom_components.hp1820.models import PoePortState
+
+from .conftest import load_page, peak_memory
+
+
+@pytest.fixture
+def client():
+    # The parser doesn't use the session
+    return Hp1820Client(None, "127.0.0.1")
+
+
+def legacy_parse_status(text_response: str):
+    # Previous implementation of `Hp1820Client._parse_status`, the baseline of the parser
+    search_result = regex.search("aDataSet = (.*)var aColumns", text_response.replace("\n", ""))
+    string = "" if search_result is None else search_result.group(1)
+    string = string.replace("'", "`").replace('"', "'").replace("`", '"')
+    string = string.rstrip().rstrip(";")
+    obj = json.loads(string)
+    return [i[1:] for i in obj]
+
+
+def test_parse_status(benchmark, client, model):
+    # Parse time and allocations of the PoE table
+    page = load_page(model)
+    benchmark.group = f"parse {model.name}"
+    rows = benchmark(client._parse_status, page)
+    benchmark.extra_info["peak_kib"] = peak_memory(lambda: client._parse_status(page)) / 1024
+    assert len(rows) == model.poe_ports
+
+
+def test_parse_status_legacy(benchmark, client, model):
+    # Parse time and allocations of the previous regex + JSON parser, reported next to the current one
+    page = load_page(model)
+    benchmark.group = f"parse {model.name}"
+    rows = benchmark(legacy_parse_status, page)
+    benchmark.extra_info["peak_kib"] = peak_memory(lambda: legacy_parse_status(page)) / 1024
+    assert rows == client._parse_status(page)
+
+
+def test_parse_records(benchmark, client, model):
+    # Parse time of the table, including the typed records
+    page = load_page(model)
+
+    def parse():
+        return {row[0]: PoePortState.from_row(row) for row in client._parse_status(page)}
+
+    records = benchmark(parse)
+    benchmark.extra_info["peak_kib"] = peak_memory(parse) / 1024
+    assert records["3"].enabled is False
+
+
+def test_same_table(benchmark, client, model):
+    # Time to detect an unchanged table, which skips parsing
+    page = load_page(model)
+    start = page.index("[")
+    end = page.index("</script>")
+    client._poe_table = page[start:end]
+    assert benchmark(client._is_same_table, page, start, end) is True
@@ -0,0 +1,57 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from homeassistant.setup import async_setup_component
+
+from custom_components.hp1820.const import DOMAIN
+from custom_components.hp1820.metrics import Hp1820Metrics
+
+from ..hass.fixtures import MockConfigEntry
+from ..helpers import _, poe_ports, power_status
+
+
+@pytest.mark.parametrize("switches", (1, 10), ids=lambda switches: f"{switches}switches")
+def test_setup_entries(benchmark, hass, event_loop, mocker, switches, ports):
+    # Time to set up N switches with M ports each, including the creation of all entities
+    m_client = mocker.patch(_("Hp1820Client")).return_value
+    m_client.login = AsyncMock()
+    m_client.logout = AsyncMock()
+    m_client.get_poe_state = AsyncMock(return_value=poe_ports({str(port): True for port in range(1, ports + 1)}))
+    m_client.get_poe_power = AsyncMock(return_value=power_status({str(port): 4.2 for port in range(1, ports + 1)}))
+    m_client.metrics = Hp1820Metrics()
+    event_loop.run_until_complete(async_setup_component(hass, DOMAIN, {}))
+    loaded = []
+    rounds = iter(range(1000))
+
+    async def unload():
+        await asyncio.gather(*(hass.config_entries.async_unload(entry.entry_id) for entry in loaded))
+        for entry in loaded:
+            await hass.config_entries.async_remove(entry.entry_id)
+        loaded.clear()
+
+    def prepare():
+        event_loop.run_until_complete(unload())
+        round_id = next(rounds)
+        entries = []
+        for switch in range(switches):
+            entry = MockConfigEntry(
+                domain=DOMAIN,
+                entry_id=f"bench_{round_id}_{switch}",
+                data={"username": "admin", "password": "password", "system_ip": f"10.0.{round_id}.{switch}"},
+            )
+            entry.add_to_hass(hass)
+            entries.append(entry)
+        return (entries,), {}
+
+    def setup(entries):
+        results = event_loop.run_until_complete(
+            asyncio.gather(*(hass.config_entries.async_setup(entry.entry_id) for entry in entries))
+        )
+        loaded.extend(entries)
+        return results
+
+    benchmark.pedantic(setup, setup=prepare, rounds=5)
+    benchmark.extra_info["entities"] = switches * ports
+    assert len(hass.states.async_entity_ids("switch")) == switches * ports
+    event_loop.run_until_complete(unload())
@@ -0,0 +1,54 @@
+import pytest
+
+from custom_components.hp1820.client import Hp1820Client, create_session
+from custom_components.hp1820.devices import Hp1820Device
+
+from ..hass.fixtures import MockConfigEntry
+
+
+@pytest.fixture
+def switch(event_loop, emulator, ports):
+    """Yields a device connected to the emulator, with the PoE ports of the model."""
+    emulator.resize(ports)
+    emulator.padding = 32
+    config = MockConfigEntry(
+        domain="hp1820",
+        data={"username": "admin", "password": "password", "system_ip": emulator.host},
+    )
+    session = event_loop.run_until_complete(_create_session())
+    device = Hp1820Device(config, Hp1820Client(session, emulator.host))
+    yield device
+    event_loop.run_until_complete(device.close())
+    event_loop.run_until_complete(session.close())
+
+
+async def _create_session():
+    return create_session()
+
+
+def test_device_update(benchmark, event_loop, emulator, switch, model):
+    # End-to-end latency of a poll over HTTP, when the table is unchanged
+    event_loop.run_until_complete(switch.update())
+    benchmark(lambda: event_loop.run_until_complete(switch.update()))
+    assert len(switch._ports) == model.poe_ports
+    assert switch.model == model
+    assert emulator.requests["/htdocs/login/login.lua"] == 1
+
+
+def test_device_update_changed(benchmark, event_loop, emulator, switch, ports):
+    # End-to-end latency of a poll over HTTP, when a port changes before each poll
+    def update():
+        config = emulator.ports["1"]
+        config["admin_mode_sel"] = "disabled" if config["admin_mode_sel"] == "enabled" else "enabled"
+        return event_loop.run_until_complete(switch.update())
+
+    benchmark(update)
+    assert switch._client.parse_skipped == 0
+
+
+def test_device_write(benchmark, event_loop, emulator, switch, ports):
+    # End-to-end latency of a bulk write of all ports, including the debounce window
+    event_loop.run_until_complete(switch.update())
+    states = {port: False for port in emulator.ports}
+    assert benchmark(lambda: event_loop.run_until_complete(switch.set_ports_state(states))) is True
+    assert all(config["admin_mode_sel"] == "disabled" for config in emulator.ports.values())
@@ -5,15 +5,19 @@ import pytest
 from aiohttp import ClientSession
 from aiohttp.client_exceptions import ClientResponseError
 from aiohttp.client_reqrep import RequestInfo
+from aiohttp.test_utils import TestServer
 
 from custom_components.hp1820 import async_setup
 from custom_components.hp1820.config_flow import Hp1820ConfigFlow
 from custom_components.hp1820.const import DOMAIN
 from custom_components.hp1820.coordinator import Hp1820Coordinator
 from custom_components.hp1820.devices import Hp1820Device
+from custom_components.hp1820.metrics import Hp1820Metrics
+from custom_components.hp1820.models import CONFIG_FIELDS, PoePowerStatus
 
+from .emulator import Hp1820Emulator
 from .hass.fixtures import MockConfigEntry
-from .helpers import _
+from .helpers import _, poe_ports
 
 pytest_plugins = ["tests.hass.fixtures"]
 
@@ -60,7 +64,7 @@ def device(config_entry, client):
     """
     m_device = Hp1820Device(config_entry, client)
 
-    m_device._ports = {"1": True, "2": False}
+    m_device._ports = poe_ports({"1": True, "2": False})
 
     m_device.update = AsyncMock()
     m_device.update.return_value = dict(m_device._ports)
@@ -99,6 +103,11 @@ def client(mocker):
     m_client.logout = AsyncMock()
     m_client.get_poe_state = AsyncMock()
     m_client.set_poe_state = AsyncMock()
+    m_client.set_ports_state = AsyncMock()
+    m_client.set_ports_config = AsyncMock()
+    m_client.get_poe_power = AsyncMock(return_value=PoePowerStatus({}))
+    m_client.metrics = Hp1820Metrics()
+    m_client.config_fields = CONFIG_FIELDS
 
     yield m_client
 
@@ -136,3 +145,17 @@ def client_response_error():
 @pytest.fixture(scope="function")
 def session():
     yield ClientSession()
+
+
+@pytest.fixture(scope="function")
+async def emulator(socket_enabled):
+    """Yields a running `Hp1820Emulator`, a fake switch reachable at `emulator.host`.
+
+    The emulator has the 24 PoE ports of the 48-port model and accepts `admin`/`password`.
+    Latency, error rate, session limits and expiry can be changed on the instance while tests run.
+    Sockets are enabled, as the emulator listens on the loopback interface.
+    """
+    m_emulator = Hp1820Emulator()
+    async with TestServer(m_emulator.app, host="127.0.0.1") as server:
+        m_emulator.host = f"{server.host}:{server.port}"
+        yield m_emulator
@@ -0,0 +1,302 @@
+"""Fake HP 1820 web interface, to exercise `Hp1820Client` over a real HTTP stack.
+
+The emulator serves the pages used by the integration, with the same flow of the
+firmware: the `SID` cookie is set by the login, it expires after some inactivity and
+pages requested without a valid `SID` redirect to the login page. Latency, error rates
+and the number of concurrent sessions can be tuned to reproduce a slow or busy switch.
+
+It's available as the `emulator` pytest fixture, or it can be run as a standalone server:
+
+    Usage: python -m tests.emulator [--model NAME] [--latency SECONDS] [--error-rate RATE] ...
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import secrets
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+from custom_components.hp1820.models import SWITCH_MODELS
+
+LOGIN_PAGE = "/htdocs/login/login.lsp"
+LOGIN_URL = "/htdocs/login/login.lua"
+LOGOUT_URL = "/htdocs/pages/main/logout.lsp"
+POE_URL = "/htdocs/pages/base/poe_port_cfg.lsp"
+POE_MODAL_URL = "/htdocs/pages/base/poe_port_cfg_modal.lsp"
+POE_STATUS_URL = "/htdocs/pages/base/poe_port_status.lsp"
+
+# Labels rendered in the PoE table for each value of the configuration form
+LABELS = {
+    "admin_mode_sel": {"enabled": "Enabled", "disabled": "Disabled"},
+    "priority_sel": {"critical": "Critical", "high": "High", "low": "Low"},
+    "schedule_sel": {"none": "None", "1": "1", "2": "2"},
+    "high_power_mode_sel": {"dot3at": "Enable", "disable": "Disable"},
+    "power_detect_type_sel": {"4pt_dot3af": "4pt 802.3af", "4pt_dot3af_leg": "4pt 802.3af + Legacy"},
+    "power_limit_type_sel": {"dot3af": "Class Based", "user": "User Defined"},
+}
+DEFAULT_PORT = {
+    "admin_mode_sel": "enabled",
+    "priority_sel": "low",
+    "schedule_sel": "none",
+    "high_power_mode_sel": "disable",
+    "power_detect_type_sel": "4pt_dot3af_leg",
+    "power_limit_type_sel": "dot3af",
+}
+
+
+def parse_interfaces(value: str) -> List[str]:
+    """Expand an interface list such as `1-3,5` in the list of port IDs."""
+    ports = []
+    for item in value.split(","):
+        item = item.strip()
+        if "-" in item:
+            first, last = item.split("-", 1)
+            ports.extend(str(port) for port in range(int(first), int(last) + 1))
+        elif item:
+            ports.append(item)
+    return ports
+
+
+class Hp1820Emulator:
+    """Hp1820Emulator keeps the state of a fake switch and serves its web interface.
+
+    Attributes that tune the behavior can be changed while the server is running.
+
+    Args:
+        ports: The number of PoE ports of the switch, `SwitchModel.poe_ports` of the emulated model.
+        username: The accepted username.
+        password: The accepted password.
+        sid_timeout: Seconds of inactivity after which a session expires.
+        latency: Seconds waited before answering each request.
+        jitter: Random seconds added to the latency, up to this value.
+        error_rate: Fraction of requests answered with a server error.
+        max_sessions: Number of concurrent sessions accepted, None for no limit.
+        padding: KiB of markup around the PoE table, as the real page embeds the whole UI.
+        power_budget: Watts that the switch can deliver to all of its ports.
+        seed: Seed of the random generator, to make errors and jitter reproducible.
+    """
+
+    def __init__(
+        self,
+        ports: int = 24,
+        username: str = "admin",
+        password: str = "password",
+        sid_timeout: float = 600,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        max_sessions: Optional[int] = 1,
+        padding: int = 0,
+        power_budget: float = 185.0,
+        seed: Optional[int] = None,
+    ):
+        self.username = username
+        self.password = password
+        self.sid_timeout = sid_timeout
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_sessions = max_sessions
+        self.padding = padding
+        self.power_budget = power_budget
+        self.ports: Dict[str, Dict[str, str]] = {}
+        self.sessions: Dict[str, float] = {}
+        self.requests: Counter = Counter()
+        self.errors = 0
+        # Address of the running server, as expected by `Hp1820Client`
+        self.host: Optional[str] = None
+        self._random = random.Random(seed)
+        self.resize(ports)
+
+    def resize(self, ports: int):
+        """Set the number of ports, new ports have the default configuration."""
+        self.ports = {str(port): dict(self.ports.get(str(port), DEFAULT_PORT)) for port in range(1, ports + 1)}
+
+    @property
+    def app(self) -> web.Application:
+        """Return a new aiohttp application serving the switch pages."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get(LOGIN_PAGE, self._login_page)
+        app.router.add_post(LOGIN_URL, self._login)
+        app.router.add_get(LOGOUT_URL, self._logout)
+        app.router.add_get(POE_URL, self._poe_page)
+        app.router.add_post(POE_MODAL_URL, self._poe_modal)
+        app.router.add_get(POE_STATUS_URL, self._poe_status_page)
+        return app
+
+    def render_poe_page(self) -> str:
+        """Render `poe_port_cfg.lsp` with the current state of the ports."""
+        rows = []
+        for port, config in self.ports.items():
+            enabled = config["admin_mode_sel"] == "enabled"
+            row = ['<input type="checkbox">', port]
+            row += [LABELS[field][config[field]] for field in LABELS]
+            row += ["Delivering Power" if enabled else "Disabled", "No Error"]
+            rows.append("[" + ", ".join(f"'{value}'" for value in row) + "]")
+
+        padding = "var sPadding = 'padding: 2px';\n" * (self.padding * 1024 // 32)
+        return (
+            "<html><head><script type='text/javascript'>\n"
+            + padding
+            + "var aDataSet = [\n"
+            + ",\n".join(rows)
+            + "];\n"
+            + "var aColumns = [{ 'sTitle': 'Interface' }, { 'sTitle': 'Admin Mode' }];\n"
+            + "</script></head><body></body></html>"
+        )
+
+    def port_power(self, port: str) -> float:
+        """Return the watts drawn by a port, each enabled port powers a device of a different size."""
+        if self.ports[port]["admin_mode_sel"] != "enabled":
+            return 0.0
+        return round(2.5 + int(port) % 5 * 1.5, 1)
+
+    def render_poe_status_page(self) -> str:
+        """Render `poe_port_status.lsp` with the power drawn by each port and the PoE budget."""
+        rows = []
+        for port in self.ports:
+            power = self.port_power(port)
+            row = ['<input type="checkbox">', port]
+            if power:
+                row += [f"{power:.1f}", f"{power / 53.5 * 1000:.0f}", "53.5"]
+            else:
+                row += ["0.0", "0", "0.0"]
+            rows.append("[" + ", ".join(f"'{value}'" for value in row) + "]")
+
+        consumed = sum(self.port_power(port) for port in self.ports)
+        return (
+            "<html><head><script type='text/javascript'>\n"
+            + "var aDataSet = [\n"
+            + ",\n".join(rows)
+            + "];\n"
+            + f"var aPoeSummary = ['{self.power_budget:.1f}', '{consumed:.1f}'];\n"
+            + "</script></head><body></body></html>"
+        )
+
+    def expire_sessions(self):
+        """Expire all sessions, as after a reboot of the switch."""
+        self.sessions.clear()
+
+    def _active_sid(self, request: web.Request) -> Optional[str]:
+        now = time.monotonic()
+        for sid, last_seen in list(self.sessions.items()):
+            if now - last_seen > self.sid_timeout:
+                del self.sessions[sid]
+
+        sid = request.cookies.get("SID")
+        if sid in self.sessions:
+            self.sessions[sid] = now
+            return sid
+        return None
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.requests[request.path] += 1
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            raise web.HTTPInternalServerError()
+        return await handler(request)
+
+    async def _login_page(self, request: web.Request) -> web.Response:
+        return web.Response(text="<html><form action='/htdocs/login/login.lua'>login</form></html>")
+
+    async def _login(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if form.get("username") != self.username or form.get("password") != self.password:
+            return web.json_response({"error": "Invalid username or password"})
+
+        # A login from an active session replaces it, other clients must wait for a free session
+        current = self._active_sid(request)
+        if current is not None:
+            del self.sessions[current]
+        if self.max_sessions is not None and len(self.sessions) >= self.max_sessions:
+            return web.json_response({"error": "Maximum number of sessions reached"})
+
+        sid = secrets.token_hex(16)
+        self.sessions[sid] = time.monotonic()
+        response = web.json_response({"error": ""})
+        response.set_cookie("SID", sid, path="/")
+        return response
+
+    async def _logout(self, request: web.Request) -> web.Response:
+        sid = self._active_sid(request)
+        if sid is not None:
+            del self.sessions[sid]
+        raise web.HTTPFound(LOGIN_PAGE)
+
+    async def _poe_page(self, request: web.Request) -> web.Response:
+        if self._active_sid(request) is None:
+            raise web.HTTPFound(LOGIN_PAGE)
+        return web.Response(text=self.render_poe_page(), content_type="text/html")
+
+    async def _poe_status_page(self, request: web.Request) -> web.Response:
+        if self._active_sid(request) is None:
+            raise web.HTTPFound(LOGIN_PAGE)
+        return web.Response(text=self.render_poe_status_page(), content_type="text/html")
+
+    async def _poe_modal(self, request: web.Request) -> web.Response:
+        if self._active_sid(request) is None:
+            raise web.HTTPFound(LOGIN_PAGE)
+
+        form = await request.post()
+        ports = parse_interfaces(str(form.get("intfStr", "")))
+        config = {field: str(form.get(f"{field}[]", "")) for field in LABELS}
+        invalid = [field for field, value in config.items() if value not in LABELS[field]]
+        if invalid or not ports or any(port not in self.ports for port in ports):
+            raise web.HTTPBadRequest(text=json.dumps({"invalid": invalid, "ports": ports}))
+
+        for port in ports:
+            self.ports[port].update(config)
+        return web.Response(text="<html><body>OK</body></html>", content_type="text/html")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake HP 1820 web interface")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="TCP port to listen on")
+    parser.add_argument(
+        "--model",
+        choices=[model.name for model in SWITCH_MODELS],
+        default="1820-48G-PoE+",
+        help="switch model, sets the number of PoE ports",
+    )
+    parser.add_argument("--ports", type=int, default=None, help="number of PoE ports, overrides the model")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--sid-timeout", type=float, default=600, help="session expiry in seconds")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--max-sessions", type=int, default=1, help="concurrent sessions, 0 for no limit")
+    parser.add_argument("--padding", type=int, default=32, help="KiB of markup around the PoE table")
+    parser.add_argument("--power-budget", type=float, default=185.0, help="PoE budget in watts")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    model = next(model for model in SWITCH_MODELS if model.name == args.model)
+
+    emulator = Hp1820Emulator(
+        ports=args.ports or model.poe_ports,
+        username=args.username,
+        password=args.password,
+        sid_timeout=args.sid_timeout,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        max_sessions=args.max_sessions or None,
+        padding=args.padding,
+        power_budget=args.power_budget,
+        seed=args.seed,
+    )
+    web.run_app(emulator.app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,20 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+from custom_components.hp1820.models import (
+    AdminMode,
+    DetectType,
+    FaultStatus,
+    HighPowerMode,
+    LimitType,
+    PoePortPower,
+    PoePortState,
+    PoePowerStatus,
+    PoeStatus,
+    Priority,
+    Schedule,
+)
+
+
 def _(mock_path: str) -> str:
     """Helper to simplify Mock path strings.
 
@@ -12,3 +29,58 @@ def _(mock_path: str) -> str:
         "custom_components.hp1820.module.Class.method"
     """
     return f"custom_components.hp1820.{mock_path}"
+
+
+def poe_ports(states: Dict[str, bool]) -> Dict[str, PoePortState]:
+    """Helper to build the PoE state of the ports of a switch.
+
+    Args:
+        states (dict): The admin mode of each port.
+
+    Returns:
+        dict: A `PoePortState` for each port, with the settings the switch uses by default.
+
+    Example:
+        >>> poe_ports({"1": True})
+        {"1": PoePortState(interface="1", admin_mode=AdminMode.ENABLED, ...)}
+    """
+    return {
+        port: PoePortState(
+            port,
+            AdminMode.ENABLED if enabled else AdminMode.DISABLED,
+            Priority.LOW,
+            Schedule.NONE,
+            HighPowerMode.DISABLE,
+            DetectType.DOT3AF_LEGACY,
+            LimitType.DOT3AF,
+            PoeStatus.DELIVERING if enabled else PoeStatus.DISABLED,
+            FaultStatus.NO_ERROR,
+        )
+        for port, enabled in states.items()
+    }
+
+
+def admin_modes(ports: Iterable[Tuple[str, PoePortState]]) -> Dict[str, bool]:
+    """Helper to extract the admin mode of each port, e.g. from `Hp1820Device.ports`."""
+    return {port: state.enabled for port, state in ports}
+
+
+def power_status(power: Dict[str, Optional[float]], budget: Optional[float] = None) -> PoePowerStatus:
+    """Helper to build the power drawn by the ports of a switch.
+
+    Args:
+        power (dict): The power in W drawn by each port, None if no device is powered.
+        budget (float): The PoE budget of the switch in W.
+
+    Returns:
+        PoePowerStatus: The power of each port at 53.5 V, with the consumed power as their sum.
+
+    Example:
+        >>> power_status({"1": 5.35}, budget=65.0)
+        PoePowerStatus(ports={"1": PoePortPower(interface="1", power=5.35, current=100.0, voltage=53.5)}, ...)
+    """
+    ports = {
+        port: PoePortPower(port, watts, None if watts is None else round(watts / 53.5 * 1000, 1), 53.5)
+        for port, watts in power.items()
+    }
+    return PoePowerStatus(ports, budget, round(sum(watts or 0.0 for watts in power.values()), 1))
@@ -0,0 +1,163 @@
+"""Fake SNMP agent of an HP 1820, to exercise `Hp1820SnmpClient` without a network.
+
+The agent holds the POWER-ETHERNET-MIB objects of the switch in memory, and answers
+GETBULK and SET requests with the same semantics of a real agent: GETBULK returns the
+objects that follow each requested OID in lexicographic order, and a SET changes all the
+objects or none of them.
+
+Install it on a client with `agent.attach(client)`, which replaces the methods that send
+the requests. To exercise pysnmp as well, serve the agent over UDP with `SnmpResponder`,
+and connect the client to it with the `port` argument of `Hp1820SnmpClient`.
+"""
+
+import socket
+from typing import Dict, List, Optional, Tuple
+
+from custom_components.hp1820.snmp import (
+    MAIN_PSE_CONSUMPTION_POWER,
+    MAIN_PSE_POWER,
+    PSE_PORT_ADMIN_ENABLE,
+    PSE_PORT_DETECTION_STATUS,
+    PSE_PORT_POWER_PRIORITY,
+    SnmpError,
+)
+
+# Unrelated objects around the PoE tables, so that walks must stop at the end of each column
+SYS_DESCR = "1.3.6.1.2.1.1.1.0"
+AFTER_POE = "1.3.6.1.2.1.106.1.1.0"
+
+
+def _key(oid: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in oid.split("."))
+
+
+class SnmpAgent:
+    def __init__(self, ports: int = 8, budget: int = 65, max_repetitions: Optional[int] = None):
+        self.objects: Dict[str, int] = {SYS_DESCR: 0, AFTER_POE: 0}
+        for port in range(1, ports + 1):
+            self.objects[f"{PSE_PORT_ADMIN_ENABLE}.1.{port}"] = 1
+            self.objects[f"{PSE_PORT_DETECTION_STATUS}.1.{port}"] = 3
+            self.objects[f"{PSE_PORT_POWER_PRIORITY}.1.{port}"] = 3
+        self.objects[f"{MAIN_PSE_POWER}.1"] = budget
+        self.objects[f"{MAIN_PSE_CONSUMPTION_POWER}.1"] = 0
+        self.max_repetitions = max_repetitions
+        self.requests: List[str] = []
+        self.community_valid = True
+
+    def attach(self, client):
+        client._bulk = self.bulk
+        client._set_chunk = self.set
+
+    async def bulk(self, oids: List[str]) -> List[List[Tuple[str, Optional[int]]]]:
+        self.requests.append("GETBULK")
+        self._check_community()
+        ordered = sorted(self.objects, key=_key)
+        repetitions = self.max_repetitions or 25
+        columns = []
+        for oid in oids:
+            following = [name for name in ordered if _key(name) > _key(oid)][:repetitions]
+            # Past the last object, the agent answers with `endOfMibView`
+            following += [oid] * (repetitions - len(following))
+            columns.append([(name, self.objects[name] if name != oid else None) for name in following])
+        return [list(row) for row in zip(*columns)]
+
+    async def set(self, values: List[Tuple[str, int]]):
+        self.requests.append("SET")
+        self._check_community()
+        missing = self.missing(values)
+        if missing:
+            raise SnmpError(f"noCreation at variable {missing[0]}")
+        self.write(values)
+
+    def following(self, oid: str) -> Optional[str]:
+        # The next object in lexicographic order, None past the last one
+        return next((name for name in sorted(self.objects, key=_key) if _key(name) > _key(oid)), None)
+
+    def missing(self, values: List[Tuple[str, int]]) -> List[str]:
+        return [oid for oid, _ in values if oid not in self.objects]
+
+    def write(self, values: List[Tuple[str, int]]):
+        for oid, value in values:
+            self.objects[oid] = value
+            if oid.startswith(f"{PSE_PORT_ADMIN_ENABLE}."):
+                index = oid.removeprefix(f"{PSE_PORT_ADMIN_ENABLE}.")
+                self.objects[f"{PSE_PORT_DETECTION_STATUS}.{index}"] = 3 if value == 1 else 1
+
+    def _check_community(self):
+        if not self.community_valid:
+            raise SnmpError("No SNMP response received before timeout")
+
+
+class SnmpResponder:
+    """Serves the objects of an `SnmpAgent` with the SNMP engine of pysnmp, on the loopback interface.
+
+    Requests go through the whole stack of pysnmp (BER encoding, UDP transport, community
+    and access control), so that the real `_bulk` and `_set` of the client are exercised.
+    """
+
+    def __init__(self, agent: SnmpAgent, community: str):
+        from pysnmp.carrier.asyncio.dgram import udp
+        from pysnmp.entity import config, engine
+        from pysnmp.entity.rfc3413 import cmdrsp, context
+
+        self.agent = agent
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self.port = self._socket.getsockname()[1]
+        self._engine = engine.SnmpEngine()
+        config.addTransport(self._engine, udp.domainName, udp.UdpTransport().openServerMode(sock=self._socket))
+        config.addV1System(self._engine, "agent", community)
+        config.addVacmUser(self._engine, 2, "agent", "noAuthNoPriv", readSubTree=(1, 3, 6), writeSubTree=(1, 3, 6))
+        snmp_context = context.SnmpContext(self._engine)
+        snmp_context.unregisterContextName("")
+        snmp_context.registerContextName("", _Instrumentation(agent))
+        for responder in (cmdrsp.GetCommandResponder, cmdrsp.BulkCommandResponder, cmdrsp.SetCommandResponder):
+            responder(self._engine, snmp_context)
+
+    def close(self):
+        self._engine.transportDispatcher.closeDispatcher()
+
+
+class _Instrumentation:
+    """MIB instrumentation of pysnmp, backed by the objects of an `SnmpAgent`."""
+
+    def __init__(self, agent: SnmpAgent):
+        self._agent = agent
+
+    def readVars(self, varBinds, acInfo=(None, None)):
+        from pysnmp.proto import rfc1902, rfc1905
+
+        return [
+            (
+                name,
+                (
+                    rfc1902.Integer(self._agent.objects[str(name)])
+                    if str(name) in self._agent.objects
+                    else rfc1905.noSuchInstance
+                ),
+            )
+            for name, _ in varBinds
+        ]
+
+    def readNextVars(self, varBinds, acInfo=(None, None)):
+        from pysnmp.proto import rfc1902, rfc1905
+
+        result = []
+        for name, _ in varBinds:
+            following = self._agent.following(str(name))
+            if following is None:
+                result.append((name, rfc1905.endOfMibView))
+            else:
+                result.append((rfc1902.ObjectName(following), rfc1902.Integer(self._agent.objects[following])))
+        return result
+
+    def writeVars(self, varBinds, acInfo=(None, None)):
+        from pysnmp.smi import error
+
+        self._agent.requests.append("SET")
+        values = [(str(name), int(value)) for name, value in varBinds]
+        missing = self._agent.missing(values)
+        if missing:
+            raise error.NoCreationError(name=missing[0], idx=[oid for oid, _ in values].index(missing[0]))
+        self._agent.write(values)
+        return varBinds
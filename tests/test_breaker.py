@@ -0,0 +1,96 @@
+import pytest
+
+from custom_components.hp1820.breaker import CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_closed():
+    # Ensure requests are allowed until the threshold is reached
+    breaker = CircuitBreaker("test_ip", 3, 60, Clock())
+    breaker.failure()
+    breaker.failure()
+    breaker.check()
+    assert breaker.state == "closed"
+
+
+def test_breaker_success_resets_failures():
+    breaker = CircuitBreaker("test_ip", 3, 60, Clock())
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    assert breaker.state == "closed"
+    assert breaker.failures == 1
+
+
+def test_breaker_open():
+    # Ensure requests fail fast once the circuit is open
+    clock = Clock()
+    breaker = CircuitBreaker("test_ip", 3, 60, clock)
+    for _ in range(3):
+        breaker.failure()
+    clock.now = 15
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.check()
+    assert breaker.state == "open"
+    assert excinfo.value.retry_in == 45
+    assert str(excinfo.value) == "test_ip is unreachable, next attempt in 45 seconds"
+
+
+def test_breaker_half_open_success():
+    # Ensure a successful probe closes the circuit
+    clock = Clock()
+    breaker = CircuitBreaker("test_ip", 1, 60, clock)
+    breaker.failure()
+    clock.now = 60
+    breaker.check()
+    assert breaker.state == "half_open"
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.success()
+    assert breaker.state == "closed"
+    breaker.check()
+
+
+def test_breaker_half_open_failure():
+    # Ensure a failed probe opens the circuit for another reset timeout
+    clock = Clock()
+    breaker = CircuitBreaker("test_ip", 3, 60, clock)
+    for _ in range(3):
+        breaker.failure()
+    clock.now = 61
+    breaker.check()
+    breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.check()
+    assert excinfo.value.retry_in == 60
+
+
+def test_breaker_half_open_release():
+    # Ensure an unfinished probe lets the next request probe again
+    clock = Clock()
+    breaker = CircuitBreaker("test_ip", 1, 60, clock)
+    breaker.failure()
+    clock.now = 60
+    breaker.check()
+    breaker.release()
+    assert breaker.state == "open"
+    breaker.check()
+    assert breaker.state == "half_open"
+
+
+def test_breaker_release_closed():
+    # Ensure releasing a request doesn't change a closed circuit
+    breaker = CircuitBreaker("test_ip", 1, 60, Clock())
+    breaker.release()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
@@ -1,7 +1,64 @@
+import asyncio
+from unittest.mock import Mock
+
 import pytest
+from aiohttp import ClientTimeout
+from aiohttp.client_exceptions import ClientConnectionError, ClientResponseError
 from aioresponses import aioresponses
+from yarl import URL
+
+from custom_components.hp1820.backend import PartialWriteError
+from custom_components.hp1820.breaker import CircuitOpenError
+from custom_components.hp1820.client import (
+    Hp1820Client,
+    SessionExpiredError,
+    create_session,
+)
+from custom_components.hp1820.models import (
+    AdminMode,
+    DetectType,
+    FaultStatus,
+    HighPowerMode,
+    LimitType,
+    PoePortState,
+    PoeStatus,
+    Priority,
+    Schedule,
+)
 
-from custom_components.hp1820.client import Hp1820Client
+
+@pytest.mark.asyncio
+async def test_create_session():
+    # Ensure each session has its own cookie jar and a tuned connector
+    async with create_session() as first, create_session() as second:
+        assert first.cookie_jar is not second.cookie_jar
+        assert first.connector.limit_per_host == 2
+        assert first.connector._keepalive_timeout == 60
+        assert first.connector.use_dns_cache is True
+        assert first.connector._cached_hosts._ttl == 300
+
+
+@pytest.mark.asyncio
+async def test_create_session_isolated_cookies():
+    # Ensure the SID of a switch is not sent to another switch
+    async with create_session() as first, create_session() as second:
+        with aioresponses() as mocked:
+            mocked.post(
+                "http://10.0.0.1/htdocs/login/login.lua",
+                status=200,
+                payload={"error": ""},
+                headers={"Set-Cookie": "SID=first"},
+            )
+            mocked.post(
+                "http://10.0.0.2/htdocs/login/login.lua",
+                status=200,
+                payload={"error": ""},
+                headers={"Set-Cookie": "SID=second"},
+            )
+            await Hp1820Client(first, "10.0.0.1").login("user", "pass")
+            await Hp1820Client(second, "10.0.0.2").login("user", "pass")
+        assert first.cookie_jar.filter_cookies(URL("http://10.0.0.1"))["SID"].value == "first"
+        assert second.cookie_jar.filter_cookies(URL("http://10.0.0.2"))["SID"].value == "second"
 
 
 def test_client_constructor(session):
@@ -33,6 +90,404 @@ async def test_client_login_successful(mocker, session):
         mocked.assert_called_once_with(
             "http://127.0.0.1/htdocs/login/login.lua",
             method="POST",
+            timeout=ClientTimeout(total=10),
             data={"username": "test_username", "password": "test_password"},
         )
         session.cookie_jar.update_cookies.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_client_logout(session):
+    client = Hp1820Client(session, "127.0.0.1")
+    with aioresponses() as mocked:
+        mocked.get("http://127.0.0.1/htdocs/pages/main/logout.lsp", status=200, body="login")
+        await client.logout()
+        mocked.assert_called_once_with(
+            "http://127.0.0.1/htdocs/pages/main/logout.lsp", method="GET", timeout=ClientTimeout(total=10)
+        )
+
+
+@pytest.mark.asyncio
+async def test_client_session_expired_redirect(session):
+    # Ensure a redirect to the login page is reported as an expired session
+    client = Hp1820Client(session, "127.0.0.1")
+    with aioresponses() as mocked:
+        mocked.get(
+            "http://127.0.0.1/htdocs/pages/base/poe_port_cfg.lsp",
+            status=302,
+            headers={"Location": "http://127.0.0.1/htdocs/login/login.lsp"},
+        )
+        mocked.get("http://127.0.0.1/htdocs/login/login.lsp", status=200, body="<html>login</html>")
+        with pytest.raises(SessionExpiredError):
+            await client.get_poe_state()
+
+
+@pytest.mark.asyncio
+async def test_client_session_expired_unauthorized(session):
+    # Ensure an unauthorized response is reported as an expired session
+    client = Hp1820Client(session, "127.0.0.1")
+    with aioresponses() as mocked:
+        mocked.post("http://127.0.0.1/htdocs/pages/base/poe_port_cfg_modal.lsp", status=401)
+        with pytest.raises(SessionExpiredError):
+            await client.set_poe_state("1", True)
+
+
+@pytest.mark.asyncio
+async def test_client_session_expired_login_page(session):
+    # Ensure the login page rendered in place of the table is reported as an expired session
+    client = Hp1820Client(session, "127.0.0.1")
+    with aioresponses() as mocked:
+        mocked.get(
+            "http://127.0.0.1/htdocs/pages/base/poe_port_cfg.lsp",
+            status=200,
+            body='<form action="/htdocs/login/login.lua"></form>',
+        )
+        with pytest.raises(SessionExpiredError):
+            await client.get_poe_state()
+
+
+@pytest.mark.asyncio
+async def test_client_set_ports_state_grouped(session):
+    # Ensure ports with the same target state are updated with a single request
+    client = Hp1820Client(session, "127.0.0.1")
+    url = "http://127.0.0.1/htdocs/pages/base/poe_port_cfg_modal.lsp"
+    with aioresponses() as mocked:
+        mocked.post(url, status=200, repeat=True)
+        await client.set_ports_state({"1": False, "2": False, "3": False, "5": True, "6": True, "9": False})
+        requests = mocked.requests[("POST", URL(url))]
+        assert len(requests) == 2
+        payloads = sorted((r.kwargs["data"]["intfStr"], r.kwargs["data"]["admin_mode_sel[]"]) for r in requests)
+        assert payloads == [("1-3,9", "disabled"), ("5-6", "enabled")]
+
+
+@pytest.mark.asyncio
+async def test_client_set_ports_config_grouped(session):
+    # Ensure ports with the same target configuration are written with a single request
+    client = Hp1820Client(session, "127.0.0.1")
+    high = PoePortState("1", AdminMode.ENABLED, Priority.HIGH).to_config(power_limit=15.4)
+    low = PoePortState("3", AdminMode.ENABLED, Priority.LOW).to_config()
+    url = "http://127.0.0.1/htdocs/pages/base/poe_port_cfg_modal.lsp"
+    with aioresponses() as mocked:
+        mocked.post(url, status=200, repeat=True)
+        await client.set_ports_config({"1": high, "2": high, "3": low})
+        requests = mocked.requests[("POST", URL(url))]
+        assert len(requests) == 2
+        payloads = sorted(
+            (r.kwargs["data"]["intfStr"], r.kwargs["data"]["priority_sel[]"], r.kwargs["data"]["power_limit"])
+            for r in requests
+        )
+        assert payloads == [("1-2", "high", "15.4"), ("3", "low", "")]
+
+
+@pytest.mark.asyncio
+async def test_client_set_ports_state_partial_error(session):
+    # Ensure the groups written before an error are reported
+    client = Hp1820Client(session, "127.0.0.1")
+    url = "http://127.0.0.1/htdocs/pages/base/poe_port_cfg_modal.lsp"
+    with aioresponses() as mocked:
+        mocked.post(url, status=200)
+        mocked.post(url, status=400)
+        with pytest.raises(PartialWriteError) as err:
+            await client.set_ports_state({"1": False, "2": False, "5": True})
+        assert err.value.written == ["1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_client_set_ports_state_first_group_error(session):
+    # Ensure an error of the first group is raised as is
+    client = Hp1820Client(session, "127.0.0.1")
+    url = "http://127.0.0.1/htdocs/pages/base/poe_port_cfg_modal.lsp"
+    with aioresponses() as mocked:
+        mocked.post(url, status=400)
+        with pytest.raises(ClientResponseError):
+            await client.set_ports_state({"1": False, "5": True})
+
+
+@pytest.mark.asyncio
+async def test_client_set_poe_state(session):
+    # Ensure a single port is updated with the modal request
+    client = Hp1820Client(session, "127.0.0.1")
+    url = "http://127.0.0.1/htdocs/pages/base/poe_port_cfg_modal.lsp"
+    with aioresponses() as mocked:
+        mocked.post(url, status=200)
+        await client.set_poe_state("4", True)
+        request = mocked.requests[("POST", URL(url))][0]
+        assert request.kwargs["data"]["intfStr"] == "4"
+        assert request.kwargs["data"]["admin_mode_sel[]"] == "enabled"
+        assert request.kwargs["data"]["b_modal1_clicked"] == "b_modal1_submit"
+        assert request.kwargs["data"]["priority_sel[]"] == "low"
+
+
+@pytest.mark.asyncio
+async def test_client_set_poe_state_keeps_settings(session):
+    # Ensure the current settings of the port are sent along with the admin mode
+    client = Hp1820Client(session, "127.0.0.1")
+    current = PoePortState("4", AdminMode.DISABLED, Priority.CRITICAL, Schedule.SCHEDULE_1, HighPowerMode.DOT3AT)
+    url = "http://127.0.0.1/htdocs/pages/base/poe_port_cfg_modal.lsp"
+    with aioresponses() as mocked:
+        mocked.post(url, status=200)
+        await client.set_poe_state("4", True, current)
+        request = mocked.requests[("POST", URL(url))][0]
+        assert request.kwargs["data"]["admin_mode_sel[]"] == "enabled"
+        assert request.kwargs["data"]["priority_sel[]"] == "critical"
+        assert request.kwargs["data"]["schedule_sel[]"] == "1"
+        assert request.kwargs["data"]["high_power_mode_sel[]"] == "dot3at"
+        assert request.kwargs["data"]["power_detect_type_sel[]"] == "4pt_dot3af"
+
+
+@pytest.mark.asyncio
+async def test_client_get_poe_state(session):
+    # Ensure the admin mode of each port is parsed from the table
+    client = Hp1820Client(session, "127.0.0.1")
+    page = """<script>
+    var aDataSet = [
+        ['', '1', 'Enabled', 'Low', 'None', 'Disable', '4pt 802.3af', 'Class Based', 'Searching', 'No Error'],
+        ['', '2', 'Disabled', 'Low', 'None', 'Disable', '4pt 802.3af', 'Class Based', 'Disabled', 'No Error']
+    ];
+    var aColumns = [];
+    </script>"""
+    with aioresponses() as mocked:
+        mocked.get("http://127.0.0.1/htdocs/pages/base/poe_port_cfg.lsp", status=200, body=page)
+        ports = await client.get_poe_state()
+        assert list(ports) == ["1", "2"]
+        assert ports["1"] == PoePortState(
+            "1",
+            AdminMode.ENABLED,
+            Priority.LOW,
+            Schedule.NONE,
+            HighPowerMode.DISABLE,
+            DetectType.DOT3AF,
+            LimitType.DOT3AF,
+            PoeStatus.SEARCHING,
+            FaultStatus.NO_ERROR,
+        )
+        assert ports["2"].enabled is False
+        assert ports["2"].status is PoeStatus.DISABLED
+
+
+@pytest.mark.asyncio
+async def test_client_get_poe_state_unchanged(mocker, session):
+    # Ensure an unchanged table is not parsed again
+    client = Hp1820Client(session, "127.0.0.1")
+    mocker.spy(client, "_parse_status")
+    url = "http://127.0.0.1/htdocs/pages/base/poe_port_cfg.lsp"
+    with aioresponses() as mocked:
+        mocked.get(url, status=200, body="<script>var aDataSet = [['', '1', 'Enabled']];</script><p>1</p>")
+        mocked.get(url, status=200, body="<script>var aDataSet = [['', '1', 'Enabled']];</script><p>2</p>")
+        first = await client.get_poe_state()
+        second = await client.get_poe_state()
+    assert first == second
+    assert first is not second
+    assert client._parse_status.call_count == 1
+    assert client.parse_skipped == 1
+
+
+@pytest.mark.asyncio
+async def test_client_get_poe_state_changed(mocker, session):
+    # Ensure a changed table is parsed again
+    client = Hp1820Client(session, "127.0.0.1")
+    mocker.spy(client, "_parse_status")
+    url = "http://127.0.0.1/htdocs/pages/base/poe_port_cfg.lsp"
+    with aioresponses() as mocked:
+        mocked.get(url, status=200, body="<script>var aDataSet = [['', '1', 'Enabled']];</script>")
+        mocked.get(url, status=200, body="<script>var aDataSet = [['', '1', 'Disabled']];</script>")
+        await client.get_poe_state()
+        ports = await client.get_poe_state()
+    assert ports["1"].enabled is False
+    assert client._parse_status.call_count == 2
+    assert client.parse_skipped == 0
+
+
+POE_URL = "http://127.0.0.1/htdocs/pages/base/poe_port_cfg.lsp"
+MODAL_URL = "http://127.0.0.1/htdocs/pages/base/poe_port_cfg_modal.lsp"
+POE_PAGE = "<script>var aDataSet = [['', '1', 'Enabled']];</script>"
+
+
+@pytest.fixture
+def fast_client(session):
+    # Retries without waiting
+    client = Hp1820Client(session, "127.0.0.1")
+    client.retry_backoff = 0
+    return client
+
+
+@pytest.mark.asyncio
+async def test_client_get_timeout(session):
+    # Ensure page reads have a timeout and writes have a longer one
+    client = Hp1820Client(session, "127.0.0.1")
+    with aioresponses() as mocked:
+        mocked.get(POE_URL, status=200, body=POE_PAGE)
+        mocked.post(MODAL_URL, status=200)
+        await client.get_poe_state()
+        await client.set_poe_state("1", False)
+        assert mocked.requests[("GET", URL(POE_URL))][0].kwargs["timeout"] == ClientTimeout(total=10)
+        assert mocked.requests[("POST", URL(MODAL_URL))][0].kwargs["timeout"] == ClientTimeout(total=20)
+
+
+@pytest.mark.asyncio
+async def test_client_get_retry(fast_client):
+    # Ensure transient errors of page reads are retried
+    with aioresponses() as mocked:
+        mocked.get(POE_URL, exception=asyncio.TimeoutError())
+        mocked.get(POE_URL, status=503)
+        mocked.get(POE_URL, status=200, body=POE_PAGE)
+        ports = await fast_client.get_poe_state()
+        assert len(mocked.requests[("GET", URL(POE_URL))]) == 3
+    assert list(ports) == ["1"]
+    assert fast_client.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_client_get_retry_exhausted(fast_client):
+    # Ensure the last error is raised once retries are exhausted
+    with aioresponses() as mocked:
+        mocked.get(POE_URL, exception=ClientConnectionError(), repeat=True)
+        with pytest.raises(ClientConnectionError):
+            await fast_client.get_poe_state()
+        assert len(mocked.requests[("GET", URL(POE_URL))]) == 3
+    assert fast_client.breaker.failures == 1
+
+
+@pytest.mark.asyncio
+async def test_client_get_no_retry_client_error(fast_client):
+    # Ensure client errors are not retried
+    with aioresponses() as mocked:
+        mocked.get(POE_URL, status=404, repeat=True)
+        with pytest.raises(ClientResponseError):
+            await fast_client.get_poe_state()
+        assert len(mocked.requests[("GET", URL(POE_URL))]) == 1
+    assert fast_client.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_client_post_no_retry(fast_client):
+    # Ensure writes are not retried, as they may be applied already
+    with aioresponses() as mocked:
+        mocked.post(MODAL_URL, status=500, repeat=True)
+        with pytest.raises(ClientResponseError):
+            await fast_client.set_poe_state("1", False)
+        assert len(mocked.requests[("POST", URL(MODAL_URL))]) == 1
+
+
+@pytest.mark.asyncio
+async def test_client_circuit_breaker(fast_client):
+    # Ensure an unreachable switch is not contacted until the reset timeout
+    with aioresponses() as mocked:
+        mocked.get(POE_URL, exception=ClientConnectionError(), repeat=True)
+        for _ in range(3):
+            with pytest.raises(ClientConnectionError):
+                await fast_client.get_poe_state()
+        # Test
+        with pytest.raises(CircuitOpenError):
+            await fast_client.get_poe_state()
+        assert len(mocked.requests[("GET", URL(POE_URL))]) == 9
+
+
+@pytest.mark.asyncio
+async def test_client_circuit_breaker_probe_cancelled(fast_client):
+    # Ensure a cancelled probe doesn't keep the switch locked out
+    fast_client.breaker.failure()
+    fast_client.breaker.failure()
+    fast_client.breaker.failure()
+    fast_client.breaker._opened_at -= fast_client.breaker.reset_timeout
+    started = asyncio.Event()
+
+    async def hang(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(60)
+
+    session = fast_client._session
+    fast_client._session = Mock(request=hang)
+    probe = asyncio.ensure_future(fast_client.get_poe_state())
+    await started.wait()
+    assert fast_client.breaker.state == "half_open"
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    # Test
+    assert fast_client.breaker.state == "open"
+    fast_client._session = session
+    with aioresponses() as mocked:
+        mocked.get(POE_URL, status=200, body=POE_PAGE)
+        ports = await fast_client.get_poe_state()
+    assert list(ports) == ["1"]
+    assert fast_client.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_client_metrics(fast_client):
+    # Ensure requests, retries and the time of each step are measured
+    with aioresponses() as mocked:
+        mocked.post(
+            "http://127.0.0.1/htdocs/login/login.lua",
+            status=200,
+            payload={"error": ""},
+            headers={"Set-Cookie": "SID=1"},
+        )
+        mocked.get(POE_URL, status=503)
+        mocked.get(POE_URL, status=200, body=POE_PAGE)
+        mocked.post(MODAL_URL, status=200)
+        await fast_client.login("admin", "password")
+        await fast_client.get_poe_state()
+        await fast_client.set_poe_state("1", False)
+    metrics = fast_client.metrics
+    assert metrics.counters["logins"] == 1
+    assert metrics.counters["requests"] == 4
+    assert metrics.counters["retries"] == 1
+    assert metrics.counters["request_failures"] == 0
+    for name in ("login", "fetch", "parse", "write"):
+        assert len(metrics.latencies[name]) == 1
+
+
+@pytest.mark.asyncio
+async def test_client_metrics_request_failures(fast_client):
+    # Ensure requests that fail after all retries are counted
+    with aioresponses() as mocked:
+        mocked.get(POE_URL, exception=ClientConnectionError(), repeat=True)
+        with pytest.raises(ClientConnectionError):
+            await fast_client.get_poe_state()
+    assert fast_client.metrics.counters["requests"] == 3
+    assert fast_client.metrics.counters["retries"] == 2
+    assert fast_client.metrics.counters["request_failures"] == 1
+    assert len(fast_client.metrics.latencies["fetch"]) == 1
+    assert len(fast_client.metrics.latencies["parse"]) == 0
+
+
+STATUS_URL = "http://127.0.0.1/htdocs/pages/base/poe_port_status.lsp"
+
+
+@pytest.mark.asyncio
+async def test_client_get_poe_power(session):
+    # Ensure the power of each port and the budget are read from the status page
+    client = Hp1820Client(session, "127.0.0.1")
+    body = "<script>var aDataSet = [['', '1', '4.2', '78', '53.5'], ['', '2', '0.0', '0', '0.0']];\n"
+    body += "var aPoeSummary = ['65.0', '4.2'];</script>"
+    with aioresponses() as mocked:
+        mocked.get(STATUS_URL, status=200, body=body)
+        power = await client.get_poe_power()
+    assert power.ports["1"].power == 4.2
+    assert power.ports["1"].current == 78.0
+    assert power.ports["2"].voltage == 0.0
+    assert power.budget == 65.0
+    assert power.consumed == 4.2
+
+
+@pytest.mark.asyncio
+async def test_client_get_poe_power_without_summary(session):
+    # Ensure the consumed power is computed if the page has no summary
+    client = Hp1820Client(session, "127.0.0.1")
+    with aioresponses() as mocked:
+        mocked.get(STATUS_URL, status=200, body="<script>var aDataSet = [['', '1', '4.2'], ['', '2', '1.3']];</script>")
+        power = await client.get_poe_power()
+    assert power.budget is None
+    assert power.consumed == pytest.approx(5.5)
+
+
+@pytest.mark.asyncio
+async def test_client_get_poe_power_session_expired(session):
+    # Ensure the login page rendered in place of the status page is detected
+    client = Hp1820Client(session, "127.0.0.1")
+    with aioresponses() as mocked:
+        mocked.get(STATUS_URL, status=200, body="<html><form>login</form></html>")
+        with pytest.raises(SessionExpiredError):
+            await client.get_poe_power()
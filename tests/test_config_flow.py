@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock
 from homeassistant import config_entries
 
 from custom_components.hp1820.const import DOMAIN
+from custom_components.hp1820.snmp import SnmpError
 
 from .helpers import _
 
@@ -16,6 +17,8 @@ async def test_form_fields(hass):
     assert form["data_schema"].schema["username"] == str
     assert form["data_schema"].schema["password"] == str
     assert form["data_schema"].schema["system_ip"] == str
+    assert form["data_schema"].schema["backend"].container == ["http", "snmp"]
+    assert form["data_schema"].schema["snmp_community"] == str
 
 
 async def test_form_submit_successful_with_input(hass, mocker):
@@ -51,9 +54,73 @@ async def test_form_submit_successful_with_input(hass, mocker):
         "username": "test-username",
         "password": "test-password",
         "system_ip": "test-ip",
+        "backend": "http",
+        "snmp_community": "private",
     }
 
 
+async def test_form_submit_successful_with_snmp(hass, mocker):
+    # Ensure the SNMP backend is validated by reading the PoE table with the community
+    m_client = mocker.patch(_("config_flow.Hp1820Client"))
+    m_snmp = mocker.patch(_("config_flow.Hp1820SnmpClient"))
+    m_snmp().get_poe_state = AsyncMock()
+    m_snmp().logout = AsyncMock()
+    mocker.patch(_("async_setup"), return_value=True)
+    mocker.patch(_("async_setup_entry"), return_value=True)
+    form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    # Test
+    result = await hass.config_entries.flow.async_configure(
+        form["flow_id"],
+        {
+            "system_ip": "test-ip",
+            "backend": "snmp",
+            "snmp_community": "secret",
+        },
+    )
+    await hass.async_block_till_done()
+    assert m_snmp.call_args.args == ("test-ip", "secret")
+    assert m_snmp().get_poe_state.call_count == 1
+    assert m_snmp().logout.call_count == 1
+    assert m_client.call_count == 0
+    assert result["type"] == "create_entry"
+    assert result["data"]["backend"] == "snmp"
+
+
+async def test_form_snmp_errors(hass, mocker):
+    # Ensure the right error is raised if the switch can't be read over SNMP
+    m_snmp = mocker.patch(_("config_flow.Hp1820SnmpClient"))
+    m_snmp().get_poe_state = AsyncMock(side_effect=SnmpError("No SNMP response received before timeout"))
+    m_snmp().logout = AsyncMock()
+    mocker.patch(_("async_setup"), return_value=True)
+    mocker.patch(_("async_setup_entry"), return_value=True)
+    form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    # Test
+    result = await hass.config_entries.flow.async_configure(
+        form["flow_id"],
+        {
+            "username": "test-username",
+            "password": "test-password",
+            "system_ip": "test-ip",
+            "backend": "snmp",
+        },
+    )
+    await hass.async_block_till_done()
+    assert result["type"] == "form"
+    assert result["errors"]["base"] == "snmp_error"
+
+
+async def test_form_missing_credentials(hass, mocker):
+    # Ensure credentials are required by the web interface
+    m_client = mocker.patch(_("config_flow.Hp1820Client"))
+    form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    # Test
+    result = await hass.config_entries.flow.async_configure(form["flow_id"], {"system_ip": "test-ip"})
+    await hass.async_block_till_done()
+    assert result["type"] == "form"
+    assert result["errors"]["base"] == "missing_credentials"
+    assert m_client.call_count == 0
+
+
 # async def test_form_submit_required_fields(hass, mocker):
 #     # Ensure the form has the expected required fields
 #     mocker.patch(_("async_setup"), return_value=True)
@@ -1,9 +1,19 @@
+import asyncio
 from datetime import timedelta
 
 import pytest
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from custom_components.hp1820.coordinator import Hp1820Coordinator
+from custom_components.hp1820.breaker import CircuitOpenError
+from custom_components.hp1820.coordinator import AdaptiveInterval, Hp1820Coordinator
+from custom_components.hp1820.devices import Hp1820Device
+from custom_components.hp1820.scheduler import Hp1820Scheduler
+from custom_components.hp1820.snmp import SnmpError
+
+from .hass.common import async_capture_events, async_fire_time_changed
+from .helpers import _, poe_ports
 
 
 def test_coordinator_constructor(hass, device):
@@ -27,10 +37,7 @@ async def test_coordinator_async_update_no_data(coordinator):
 async def test_coordinator_async_update_with_data(coordinator):
     # Ensure that the coordinator returns data when changes are detected
     await coordinator.async_refresh()
-    assert coordinator.data == {
-        "1": True,
-        "2": False,
-    }
+    assert coordinator.data == poe_ports({"1": True, "2": False})
 
 
 @pytest.mark.asyncio
@@ -62,3 +69,668 @@ async def test_coordinator_first_refresh_update_failed(coordinator, client_respo
     # Test
     with pytest.raises(ConfigEntryNotReady):
         await coordinator.async_config_entry_first_refresh()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_notify_changed_ports(coordinator, device):
+    # Ensure only listeners of changed ports are notified
+    calls = []
+    coordinator.async_add_listener(lambda: calls.append("1"), "1")
+    coordinator.async_add_listener(lambda: calls.append("2"), "2")
+    coordinator.async_add_listener(lambda: calls.append(None))
+    await coordinator.async_refresh()
+    calls.clear()
+    # Test
+    device._ports["1"] = device._ports["1"].with_enabled(False)
+    await coordinator.async_refresh()
+    assert sorted(calls, key=str) == ["1", None]
+    assert coordinator.skipped_updates == 1
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_notify_unchanged(coordinator):
+    # Ensure port listeners are not notified if nothing changed
+    calls = []
+    coordinator.async_add_listener(lambda: calls.append("1"), "1")
+    coordinator.async_add_listener(lambda: calls.append("2"), "2")
+    await coordinator.async_refresh()
+    calls.clear()
+    # Test
+    await coordinator.async_refresh()
+    assert calls == []
+    assert coordinator.skipped_updates == 2
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_notify_availability(coordinator, client_response_error):
+    # Ensure all listeners are notified when the availability changes
+    calls = []
+    coordinator.async_add_listener(lambda: calls.append("1"), "1")
+    coordinator.async_add_listener(lambda: calls.append("2"), "2")
+    await coordinator.async_refresh()
+    calls.clear()
+    # Test
+    coordinator._device.update.side_effect = client_response_error(500)
+    await coordinator.async_refresh()
+    assert sorted(calls) == ["1", "2"]
+    assert coordinator.last_update_success is False
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_notify_new_port(coordinator, device):
+    # Ensure ports added to the inventory are notified
+    calls = []
+    coordinator.async_add_listener(lambda: calls.append("3"), "3")
+    await coordinator.async_refresh()
+    calls.clear()
+    # Test
+    device._ports.update(poe_ports({"3": True}))
+    await coordinator.async_refresh()
+    assert calls == ["3"]
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_notify_restored_confirmed(coordinator, device):
+    # Ensure all listeners are notified when restored ports are confirmed
+    calls = []
+    coordinator.async_add_listener(lambda: calls.append("1"), "1")
+    coordinator.async_add_listener(lambda: calls.append("2"), "2")
+    device.restore(dict(device._ports))
+    coordinator.async_update_listeners()
+    calls.clear()
+    # Test
+    device.restored = False
+    await coordinator.async_refresh()
+    assert sorted(calls) == ["1", "2"]
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_inventory_listener(coordinator, device):
+    # Ensure inventory listeners are notified only when ports are added or removed
+    inventories = []
+    unsub = coordinator.async_add_inventory_listener(inventories.append)
+    await coordinator.async_refresh()
+    await coordinator.async_refresh()
+    # Test
+    device._ports = poe_ports({"1": True, "2": False, "3": True})
+    await coordinator.async_refresh()
+    device._ports = poe_ports({"1": True})
+    await coordinator.async_refresh()
+    assert inventories == [{"1", "2"}, {"1", "2", "3"}, {"1"}]
+    unsub()
+    device._ports = poe_ports({"1": True, "2": False})
+    await coordinator.async_refresh()
+    assert len(inventories) == 3
+
+
+def test_adaptive_interval_activity():
+    # Ensure a change resets the interval to the minimum for the fast window
+    adaptive = AdaptiveInterval(10, 600, fast_window=60)
+    adaptive.current = 300
+    assert adaptive.activity(0) == 10
+    assert adaptive.success(False, 30) == 10
+    assert adaptive.success(False, 59) == 10
+
+
+def test_adaptive_interval_backoff():
+    # Ensure the interval grows while the switch is stable, up to the maximum
+    adaptive = AdaptiveInterval(10, 60, fast_window=0, backoff=2)
+    assert adaptive.success(False, 0) == 20
+    assert adaptive.success(False, 0) == 40
+    assert adaptive.success(False, 0) == 60
+    assert adaptive.success(False, 0) == 60
+
+
+def test_adaptive_interval_change():
+    # Ensure a detected change goes back to the minimum interval
+    adaptive = AdaptiveInterval(10, 600, fast_window=60)
+    adaptive.current = 300
+    assert adaptive.success(True, 1000) == 10
+    assert adaptive.success(False, 1059) == 10
+    assert adaptive.success(False, 1061) == 15
+
+
+def test_adaptive_interval_failure():
+    # Ensure failures back off beyond the maximum interval, up to a bound
+    adaptive = AdaptiveInterval(10, 60, failure_backoff=3, failure_maximum=2)
+    adaptive.activity(0)
+    assert adaptive.failure(1) == 30
+    assert adaptive.failure(2) == 90
+    assert adaptive.failure(3) == 120
+    # The fast window is interrupted by failures
+    assert adaptive.success(False, 4) == 60
+
+
+def test_adaptive_interval_bounds():
+    # Ensure the maximum is never lower than the minimum
+    adaptive = AdaptiveInterval(60, 30)
+    assert adaptive.maximum == 60
+
+
+def test_adaptive_interval_lowest():
+    # Ensure a minimum of 0 doesn't poll the switch continuously
+    adaptive = AdaptiveInterval(0, 0)
+    assert adaptive.minimum == 5
+    assert adaptive.maximum == 5
+    assert adaptive.activity(0) == 5
+
+
+def test_coordinator_adaptive_constructor(hass, device):
+    # Ensure the initial interval is clamped within the adaptive bounds
+    coordinator = Hp1820Coordinator(hass, device, 5, AdaptiveInterval(10, 600))
+    assert coordinator.update_interval == timedelta(seconds=10)
+    assert coordinator.current_interval == 10
+
+
+@pytest.mark.asyncio
+async def test_coordinator_adaptive_backoff(hass, device):
+    # Ensure the interval grows while the table doesn't change
+    coordinator = Hp1820Coordinator(hass, device, 10, AdaptiveInterval(10, 600, fast_window=0, backoff=2))
+    await coordinator.async_refresh()
+    assert coordinator.current_interval == 20
+    await coordinator.async_refresh()
+    assert coordinator.current_interval == 40
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_adaptive_change(hass, device):
+    # Ensure a change detected by polling restores the minimum interval
+    coordinator = Hp1820Coordinator(hass, device, 10, AdaptiveInterval(10, 600, fast_window=0, backoff=2))
+    await coordinator.async_refresh()
+    await coordinator.async_refresh()
+    assert coordinator.current_interval == 40
+    # Test
+    device._ports["1"] = device._ports["1"].with_enabled(False)
+    await coordinator.async_refresh()
+    assert coordinator.current_interval == 10
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_adaptive_failure(hass, device, client_response_error):
+    # Ensure the interval backs off while the switch is failing
+    coordinator = Hp1820Coordinator(hass, device, 10, AdaptiveInterval(10, 600, failure_backoff=2))
+    device.update.side_effect = client_response_error(500)
+    await coordinator.async_refresh()
+    assert coordinator.current_interval == 20
+    await coordinator.async_refresh()
+    assert coordinator.current_interval == 40
+    assert coordinator.last_update_success is False
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_adaptive_write(hass, device):
+    # Ensure a write resets the interval to the minimum
+    coordinator = Hp1820Coordinator(hass, device, 300, AdaptiveInterval(10, 600))
+    assert coordinator.current_interval == 300
+    # Test
+    coordinator.async_set_updated_data(device.ports)
+    assert coordinator.current_interval == 10
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_stale_served(hass, device, client_response_error):
+    # Ensure the last ports are served while the switch is failing, retrying less often
+    coordinator = Hp1820Coordinator(hass, device, 60, stale_max_age=300)
+    coordinator.data = dict(device._ports)
+    device.last_confirmed = dt_util.utcnow() - timedelta(seconds=30)
+    device.update.side_effect = client_response_error(500)
+    # Test
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success is True
+    assert coordinator.data == device._ports
+    assert coordinator.current_interval == 120
+    await coordinator.async_refresh()
+    await coordinator.async_refresh()
+    assert coordinator.current_interval == 240
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_stale_max_age(hass, device, client_response_error):
+    # Ensure entities become unavailable once the last ports are older than the max age
+    coordinator = Hp1820Coordinator(hass, device, 60, stale_max_age=300)
+    coordinator.data = dict(device._ports)
+    device.last_confirmed = dt_util.utcnow() - timedelta(seconds=301)
+    device.update.side_effect = client_response_error(500)
+    # Test
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success is False
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_stale_expired(hass, device, client_response_error):
+    # Ensure entities become unavailable at the max age, also if no poll runs by then
+    coordinator = Hp1820Coordinator(hass, device, 600, stale_max_age=300)
+    coordinator.data = dict(device._ports)
+    device.last_confirmed = dt_util.utcnow() - timedelta(seconds=30)
+    device.update.side_effect = client_response_error(500)
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success is True
+    # Test
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=271))
+    await hass.async_block_till_done()
+    assert coordinator.last_update_success is False
+    assert coordinator._serving_stale is False
+    assert device.update.call_count == 1
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_stale_option_disabled(hass, device, client_response_error):
+    # Ensure the last ports are no longer served once the max age is disabled
+    coordinator = Hp1820Coordinator(hass, device, 600, stale_max_age=300)
+    coordinator.data = dict(device._ports)
+    device.last_confirmed = dt_util.utcnow()
+    device.update.side_effect = client_response_error(500)
+    await coordinator.async_refresh()
+    # Test
+    coordinator.async_update_options(600)
+    assert coordinator.last_update_success is False
+    assert coordinator._unsub_expire is None
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_stale_recovered(hass, device, client_response_error):
+    # Ensure the scan interval is restored once the switch answers again
+    coordinator = Hp1820Coordinator(hass, device, 60, stale_max_age=300)
+    coordinator.data = dict(device._ports)
+    device.last_confirmed = dt_util.utcnow()
+    device.update.side_effect = client_response_error(500)
+    await coordinator.async_refresh()
+    # Test
+    device.update.side_effect = None
+    await coordinator.async_refresh()
+    assert coordinator.current_interval == 60
+    assert coordinator._serving_stale is False
+    assert coordinator._unsub_expire is None
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_stale_disabled(hass, device, client_response_error):
+    # Ensure entities become unavailable on the first failure without a max age
+    coordinator = Hp1820Coordinator(hass, device, 60)
+    coordinator.data = dict(device._ports)
+    device.last_confirmed = dt_util.utcnow()
+    device.update.side_effect = client_response_error(500)
+    # Test
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success is False
+    assert coordinator.current_interval == 60
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_notify_stale(coordinator, device):
+    # Ensure all listeners are notified when ports become stale
+    calls = []
+    coordinator.async_add_listener(lambda: calls.append("1"), "1")
+    coordinator.async_add_listener(lambda: calls.append("2"), "2")
+    coordinator.async_update_listeners()
+    calls.clear()
+    # Test
+    device.stale = True
+    coordinator.async_update_listeners()
+    assert sorted(calls) == ["1", "2"]
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_notify_unchanged_reads(hass, config_entry, client):
+    # Ensure reads of the switch that confirm the same ports don't update port listeners
+    device = Hp1820Device(config_entry, client)
+    client.get_poe_state.return_value = poe_ports({"1": True, "2": False})
+    coordinator = Hp1820Coordinator(hass, device, 60)
+    calls = []
+    coordinator.async_add_listener(lambda: calls.append("1"), "1")
+    coordinator.async_add_listener(lambda: calls.append("2"), "2")
+    await coordinator.async_refresh()
+    confirmed = device.last_confirmed
+    calls.clear()
+    # Test
+    await coordinator.async_refresh()
+    assert device.last_confirmed != confirmed
+    assert calls == []
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_fixed_interval(coordinator):
+    # Ensure the interval doesn't change when adaptive polling is disabled
+    await coordinator.async_refresh()
+    coordinator.async_set_updated_data(coordinator.data)
+    assert coordinator.current_interval == 5
+    await coordinator.async_shutdown()
+
+
+def _aligned(scheduler, coordinator) -> bool:
+    # True if the scheduled refresh of the coordinator is at its phase
+    interval = coordinator.current_interval
+    offset = (coordinator.next_refresh - scheduler.phase(coordinator) * interval) % interval
+    return min(offset, interval - offset) < 0.01
+
+
+@pytest.mark.asyncio
+async def test_coordinator_scheduler_phase(hass, device):
+    # Ensure refreshes are spread by the fleet scheduler
+    scheduler = Hp1820Scheduler()
+    first = Hp1820Coordinator(hass, device, 60, scheduler=scheduler)
+    second = Hp1820Coordinator(hass, device, 60, scheduler=scheduler)
+    scheduler.register("first", first)
+    scheduler.register("second", second)
+    # Test
+    first.async_add_listener(lambda: None)
+    second.async_add_listener(lambda: None)
+    items = {item["entry_id"]: item for item in scheduler.schedule(hass.loop.time())}
+    assert abs(items["first"]["next_refresh"] - items["second"]["next_refresh"]) == pytest.approx(30, abs=0.01)
+    await first.async_shutdown()
+    await second.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_scheduler_keeps_phase(hass, device):
+    # Ensure the phase is kept after a write and realigned when a switch is added
+    scheduler = Hp1820Scheduler()
+    first = Hp1820Coordinator(hass, device, 60, scheduler=scheduler)
+    second = Hp1820Coordinator(hass, device, 60, scheduler=scheduler)
+    third = Hp1820Coordinator(hass, device, 60, scheduler=scheduler)
+    scheduler.register("first", first)
+    scheduler.register("second", second)
+    for coordinator in (first, second, third):
+        coordinator.async_add_listener(lambda: None)
+    assert _aligned(scheduler, first) and _aligned(scheduler, second)
+    # Test
+    first.data = {}
+    first.async_set_updated_data(dict(device._ports))
+    assert _aligned(scheduler, first)
+    scheduler.register("third", third)
+    assert [scheduler.phase(coordinator) for coordinator in (first, second, third)] == [0, 1 / 3, 2 / 3]
+    assert all(_aligned(scheduler, coordinator) for coordinator in (first, second, third))
+    scheduler.unregister("second")
+    assert _aligned(scheduler, first) and _aligned(scheduler, third)
+    for coordinator in (first, second, third):
+        await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_scheduler_next_refresh(hass, device):
+    # Ensure the scheduled refresh is reported only while one is scheduled
+    scheduler = Hp1820Scheduler()
+    coordinator = Hp1820Coordinator(hass, device, 60, scheduler=scheduler)
+    scheduler.register("first", coordinator)
+    assert coordinator.next_refresh is None
+    # Test
+    remove_listener = coordinator.async_add_listener(lambda: None)
+    assert 30 <= coordinator.next_refresh - hass.loop.time() < 90
+    remove_listener()
+    assert coordinator.next_refresh is None
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_scheduler_limiter(hass, device):
+    # Ensure polls wait for a free slot of the fleet scheduler
+    scheduler = Hp1820Scheduler(max_concurrent=1)
+    coordinator = Hp1820Coordinator(hass, device, 60, scheduler=scheduler)
+    await scheduler.limiter.acquire()
+    task = hass.async_create_task(coordinator.async_refresh())
+    await asyncio.sleep(0.01)
+    assert device.update.call_count == 0
+    # Test
+    scheduler.limiter.release()
+    await task
+    assert device.update.call_count == 1
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_scheduler_waits_writes(hass, device):
+    # Ensure queued writes are awaited before taking a slot of the fleet scheduler
+    scheduler = Hp1820Scheduler(max_concurrent=1)
+    coordinator = Hp1820Coordinator(hass, device, 60, scheduler=scheduler)
+    written = asyncio.Event()
+
+    async def set_poe_state(*args):
+        await written.wait()
+
+    device._client.set_poe_state.side_effect = set_poe_state
+    write = hass.async_create_task(device.set_port_state("1", False))
+    await asyncio.sleep(0.1)
+    task = hass.async_create_task(coordinator.async_refresh())
+    await asyncio.sleep(0.01)
+    assert scheduler.limiter.locked() is False
+    assert device.update.call_count == 0
+    # Test
+    written.set()
+    await write
+    await task
+    assert device.update.call_count == 1
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_circuit_open(coordinator):
+    # Ensure an unreachable switch is reported as a failed update
+    coordinator._device.update.side_effect = CircuitOpenError("test_ip", 30)
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success is False
+    assert isinstance(coordinator.last_exception, UpdateFailed)
+    assert str(coordinator.last_exception) == "test_ip is unreachable, next attempt in 30 seconds"
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_snmp_error(coordinator):
+    # Ensure SNMP errors are reported as a failed update
+    coordinator._device.update.side_effect = SnmpError("No SNMP response received before timeout")
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success is False
+    assert isinstance(coordinator.last_exception, UpdateFailed)
+    assert coordinator._device.metrics.counters["poll_failures"] == 1
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_metrics(coordinator, device, client_response_error):
+    # Ensure polls, their failures, duration and requests are measured
+    metrics = device.metrics
+
+    async def update():
+        metrics.increment("requests", 2)
+        return dict(device._ports)
+
+    device.update.side_effect = update
+    await coordinator.async_refresh()
+    device.update.side_effect = client_response_error(500)
+    await coordinator.async_refresh()
+    # Test
+    assert metrics.counters["polls"] == 2
+    assert metrics.counters["poll_failures"] == 1
+    assert len(metrics.latencies["poll"]) == 2
+    assert metrics.requests_per_poll.percentile(100) == 2
+    assert metrics.requests_per_poll.last == 0
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_write_mismatch_event(hass, coordinator, device):
+    # Ensure an event is fired when the switch didn't apply a write
+    events = async_capture_events(hass, "hp1820_write_mismatch")
+    device._mismatches = {"2": (True, poe_ports({"2": False})["2"])}
+    # Test
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert len(events) == 1
+    assert events[0].data == {
+        "entry_id": "test_entry_id",
+        "port": "2",
+        "expected": True,
+        "actual": False,
+        "status": "disabled",
+        "fault_status": "no_error",
+    }
+    assert device.metrics.counters["write_mismatches"] == 1
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_verify_burst(hass, mocker, device):
+    # Ensure the verification is postponed by each write of a burst
+    m_call_later = mocker.patch(_("coordinator.async_call_later"))
+    coordinator = Hp1820Coordinator(hass, device, 120, verify_delay=5)
+    coordinator.data = {}
+    device.pending = {"1": False}
+    coordinator.async_set_updated_data(device._ports)
+    device.pending = {"1": False, "2": True}
+    coordinator.async_set_updated_data(device._ports)
+    # Test
+    assert m_call_later.call_count == 2
+    assert m_call_later.call_args.args[1] == 5
+    assert m_call_later.return_value.call_count == 1
+    await coordinator._async_verify(None)
+    assert device.update.call_count == 1
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_event_refresh_burst(hass, mocker, device):
+    # Ensure a burst of switch events is read with a single refresh of all pages
+    m_call_later = mocker.patch(_("coordinator.async_call_later"))
+    coordinator = Hp1820Coordinator(hass, device, 120)
+    device._groups["power"].refreshed(0)
+    coordinator.async_request_event_refresh("Link Down: 1")
+    coordinator.async_request_event_refresh("POE: port 1 power off")
+    # Test
+    assert m_call_later.call_count == 2
+    assert m_call_later.call_args.args[1] == 1
+    assert m_call_later.return_value.call_count == 1
+    await coordinator._async_event_refresh(None)
+    assert device.update.call_count == 1
+    assert device._groups["power"].last_refresh is None
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_update_options(hass, device):
+    # Ensure polling options are applied in place, rescheduling the next refresh
+    coordinator = Hp1820Coordinator(hass, device, 120, verify_delay=5)
+    coordinator.async_add_listener(lambda: None)
+    coordinator.data = {}
+    device.pending = {"1": False}
+    coordinator.async_set_updated_data(device._ports)
+    # Test
+    coordinator.async_update_options(30)
+    assert coordinator.update_interval == timedelta(seconds=30)
+    assert coordinator._unsub_verify is None
+    assert coordinator._verify_delay is None
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=31))
+    await hass.async_block_till_done()
+    assert device.update.call_count == 1
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_update_options_phase(hass, device):
+    # Ensure refreshes are aligned again to the phase of the switch with the new interval
+    scheduler = Hp1820Scheduler()
+    coordinator = Hp1820Coordinator(hass, device, 120, scheduler=scheduler)
+    scheduler.register("first", coordinator)
+    scheduler.register("second", Hp1820Coordinator(hass, device, 120, scheduler=scheduler))
+    coordinator.async_add_listener(lambda: None)
+    # Test
+    coordinator.async_update_options(30)
+    assert 15 <= coordinator.next_refresh - hass.loop.time() < 45
+    assert _aligned(scheduler, coordinator)
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_update_options_adaptive(hass, device):
+    # Ensure adaptive polling can be enabled in place, within its bounds
+    coordinator = Hp1820Coordinator(hass, device, 120)
+    # Test
+    coordinator.async_update_options(5, AdaptiveInterval(10, 600))
+    assert coordinator.current_interval == 10
+    coordinator.async_update_options(120)
+    assert coordinator._adaptive is None
+    assert coordinator.current_interval == 120
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_verify_read(hass, device):
+    # Ensure written ports are read back once the delay elapsed
+    coordinator = Hp1820Coordinator(hass, device, 120, verify_delay=5)
+    coordinator.data = {}
+    device.pending = {"1": False}
+    device._groups["ports"].refreshed(0)
+    coordinator.async_set_updated_data(device._ports)
+    # Test
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=6))
+    await hass.async_block_till_done()
+    assert device.update.call_count == 1
+    assert device._groups["ports"].last_refresh is None
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_verify_already_confirmed(hass, device):
+    # Ensure no read is made if a poll confirmed the written ports in the meantime
+    coordinator = Hp1820Coordinator(hass, device, 120, verify_delay=5)
+    coordinator.data = {}
+    device.pending = {"1": False}
+    coordinator.async_set_updated_data(device._ports)
+    device.pending = {}
+    # Test
+    await coordinator._async_verify(None)
+    assert device.update.call_count == 0
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_verify_disabled(hass, coordinator, device):
+    # Ensure no verification is scheduled without a delay
+    device.pending = {"1": False}
+    coordinator.async_set_updated_data(device._ports)
+    assert coordinator._unsub_verify is None
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_verify_shutdown(hass, device):
+    # Ensure a scheduled verification is cancelled on shutdown
+    coordinator = Hp1820Coordinator(hass, device, 120, verify_delay=5)
+    coordinator.data = {}
+    device.pending = {"1": False}
+    coordinator.async_set_updated_data(device._ports)
+    assert coordinator._unsub_verify is not None
+    # Test
+    await coordinator.async_shutdown()
+    assert coordinator._unsub_verify is None
+
+
+@pytest.mark.asyncio
+async def test_coordinator_notify_pending(coordinator, device):
+    # Ensure listeners are notified when their port stops being pending
+    calls = []
+    coordinator.async_add_listener(lambda: calls.append("1"), "1")
+    coordinator.async_add_listener(lambda: calls.append("2"), "2")
+    device.pending = {"1": True}
+    await coordinator.async_refresh()
+    calls.clear()
+    # Test
+    device.pending = {}
+    await coordinator.async_refresh()
+    assert calls == ["1"]
+    await coordinator.async_shutdown()
@@ -1,7 +1,20 @@
+import asyncio
+
 import pytest
 from aiohttp.client_exceptions import ClientResponseError
 
+from custom_components.hp1820.backend import PartialWriteError
+from custom_components.hp1820.client import SessionExpiredError
 from custom_components.hp1820.devices import Hp1820Device
+from custom_components.hp1820.models import (
+    AdminMode,
+    PoePortState,
+    PoeStatus,
+    Priority,
+    Schedule,
+)
+
+from .helpers import _, admin_modes, poe_ports, power_status
 
 
 def test_device_constructor(config_entry, client):
@@ -36,14 +49,40 @@ async def test_device_login_error(config_entry, client, client_response_error):
     assert device._client.login.call_count == 1
 
 
+@pytest.mark.asyncio
+async def test_device_keeps_session(config_entry, client):
+    """Should reuse the same session across updates."""
+    device = Hp1820Device(config_entry, client)
+    client.get_poe_state.return_value = {}
+    # Test
+    await device.update()
+    await device.update()
+    assert device._client.login.call_count == 1
+    assert device._client.logout.call_count == 0
+    assert device._client.get_poe_state.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_device_close(config_entry, client):
+    """Should log out when the device is closed."""
+    device = Hp1820Device(config_entry, client)
+    client.get_poe_state.return_value = {}
+    await device.update()
+    # Test
+    await device.close()
+    assert device._client.logout.call_count == 1
+
+
 @pytest.mark.asyncio
 async def test_device_logout_error(config_entry, client, client_response_error):
     """Should not swallow logout errors (401)."""
     device = Hp1820Device(config_entry, client)
-    client.logout.side_effect = client_response_error(401)
+    client.logout = client_response_error(401)
+    client.get_poe_state.return_value = {}
+    await device.update()
     # Test
     with pytest.raises(ClientResponseError):
-        await device.update()
+        await device.close()
     assert device._client.login.call_count == 1
     assert device._client.logout.call_count == 1
 
@@ -52,19 +91,235 @@ async def test_device_logout_error(config_entry, client, client_response_error):
 async def test_device_update_success(config_entry, client):
     """Should check store the ports' status in the device object."""
     device = Hp1820Device(config_entry, client)
-    device._client.get_poe_state.return_value = {"1": True, "2": False}
+    device._client.get_poe_state.return_value = poe_ports({"1": True, "2": False})
 
     await device.update()
 
     assert device._client.get_poe_state.call_count == 1
-    assert device._ports == {"1": True, "2": False}
+    assert admin_modes(device.ports) == {"1": True, "2": False}
     assert device._client.login.call_count == 1
-    assert device._client.logout.call_count == 1
+    assert device._client.logout.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_device_update_stale(config_entry, client, client_response_error):
+    """Should keep the last ports as stale when the switch doesn't answer."""
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True})
+    await device.update()
+    confirmed = device.last_confirmed
+    assert confirmed is not None
+    assert device.stale is False
+    # Test
+    device._client.get_poe_state = client_response_error(500, "GET")
+    with pytest.raises(ClientResponseError):
+        await device.update()
+    assert device.stale is True
+    assert device.last_confirmed == confirmed
+    assert admin_modes(device.ports) == {"1": True}
+
+
+@pytest.mark.asyncio
+async def test_device_update_inventory(config_entry, client):
+    """Should drop ports that are gone, and detect the model from the ports."""
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({str(port): True for port in range(1, 13)})
+    await device.update()
+    assert device.model.ports == 24
+    # Test
+    device._client.get_poe_state.return_value = poe_ports({"1": True, "2": False})
+    await device.update()
+    assert admin_modes(device.ports) == {"1": True, "2": False}
+    assert device.model.ports == 8
+
+
+@pytest.mark.asyncio
+async def test_device_update_power(config_entry, client):
+    """Should read the power of the ports within the same session."""
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True, "2": False})
+    device._client.get_poe_power.return_value = power_status({"1": 4.2, "2": None}, budget=65.0)
+
+    await device.update()
+
+    assert device.power.ports["1"].power == 4.2
+    assert device.power.budget == 65.0
+    assert device._client.get_poe_power.call_count == 1
+    assert device._client.login.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_device_update_power_not_supported(config_entry, client, client_response_error):
+    """Should stop reading the power if the firmware doesn't have the status page."""
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True})
+    device._client.get_poe_power.side_effect = client_response_error(404, "GET")
+
+    await device.update()
+    await device.update()
+
+    assert device.power is None
+    assert device.power_supported is False
+    assert admin_modes(device.ports) == {"1": True}
+    assert device._client.get_poe_power.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_device_update_power_missing_table(config_entry, client):
+    """Should stop reading the power if the status page has no table."""
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True})
+    device._client.get_poe_power.side_effect = ValueError("Table aDataSet not found")
+
+    await device.update()
+
+    assert device.power is None
+    assert device.power_supported is False
+
+
+@pytest.mark.asyncio
+async def test_device_update_power_login_page(config_entry, client):
+    """Should stop reading the power if the status page redirects to the login while the session is alive."""
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True})
+    device._client.get_poe_power.side_effect = SessionExpiredError(None, (), status=401)
+
+    await device.update()
+
+    assert device.power is None
+    assert device.power_supported is False
+    assert admin_modes(device.ports) == {"1": True}
+    assert device._client.login.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_device_update_power_session_expired(config_entry, client):
+    """Should renew the session if it expired while reading the power."""
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.side_effect = [
+        poe_ports({"1": True}),
+        SessionExpiredError(None, (), status=401),
+        poe_ports({"1": True}),
+    ]
+    device._client.get_poe_power.side_effect = [
+        SessionExpiredError(None, (), status=401),
+        power_status({"1": 4.2}),
+    ]
+
+    await device.update()
+
+    assert device.power.ports["1"].power == 4.2
+    assert device.power_supported is True
+    assert device._client.login.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_device_update_power_error(config_entry, client, client_response_error):
+    """Should fail the update if the status page can't be read."""
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True})
+    device._client.get_poe_power.side_effect = client_response_error(500, "GET")
+
+    with pytest.raises(ClientResponseError):
+        await device.update()
+
+    assert device.power_supported is True
+
+
+@pytest.mark.asyncio
+async def test_device_update_refresh_groups(hass, mocker, config_entry, client):
+    """Should read each page at its own cadence, serving slow pages from the last read."""
+    hass.config_entries.async_update_entry(config_entry, options={"ports_scan_interval": 600})
+    m_monotonic = mocker.patch(_("devices.monotonic"), return_value=0)
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True})
+    device._client.get_poe_power.return_value = power_status({"1": 4.2})
+    await device.update()
+    # Test
+    device._client.get_poe_state.return_value = poe_ports({"1": False})
+    device._client.get_poe_power.return_value = power_status({"1": 5.1})
+    m_monotonic.return_value = 120
+    await device.update()
+    assert device._client.get_poe_state.call_count == 1
+    assert device._client.get_poe_power.call_count == 2
+    assert admin_modes(device.ports) == {"1": True}
+    assert device.power.ports["1"].power == 5.1
+    m_monotonic.return_value = 600
+    await device.update()
+    assert device._client.get_poe_state.call_count == 2
+    assert admin_modes(device.ports) == {"1": False}
+    assert device._client.login.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_device_update_nothing_due(hass, mocker, config_entry, client):
+    """Should not contact the switch if no page is due."""
+    hass.config_entries.async_update_entry(
+        config_entry, options={"ports_scan_interval": 600, "power_scan_interval": 60}
+    )
+    mocker.patch(_("devices.monotonic"), return_value=0)
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True})
+    await device.update()
+    await device._session.close()
+    # Test
+    ports = await device.update()
+    assert admin_modes(ports.items()) == {"1": True}
+    assert device._client.get_poe_state.call_count == 1
+    assert device._client.get_poe_power.call_count == 1
+    assert device._client.login.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_device_update_refresh_groups_failure(hass, mocker, config_entry, client, client_response_error):
+    """Should read again all due pages if the poll failed on one of them."""
+    hass.config_entries.async_update_entry(config_entry, options={"ports_scan_interval": 600})
+    mocker.patch(_("devices.monotonic"), return_value=0)
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True})
+    device._client.get_poe_power.side_effect = client_response_error(500, "GET")
+    with pytest.raises(ClientResponseError):
+        await device.update()
+    # Test
+    device._client.get_poe_power.side_effect = None
+    await device.update()
+    assert device._client.get_poe_state.call_count == 2
+    assert device.restored is False
+
+
+@pytest.mark.asyncio
+async def test_device_invalidate(hass, mocker, config_entry, client):
+    """Should read all pages after an invalidation, regardless of their interval."""
+    hass.config_entries.async_update_entry(config_entry, options={"ports_scan_interval": 600})
+    mocker.patch(_("devices.monotonic"), return_value=0)
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True})
+    await device.update()
+    # Test
+    device.invalidate()
+    await device.update()
+    assert device._client.get_poe_state.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_device_apply_options(hass, mocker, config_entry, client):
+    """Should apply changed page intervals and idle timeout to the running device."""
+    mocker.patch(_("devices.monotonic"), return_value=0)
+    device = Hp1820Device(config_entry, client)
+    device._client.get_poe_state.return_value = poe_ports({"1": True})
+    await device.update()
+    # Test
+    device.apply_options({"ports_scan_interval": 600, "session_idle_timeout": 300})
+    await device.update()
+    assert device._client.get_poe_state.call_count == 1
+    assert device._session._idle_timeout == 300
+    assert device._session._idle_handle is not None
+    await device.close()
 
 
 @pytest.mark.asyncio
 async def test_device_update_http_error(config_entry, client, client_response_error):
-    """Tests if device's update method raises an when querying and logout is still called."""
+    """Tests if device's update method raises an error when querying."""
     device = Hp1820Device(config_entry, client)
     device._client.get_poe_state.side_effect = client_response_error(500)
 
@@ -72,12 +327,11 @@ async def test_device_update_http_error(config_entry, client, client_response_er
         await device.update()
 
     assert device._client.get_poe_state.call_count == 1
-    assert device._client.logout.call_count == 1
 
 
 @pytest.mark.asyncio
 async def test_device_update_generic_error(config_entry, client):
-    """Should not crash if an exception is raised and logout is still called."""
+    """Should not swallow unexpected exceptions."""
     device = Hp1820Device(config_entry, client)
     device._client.get_poe_state.side_effect = Exception("Unexpected")
 
@@ -96,7 +350,7 @@ def test_get_port_state_before_update(device):
 
 def test_get_port_state_unknown_port(device):
     """Should rasie error if port is not known"""
-    device._ports = {"1": True}
+    device._ports = poe_ports({"1": True})
 
     with pytest.raises(ValueError):
         device.get_port_state("2")
@@ -104,7 +358,7 @@ def test_get_port_state_unknown_port(device):
 
 def test_get_port_state_after_update(device):
     """Should return port status when available"""
-    device._ports = {"1": True, "2": False}
+    device._ports = poe_ports({"1": True, "2": False})
 
     assert device.get_port_state("1") is True
     assert device.get_port_state("2") is False
@@ -123,7 +377,7 @@ async def test_set_port_state_before_update(device):
 @pytest.mark.asyncio
 async def test_set_port_state_unknown_port(device):
     """Should rasie error if port is not known"""
-    device._ports = {"1": True}
+    device._ports = poe_ports({"1": True})
 
     with pytest.raises(ValueError):
         await device.set_port_state("2", True)
@@ -133,28 +387,472 @@ async def test_set_port_state_unknown_port(device):
 async def test_set_port_state_after_update(config_entry, client):
     """Should set port status when available"""
     device = Hp1820Device(config_entry, client)
-    device._ports = {"1": True, "2": False}
+    device._ports = poe_ports({"1": True, "2": False})
 
     success = await device.set_port_state("1", False)
 
     assert success is True
     assert device._client.set_poe_state.call_count == 1
-    assert device._ports == {"1": False, "2": False}
+    assert device._client.set_poe_state.call_args.args == ("1", False, poe_ports({"1": True})["1"])
+    assert admin_modes(device.ports) == {"1": False, "2": False}
     assert device._client.login.call_count == 1
-    assert device._client.logout.call_count == 1
+    assert device._client.logout.call_count == 0
 
 
 @pytest.mark.asyncio
 async def test_set_port_state_with_error(config_entry, client, client_response_error):
-    """Should call logout even with errors"""
+    """Should not update the port status with errors"""
     client.set_poe_state.side_effect = client_response_error(500)
     device = Hp1820Device(config_entry, client)
-    device._ports = {"1": True, "2": False}
+    device._ports = poe_ports({"1": True, "2": False})
 
     success = await device.set_port_state("1", False)
 
     assert success is False
     assert device._client.set_poe_state.call_count == 1
-    assert device._ports == {"1": True, "2": False}
+    assert admin_modes(device.ports) == {"1": True, "2": False}
     assert device._client.login.call_count == 1
-    assert device._client.logout.call_count == 1
+    assert device._client.logout.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_set_ports_state_unknown_port(device):
+    """Should raise error if any port is not known"""
+    device._ports = poe_ports({"1": True})
+
+    with pytest.raises(ValueError):
+        await device.set_ports_state({"1": False, "2": False})
+
+
+@pytest.mark.asyncio
+async def test_set_ports_state_after_update(config_entry, client):
+    """Should set multiple ports with a single session"""
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": True, "3": False})
+
+    success = await device.set_ports_state({"1": False, "2": False, "3": True})
+
+    assert success is True
+    assert device._client.set_ports_state.call_count == 1
+    assert device._client.set_ports_state.call_args.args == (
+        {"1": False, "2": False, "3": True},
+        poe_ports({"1": True, "2": True, "3": False}),
+    )
+    assert admin_modes(device.ports) == {"1": False, "2": False, "3": True}
+    assert device._client.login.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_set_ports_state_with_error(config_entry, client, client_response_error):
+    """Should not update the ports status with errors"""
+    client.set_ports_state.side_effect = client_response_error(500)
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": True})
+
+    success = await device.set_ports_state({"1": False, "2": False})
+
+    assert success is False
+    assert admin_modes(device.ports) == {"1": True, "2": True}
+
+
+@pytest.mark.asyncio
+async def test_set_ports_state_partial_error(config_entry, client):
+    """Should update the ports of the groups written before an error"""
+    client.set_ports_state.side_effect = PartialWriteError(["1"], "Unable to write ports ['2']")
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": False})
+
+    success = await device.set_ports_state({"1": False, "2": True})
+
+    assert success is False
+    assert admin_modes(device.ports) == {"1": False, "2": False}
+    assert device.pending == {"1": False}
+
+
+@pytest.mark.asyncio
+async def test_apply_config(config_entry, client):
+    """Should write only the ports that differ from the last read"""
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": False, "3": False})
+    device._ports["1"] = device._ports["1"]._replace(priority=Priority.HIGH)
+
+    ports = await device.apply_config({"priority": "high", "admin_mode": "enabled"})
+
+    assert ports == {"2": True, "3": True}
+    assert client.set_ports_config.call_count == 1
+    configs = client.set_ports_config.call_args.args[0]
+    assert list(configs) == ["2", "3"]
+    assert configs["2"] == configs["3"]
+    assert configs["3"]["priority_sel"] == "high"
+    assert configs["3"]["admin_mode_sel"] == "enabled"
+    assert device.get_port("3").priority is Priority.HIGH
+    assert device.pending == {"2": True, "3": True}
+
+
+@pytest.mark.asyncio
+async def test_apply_config_unchanged(config_entry, client):
+    """Should not contact the switch if the ports already have the configuration"""
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": False})
+
+    ports = await device.apply_config({"priority": "low"}, ["1", "2"])
+
+    assert ports == {}
+    assert client.set_ports_config.call_count == 0
+    assert client.login.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_apply_config_power_limit(config_entry, client):
+    """Should always write the ports when a power limit is set, as it can't be compared"""
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": False})
+
+    ports = await device.apply_config({"limit_type": "dot3af"}, ["1"], power_limit=15.4)
+
+    assert ports == {"1": True}
+    assert client.set_ports_config.call_args.args[0]["1"]["power_limit"] == "15.4"
+
+
+@pytest.mark.asyncio
+async def test_apply_config_invalid(device):
+    """Should raise error for unknown ports, fields or values"""
+    device._ports = poe_ports({"1": True})
+
+    with pytest.raises(ValueError):
+        await device.apply_config({"priority": "high"}, ["1", "2"])
+    with pytest.raises(ValueError):
+        await device.apply_config({"status": "delivering"})
+    with pytest.raises(ValueError):
+        await device.apply_config({"priority": "highest"})
+
+
+@pytest.mark.asyncio
+async def test_apply_config_backend_fields(config_entry, client):
+    """Should reject fields that the backend can't write, e.g. the schedule over SNMP"""
+    client.config_fields = ("admin_mode", "priority")
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True})
+
+    with pytest.raises(ValueError):
+        await device.apply_config({"schedule": "1"})
+    with pytest.raises(ValueError):
+        await device.apply_config({"priority": "high"}, power_limit=15.4)
+    assert client.set_ports_config.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_apply_config_with_error(config_entry, client, client_response_error):
+    """Should not update the ports with errors"""
+    client.set_ports_config.side_effect = client_response_error(500)
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": True})
+
+    ports = await device.apply_config({"admin_mode": "disabled"})
+
+    assert ports == {"1": False, "2": False}
+    assert admin_modes(device.ports) == {"1": True, "2": True}
+    assert device.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_apply_config_partial_error(config_entry, client):
+    """Should update the ports of the groups written before an error"""
+    client.set_ports_config.side_effect = PartialWriteError(["2"], "Unable to write ports ['1']")
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": False})
+    device._ports["1"] = device._ports["1"]._replace(priority=Priority.HIGH)
+
+    ports = await device.apply_config({"priority": "low", "admin_mode": "enabled"})
+
+    assert ports == {"1": False, "2": True}
+    assert device.get_port("1").priority is Priority.HIGH
+    assert device.get_port("2").enabled is True
+    assert device.pending == {"2": True}
+
+
+@pytest.mark.asyncio
+async def test_apply_states(config_entry, client):
+    """Should write only the ports whose configuration differs, keeping their status"""
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": True, "3": False})
+    snapshot = poe_ports({"1": True, "2": False, "3": True})
+    snapshot["1"] = snapshot["1"]._replace(priority=Priority.CRITICAL)
+
+    ports = await device.apply_states(snapshot)
+
+    assert ports == {"1": True, "2": True, "3": True}
+    assert client.set_ports_config.call_count == 1
+    configs = client.set_ports_config.call_args.args[0]
+    assert configs["1"]["priority_sel"] == "critical"
+    assert configs["2"]["admin_mode_sel"] == "disabled"
+    assert configs["3"]["admin_mode_sel"] == "enabled"
+    # The status is confirmed by the next read of the switch
+    assert device.get_port("2").status is PoeStatus.DELIVERING
+    assert device.pending == {"1": True, "2": False, "3": True}
+
+
+@pytest.mark.asyncio
+async def test_apply_states_backend_fields(config_entry, client):
+    """Should apply only the fields that the backend can write, keeping the others"""
+    client.config_fields = ("admin_mode", "priority")
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": True})
+    snapshot = poe_ports({"1": False, "2": True})
+    snapshot["2"] = snapshot["2"]._replace(schedule=Schedule.SCHEDULE_1)
+
+    ports = await device.apply_states(snapshot)
+
+    assert ports == {"1": True}
+    assert device.get_port("1").enabled is False
+    assert device.get_port("2").schedule is Schedule.NONE
+
+
+@pytest.mark.asyncio
+async def test_apply_states_unchanged(config_entry, client):
+    """Should not contact the switch if the ports already have the configuration"""
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": False})
+    # Unknown values keep the current setting
+    snapshot = {"1": PoePortState("1", AdminMode.ENABLED, Priority.LOW, Schedule.NONE), "2": device._ports["2"]}
+
+    ports = await device.apply_states(snapshot)
+
+    assert ports == {}
+    assert client.set_ports_config.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_apply_states_missing_ports(config_entry, client):
+    """Should skip ports that are not on the switch, and ports not selected"""
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": True})
+
+    ports = await device.apply_states(poe_ports({"1": False, "2": False, "48": False}), ["2", "48", "50"])
+
+    assert ports == {"2": True}
+    assert list(client.set_ports_config.call_args.args[0]) == ["2"]
+
+
+@pytest.mark.asyncio
+async def test_power_cycle_batches(config_entry, client):
+    """Should turn ports off and on in batches, skipping ports that are off"""
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": True, "3": False, "4": True, "5": True})
+    changes = []
+
+    results = await device.power_cycle(["1", "2", "3", "4", "5"], 0, 2, on_change=lambda: changes.append(1))
+
+    writes = [call.args[0] for call in client.set_ports_state.call_args_list]
+    assert writes == [
+        {"1": False, "2": False},
+        {"1": True, "2": True},
+        {"4": False, "5": False},
+        {"4": True, "5": True},
+    ]
+    assert {port: result["status"] for port, result in results.items()} == {
+        "1": "cycled",
+        "2": "cycled",
+        "3": "skipped",
+        "4": "cycled",
+        "5": "cycled",
+    }
+    assert results["1"]["off"] <= results["1"]["on"] <= results["4"]["off"]
+    assert results["3"]["off"] is None
+    assert admin_modes(device.ports) == {"1": True, "2": True, "3": False, "4": True, "5": True}
+    assert len(changes) == 4
+    assert client.login.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_power_cycle_with_error(config_entry, client, client_response_error):
+    """Should stop power cycling after a failed write"""
+    client.set_ports_state.side_effect = client_response_error(500)
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": True, "3": True})
+
+    results = await device.power_cycle(["1", "2", "3"], 0, 2)
+
+    assert client.set_ports_state.call_count == 1
+    assert {port: result["status"] for port, result in results.items()} == {
+        "1": "failed",
+        "2": "failed",
+        "3": "not_run",
+    }
+
+
+@pytest.mark.asyncio
+async def test_power_cycle_wait_delivering(config_entry, client, mocker):
+    """Should wait for the ports to deliver power before the next batch"""
+    mocker.patch(_("devices.POWER_CYCLE_POLL_INTERVAL"), 0)
+    searching = poe_ports({"1": True, "2": True})
+    searching["2"] = searching["2"]._replace(status=PoeStatus.SEARCHING)
+    client.get_poe_state.side_effect = [searching, poe_ports({"1": True, "2": True})]
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True, "2": True})
+
+    results = await device.power_cycle(["1", "2"], 0, wait=True)
+
+    assert client.get_poe_state.call_count == 2
+    assert results["1"]["status"] == results["2"]["status"] == "cycled"
+    assert results["1"]["on"] <= results["1"]["delivering"] <= results["2"]["delivering"]
+    assert device.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_power_cycle_wait_timeout(config_entry, client, mocker):
+    """Should report ports that don't deliver power in time"""
+    mocker.patch(_("devices.POWER_CYCLE_POLL_INTERVAL"), 0)
+    searching = poe_ports({"1": True})
+    searching["1"] = searching["1"]._replace(status=PoeStatus.SEARCHING)
+    client.get_poe_state.return_value = searching
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True})
+
+    results = await device.power_cycle(["1"], 0, wait=True, timeout=0)
+
+    assert results["1"]["status"] == "timeout"
+    assert results["1"]["delivering"] is None
+
+
+@pytest.mark.asyncio
+async def test_power_cycle_unknown_port(device):
+    """Should raise error if any port is not known"""
+    with pytest.raises(ValueError):
+        await device.power_cycle(["1", "9"], 0)
+
+
+@pytest.mark.asyncio
+async def test_set_port_state_concurrent(config_entry, client):
+    """Should merge concurrent changes in a single bulk write"""
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": False, "2": False, "3": True})
+
+    results = await asyncio.gather(
+        device.set_port_state("1", True),
+        device.set_port_state("2", True),
+        device.set_ports_state({"3": False}),
+    )
+
+    assert results == [True, True, True]
+    assert device._client.set_poe_state.call_count == 0
+    assert device._client.set_ports_state.call_count == 1
+    assert device._client.set_ports_state.call_args.args[0] == {"1": True, "2": True, "3": False}
+    assert admin_modes(device.ports) == {"1": True, "2": True, "3": False}
+    assert device._client.login.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_update_waits_for_writes(config_entry, client):
+    """Should poll only after queued writes are done"""
+    calls = []
+    client.set_poe_state.side_effect = lambda *args: calls.append("write")
+    client.get_poe_state.side_effect = lambda: calls.append("read") or {}
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True})
+
+    await asyncio.gather(device.set_port_state("1", False), device.update())
+
+    assert calls == ["write", "read"]
+
+
+@pytest.mark.asyncio
+async def test_device_restore(config_entry, client):
+    """Should mark cached ports as restored until the next update"""
+    device = Hp1820Device(config_entry, client)
+    device.restore(poe_ports({"1": True, "2": True}))
+    assert device.restored is True
+    assert admin_modes(device.ports) == {"1": True, "2": True}
+    # Test
+    device._client.get_poe_state.return_value = poe_ports({"1": True, "2": False})
+    await device.update()
+    assert device.restored is False
+    assert admin_modes(device.ports) == {"1": True, "2": False}
+
+
+@pytest.mark.asyncio
+async def test_device_restore_update_error(config_entry, client, client_response_error):
+    """Should keep cached ports as restored if the update fails"""
+    client.get_poe_state = client_response_error(500)
+    device = Hp1820Device(config_entry, client)
+    device.restore(poe_ports({"1": True}))
+
+    with pytest.raises(ClientResponseError):
+        await device.update()
+    assert device.restored is True
+
+
+def test_get_port_unknown_port(device):
+    """Should raise error if port is not known"""
+    device._ports = poe_ports({"1": True})
+
+    with pytest.raises(ValueError):
+        device.get_port("2")
+
+
+def test_get_port_after_update(device):
+    """Should return the full PoE state of the port"""
+    device._ports = poe_ports({"1": True})
+
+    port = device.get_port("1")
+
+    assert port.interface == "1"
+    assert port.priority is Priority.LOW
+    assert port.enabled is True
+
+
+@pytest.mark.asyncio
+async def test_set_port_state_keeps_settings(config_entry, client):
+    """Should only change the admin mode of the port"""
+    device = Hp1820Device(config_entry, client)
+    device._ports = poe_ports({"1": True})
+    device._ports["1"] = device._ports["1"]._replace(priority=Priority.CRITICAL)
+
+    await device.set_port_state("1", False)
+
+    assert device.get_port("1").priority is Priority.CRITICAL
+    assert device.get_port_state("1") is False
+
+
+@pytest.mark.asyncio
+async def test_device_write_pending(device):
+    """Should keep written ports pending until a read confirms them."""
+    device.update = Hp1820Device.update.__get__(device)
+    device._client.get_poe_state.return_value = poe_ports({"1": False, "2": False})
+
+    await device.set_port_state("1", False)
+    assert device.pending == {"1": False}
+    await device.update()
+
+    assert device.pending == {}
+    assert device.pop_mismatches() == {}
+
+
+@pytest.mark.asyncio
+async def test_device_write_mismatch(device):
+    """Should report written ports that the switch didn't apply."""
+    device.update = Hp1820Device.update.__get__(device)
+    device._client.get_poe_state.return_value = poe_ports({"1": True, "2": False})
+
+    await device.set_port_state("2", True)
+    assert device.get_port_state("2") is True
+    await device.update()
+
+    mismatches = device.pop_mismatches()
+    assert list(mismatches) == ["2"]
+    expected, actual = mismatches["2"]
+    assert expected is True
+    assert actual.enabled is False
+    assert device.get_port_state("2") is False
+    assert device.pending == {}
+    assert device.pop_mismatches() == {}
+
+
+@pytest.mark.asyncio
+async def test_device_write_failed_not_pending(device):
+    """Should not mark ports as pending if the write failed."""
+    device._client.set_poe_state.side_effect = Exception("Unexpected error")
+
+    await device.set_port_state("1", False)
+
+    assert device.pending == {}
@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp.client_exceptions import ClientResponseError
+
+from custom_components.hp1820.client import (
+    Hp1820Client,
+    SessionExpiredError,
+    create_session,
+)
+from custom_components.hp1820.devices import Hp1820Device
+from custom_components.hp1820.models import (
+    SWITCH_MODELS,
+    AdminMode,
+    PoePortState,
+    Priority,
+    SwitchModel,
+)
+from custom_components.hp1820.session import Hp1820Session
+
+from .benchmarks.conftest import load_page
+from .emulator import POE_STATUS_URL, POE_URL, Hp1820Emulator, parse_interfaces
+
+
+def test_parse_interfaces():
+    assert parse_interfaces("1-3,5,7-8") == ["1", "2", "3", "5", "7", "8"]
+    assert parse_interfaces("lag1") == ["lag1"]
+
+
+def test_emulator_resize():
+    # Ensure ports keep their configuration when the switch is resized
+    emulator = Hp1820Emulator(ports=8)
+    emulator.ports["2"]["admin_mode_sel"] = "disabled"
+    emulator.resize(48)
+    assert len(emulator.ports) == 48
+    assert emulator.ports["2"]["admin_mode_sel"] == "disabled"
+
+
+@pytest.mark.asyncio
+async def test_emulator_poll(emulator):
+    # Ensure the client can read the PoE table
+    async with create_session() as session:
+        client = Hp1820Client(session, emulator.host)
+        await client.login("admin", "password")
+        ports = await client.get_poe_state()
+        await client.logout()
+    assert len(ports) == 24
+    assert ports["1"].admin_mode is AdminMode.ENABLED
+    assert ports["1"].priority is Priority.LOW
+    assert emulator.sessions == {}
+
+
+@pytest.mark.asyncio
+async def test_emulator_power(emulator):
+    # Ensure the client can read the power of enabled ports and the budget
+    emulator.ports["2"]["admin_mode_sel"] = "disabled"
+    async with create_session() as session:
+        client = Hp1820Client(session, emulator.host)
+        await client.login("admin", "password")
+        power = await client.get_poe_power()
+    assert len(power.ports) == 24
+    assert power.ports["1"].power == emulator.port_power("1")
+    assert power.ports["1"].voltage == 53.5
+    assert power.ports["2"].power == 0.0
+    assert power.budget == 185.0
+    assert power.consumed == pytest.approx(sum(emulator.port_power(port) for port in emulator.ports), abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_emulator_write(emulator):
+    # Ensure bulk writes are applied to the switch
+    emulator.ports["3"]["priority_sel"] = "critical"
+    async with create_session() as session:
+        client = Hp1820Client(session, emulator.host)
+        await client.login("admin", "password")
+        current = await client.get_poe_state()
+        await client.set_ports_state({"1": False, "2": False, "3": False}, current)
+        ports = await client.get_poe_state()
+    assert [ports[port].enabled for port in ("1", "2", "3", "4")] == [False, False, False, True]
+    assert ports["3"].priority is Priority.CRITICAL
+    assert emulator.requests["/htdocs/pages/base/poe_port_cfg_modal.lsp"] == 2
+
+
+@pytest.mark.asyncio
+async def test_emulator_invalid_credentials(emulator):
+    # Ensure wrong credentials are reported as an authentication error
+    async with create_session() as session:
+        client = Hp1820Client(session, emulator.host)
+        with pytest.raises(ClientResponseError) as excinfo:
+            await client.login("admin", "wrong")
+    assert excinfo.value.status == 401
+
+
+@pytest.mark.asyncio
+async def test_emulator_session_expired(emulator):
+    # Ensure pages requested with an expired SID redirect to the login page
+    async with create_session() as session:
+        client = Hp1820Client(session, emulator.host)
+        await client.login("admin", "password")
+        emulator.expire_sessions()
+        with pytest.raises(SessionExpiredError):
+            await client.get_poe_state()
+
+
+@pytest.mark.asyncio
+async def test_emulator_sid_timeout(emulator):
+    # Ensure the session is established again after the SID expiry
+    emulator.sid_timeout = 0.05
+    async with create_session() as session:
+        client = Hp1820Client(session, emulator.host)
+        hp_session = Hp1820Session(client, "admin", "password")
+        await hp_session.call(client.get_poe_state)
+        await asyncio.sleep(0.1)
+        ports = await hp_session.call(client.get_poe_state)
+    assert len(ports) == 24
+    assert emulator.requests["/htdocs/login/login.lua"] == 2
+
+
+@pytest.mark.asyncio
+async def test_emulator_device_update_single_login(emulator, config_entry):
+    # Ensure both pages of a poll are read with a single login, also after the SID expiry
+    emulator.sid_timeout = 0.05
+    async with create_session() as session:
+        device = Hp1820Device(config_entry, Hp1820Client(session, emulator.host))
+        device._session = Hp1820Session(device._client, "admin", "password")
+        await device.update()
+        await asyncio.sleep(0.1)
+        await device.update()
+    assert len(device.power.ports) == 24
+    assert emulator.requests[POE_URL] == 3
+    assert emulator.requests[POE_STATUS_URL] == 2
+    assert emulator.requests["/htdocs/login/login.lua"] == 2
+
+
+@pytest.mark.asyncio
+async def test_emulator_single_session(emulator):
+    # Ensure a second client is rejected while another session is active
+    async with create_session() as first, create_session() as second:
+        await Hp1820Client(first, emulator.host).login("admin", "password")
+        with pytest.raises(ClientResponseError):
+            await Hp1820Client(second, emulator.host).login("admin", "password")
+        # The same client can log in again
+        await Hp1820Client(first, emulator.host).login("admin", "password")
+    assert len(emulator.sessions) == 1
+
+
+@pytest.mark.asyncio
+async def test_emulator_error_rate(emulator):
+    # Ensure failures are injected
+    emulator.error_rate = 1.0
+    async with create_session() as session:
+        client = Hp1820Client(session, emulator.host)
+        with pytest.raises(ClientResponseError) as excinfo:
+            await client.logout()
+    assert excinfo.value.status == 500
+    assert emulator.errors == 1
+
+
+@pytest.mark.asyncio
+async def test_emulator_latency(emulator):
+    # Ensure the latency is applied to each request
+    emulator.latency = 0.05
+    async with create_session() as session:
+        client = Hp1820Client(session, emulator.host)
+        start = time.monotonic()
+        await client.login("admin", "password")
+        await client.get_poe_state()
+    assert time.monotonic() - start >= 0.1
+    assert emulator.requests[POE_URL] == 1
+
+
+@pytest.mark.parametrize("model", SWITCH_MODELS, ids=lambda model: model.name)
+def test_emulator_detect_model(model):
+    # Ensure the page of each model is recognised, including the benchmark pages rendered by the emulator
+    client = Hp1820Client(None, "127.0.0.1")
+    pages = [Hp1820Emulator(ports=model.poe_ports).render_poe_page(), load_page(model)]
+    for page in pages:
+        ports = [PoePortState.from_row(row).interface for row in client._parse_status(page)]
+        assert len(ports) == model.poe_ports
+        assert SwitchModel.detect(ports) == model
+
+
+def test_emulator_padding():
+    # Ensure the page can be as large as the one served by the switch
+    assert len(Hp1820Emulator(padding=32).render_poe_page()) > 32 * 1024
@@ -1,7 +1,12 @@
 import pytest
 from homeassistant.core import valid_entity_id
 
-from custom_components.hp1820.helpers import generate_entity_id
+from custom_components.hp1820.helpers import (
+    device_info,
+    format_interfaces,
+    generate_entity_id,
+)
+from custom_components.hp1820.models import SwitchModel
 
 
 def test_generate_entity_name_empty(config_entry):
@@ -48,3 +53,42 @@ def test_generate_entity_name_with_name_system(hass, config_entry):
     entity_id = generate_entity_id(config_entry, "01")
     assert entity_id == "hp1820.127_0_0_1_01"
     assert valid_entity_id(entity_id)
+
+
+def test_format_interfaces_single():
+    assert format_interfaces(["3"]) == "3"
+
+
+def test_format_interfaces_range():
+    assert format_interfaces(["1", "2", "3", "4"]) == "1-4"
+
+
+def test_format_interfaces_mixed():
+    assert format_interfaces(["8", "1", "2", "3", "5", "7"]) == "1-3,5,7-8"
+
+
+def test_format_interfaces_duplicates():
+    assert format_interfaces(["2", "1", "2"]) == "1-2"
+
+
+def test_format_interfaces_not_numeric():
+    assert format_interfaces(["2", "lag1", "1"]) == "1-2,lag1"
+
+
+def test_format_interfaces_empty():
+    with pytest.raises(ValueError):
+        format_interfaces([])
+
+
+def test_device_info(config_entry):
+    # Ensure entities of a switch are grouped in a device identified by the config entry
+    info = device_info(config_entry)
+    assert info["identifiers"] == {("hp1820", "test_entry_id")}
+    assert info["name"] == "HP 1820 test_ip"
+    assert info["configuration_url"] == "http://test_ip"
+
+
+def test_device_info_model(config_entry):
+    # Ensure the detected model is recorded in the device
+    assert device_info(config_entry)["model"] == "1820"
+    assert device_info(config_entry, SwitchModel("1820-24G-PoE+", 24, 12))["model"] == "1820-24G-PoE+"
@@ -0,0 +1,251 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from aiohttp import ClientConnectionError
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import device_registry as dr
+
+from custom_components.hp1820.const import (
+    DOMAIN,
+    KEY_COORDINATOR,
+    KEY_DEVICE,
+    KEY_HTTP_SESSION,
+)
+from custom_components.hp1820.diagnostics import async_get_config_entry_diagnostics
+from custom_components.hp1820.metrics import Hp1820Metrics
+
+from .helpers import _, poe_ports, power_status
+
+
+@pytest.fixture
+def m_client(mocker):
+    m_client = mocker.patch(_("Hp1820Client")).return_value
+    m_client.login = AsyncMock()
+    m_client.logout = AsyncMock()
+    m_client.get_poe_state = AsyncMock(return_value=poe_ports({"1": True, "2": False}))
+    m_client.get_poe_power = AsyncMock(return_value=power_status({"1": 4.2, "2": None}, budget=65.0))
+    m_client.metrics = Hp1820Metrics()
+    return m_client
+
+
+@pytest.mark.asyncio
+async def test_setup_entry_without_cache(hass, config_entry, m_client):
+    # Ensure the setup waits for the first refresh if nothing is cached
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    device = hass.data[DOMAIN][config_entry.entry_id][KEY_DEVICE]
+    assert m_client.get_poe_state.call_count == 1
+    assert device.restored is False
+    assert hass.states.get("switch.test_ip_01").state == "on"
+    assert hass.states.get("sensor.test_ip_poll_time").state != "unknown"
+    assert hass.states.get("sensor.test_ip_polls") is None
+    assert hass.states.get("sensor.test_ip_01_power").state == "4.2"
+    assert hass.states.get("sensor.test_ip_poe_budget").state == "65.0"
+    assert m_client.login.call_count == 1
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_diagnostics(hass, config_entry, m_client):
+    # Ensure diagnostics redact credentials and expose the polling schedule and metrics
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    # Test
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["data"]["username"] == "**REDACTED**"
+    assert diagnostics["data"]["password"] == "**REDACTED**"
+    assert diagnostics["data"]["system_ip"] == "test_ip"
+    assert [item["entry_id"] for item in diagnostics["schedule"]] == [config_entry.entry_id]
+    assert 0 < diagnostics["schedule"][0]["next_refresh"] < 1.5 * diagnostics["interval"]
+    assert diagnostics["metrics"]["counters"]["polls"] == 1
+    assert diagnostics["metrics"]["latencies"]["poll"]["samples"] == 1
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_unload_entry_switch_unreachable(hass, config_entry, m_client):
+    # Ensure the entry is unloaded and its HTTP session closed even if the logout fails
+    m_client.logout.side_effect = ClientConnectionError()
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    session = hass.data[DOMAIN][config_entry.entry_id][KEY_HTTP_SESSION]
+    # Test
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    assert config_entry.state is ConfigEntryState.NOT_LOADED
+    assert m_client.logout.call_count == 1
+    assert session.closed is True
+
+
+@pytest.mark.asyncio
+async def test_services_after_unload(hass, config_entry, m_client):
+    # Ensure services are registered once, and fail with a clear error once the switch is unloaded
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    # Test
+    assert hass.services.has_service(DOMAIN, "save_snapshot")
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(DOMAIN, "save_snapshot", {"name": "before"}, blocking=True, return_response=True)
+
+
+@pytest.mark.asyncio
+async def test_setup_entry_snmp(hass, config_entry, m_client, mocker):
+    # Ensure the switch is read over SNMP if selected in the config entry
+    m_snmp = mocker.patch(_("Hp1820SnmpClient"))
+    m_snmp.return_value = m_client
+    hass.config_entries.async_update_entry(
+        config_entry, data={**config_entry.data, "backend": "snmp", "snmp_community": "secret"}
+    )
+    # Test
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    assert m_snmp.call_args.args == ("test_ip", "secret")
+    assert m_client.get_poe_state.call_count == 1
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_setup_entry_syslog(hass, config_entry, m_client, mocker):
+    # Ensure the switch is registered to the shared syslog listener, until the entry is unloaded
+    m_register = mocker.patch(_("Hp1820SyslogListener.async_register"))
+    hass.config_entries.async_update_entry(config_entry, options={"syslog_port": 5514})
+    # Test
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    listener = hass.data[DOMAIN]["syslog"][5514]
+    assert listener.port == 5514
+    assert m_register.call_args.args[0] == "test_ip"
+    coordinator = hass.data[DOMAIN][config_entry.entry_id][KEY_COORDINATOR]
+    assert m_register.call_args.args[1] == coordinator.async_request_event_refresh
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    assert m_register.return_value.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_setup_entry_inventory(hass, config_entry, m_client):
+    # Ensure entities follow the ports of the switch, and the detected model is recorded
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id][KEY_COORDINATOR]
+    registry = dr.async_get(hass)
+    assert registry.async_get_device(identifiers={(DOMAIN, config_entry.entry_id)}).model == "1820-8G-PoE+"
+    # Test
+    m_client.get_poe_state.return_value = poe_ports({str(port): True for port in range(1, 13)})
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get("switch.test_ip_12").state == "on"
+    assert registry.async_get_device(identifiers={(DOMAIN, config_entry.entry_id)}).model == "1820-24G-PoE+"
+    m_client.get_poe_state.return_value = poe_ports({"1": True})
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get("switch.test_ip_01").state == "on"
+    assert hass.states.get("switch.test_ip_02").state == "unavailable"
+    assert registry.async_get_device(identifiers={(DOMAIN, config_entry.entry_id)}).model == "1820-8G-PoE+"
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_options_update_live(hass, config_entry, m_client, mocker):
+    # Ensure polling options are applied without reloading the entry
+    m_reload = mocker.patch.object(hass.config_entries, "async_reload")
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id][KEY_COORDINATOR]
+    # Test
+    hass.config_entries.async_update_entry(
+        config_entry,
+        options={"scan_interval": 30, "ports_scan_interval": 600, "verify_writes": False, "stale_max_age": 900},
+    )
+    await hass.async_block_till_done()
+    assert m_reload.call_count == 0
+    assert hass.data[DOMAIN][config_entry.entry_id][KEY_COORDINATOR] is coordinator
+    assert coordinator.current_interval == 30
+    assert coordinator._verify_delay is None
+    assert coordinator._stale_max_age == 900
+    assert hass.data[DOMAIN][config_entry.entry_id][KEY_DEVICE]._groups["ports"].interval == 600
+    assert m_client.login.call_count == 1
+    assert hass.states.get("switch.test_ip_01").state == "on"
+    hass.config_entries.async_update_entry(config_entry, title="Switch")
+    await hass.async_block_till_done()
+    assert m_reload.call_count == 0
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_options_update_defaults(hass, config_entry, m_client, mocker):
+    # Ensure saving the default options the first time doesn't reload the entry
+    m_reload = mocker.patch.object(hass.config_entries, "async_reload")
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id][KEY_COORDINATOR]
+    # Test
+    hass.config_entries.async_update_entry(
+        config_entry,
+        options={
+            "scan_interval": 120,
+            "session_idle_timeout": 0,
+            "adaptive_polling": False,
+            "scan_interval_min": 10,
+            "scan_interval_max": 600,
+            "ports_scan_interval": 0,
+            "power_scan_interval": 0,
+            "verify_writes": True,
+            "syslog_port": 0,
+            "stale_max_age": 0,
+        },
+    )
+    await hass.async_block_till_done()
+    assert m_reload.call_count == 0
+    assert hass.data[DOMAIN][config_entry.entry_id][KEY_COORDINATOR] is coordinator
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_options_update_reload(hass, config_entry, m_client, mocker):
+    # Ensure the entry is reloaded for options that can't be applied live
+    mocker.patch(_("Hp1820SyslogListener.async_register"))
+    m_reload = mocker.patch.object(hass.config_entries, "async_reload")
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    # Test
+    hass.config_entries.async_update_entry(config_entry, options={"syslog_port": 5514})
+    await hass.async_block_till_done()
+    assert m_reload.call_count == 1
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_options_update_connection(hass, config_entry, m_client, mocker):
+    # Ensure the entry is reloaded if the connection settings changed
+    m_reload = mocker.patch.object(hass.config_entries, "async_reload")
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    # Test
+    hass.config_entries.async_update_entry(config_entry, data={**config_entry.data, "system_ip": "10.0.0.2"})
+    await hass.async_block_till_done()
+    assert m_reload.call_count == 1
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_setup_entry_from_cache(hass, config_entry, m_client, hass_storage):
+    # Ensure entities are created from the cache, while the switch is refreshed in the background
+    hass_storage["hp1820.test_entry_id"] = {
+        "version": 1,
+        "key": "hp1820.test_entry_id",
+        "data": {"ports": {port: state.to_dict() for port, state in poe_ports({"1": False, "2": False}).items()}},
+    }
+    # The switch doesn't answer until the setup is done
+    answer = asyncio.Event()
+
+    async def get_poe_state():
+        await answer.wait()
+        return poe_ports({"1": True, "2": False})
+
+    m_client.get_poe_state.side_effect = get_poe_state
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    device = hass.data[DOMAIN][config_entry.entry_id][KEY_DEVICE]
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert device.restored is True
+    state = hass.states.get("switch.test_ip_01")
+    assert state.state == "off"
+    assert state.attributes["restored"] is True
+    # Test
+    answer.set()
+    await hass.async_block_till_done()
+    state = hass.states.get("switch.test_ip_01")
+    assert state.state == "on"
+    assert state.attributes["restored"] is False
+    assert hass.states.get("switch.test_ip_02").attributes["restored"] is False
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
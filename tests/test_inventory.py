@@ -0,0 +1,53 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from custom_components.hp1820.inventory import Hp1820PortInventory
+
+
+def _entity(port_id):
+    entity = Mock(port_id=port_id, platform=Mock())
+    entity.async_remove = AsyncMock()
+    return entity
+
+
+@pytest.mark.asyncio
+async def test_inventory_add_ports(hass, config_entry, coordinator):
+    # Ensure entities are created only for ports that are new
+    added = []
+    inventory = Hp1820PortInventory(hass, config_entry, lambda port: [_entity(port)], added.extend)
+    inventory.async_track(coordinator, ["1", "2"])
+    # Test
+    inventory.async_update({"1", "2", "10", "3"})
+    assert [entity.port_id for entity in added] == ["1", "2", "3", "10"]
+    assert inventory.ports == {"1", "2", "3", "10"}
+
+
+@pytest.mark.asyncio
+async def test_inventory_remove_ports(hass, config_entry, coordinator):
+    # Ensure entities of ports that are gone are removed
+    added = []
+    inventory = Hp1820PortInventory(hass, config_entry, lambda port: [_entity(port)], added.extend)
+    inventory.async_track(coordinator, ["1", "2"])
+    # Test
+    inventory.async_update({"1"})
+    await hass.async_block_till_done()
+    assert added[0].async_remove.call_count == 0
+    assert added[1].async_remove.call_count == 1
+    assert inventory.ports == {"1"}
+
+
+@pytest.mark.asyncio
+async def test_inventory_follow_coordinator(hass, config_entry, coordinator, device):
+    # Ensure the inventory follows the ports reported by the coordinator until untracked
+    added = []
+    inventory = Hp1820PortInventory(hass, config_entry, lambda port: [_entity(port)], added.extend)
+    untrack = inventory.async_track(coordinator, ["1", "2"])
+    device._ports = {**device._ports, **{"3": device._ports["1"]._replace(interface="3")}}
+    # Test
+    coordinator.async_update_listeners()
+    assert inventory.ports == {"1", "2", "3"}
+    untrack()
+    device._ports = {"1": device._ports["1"]}
+    coordinator.async_update_listeners()
+    assert inventory.ports == {"1", "2", "3"}
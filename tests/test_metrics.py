@@ -0,0 +1,67 @@
+import pytest
+
+from custom_components.hp1820.metrics import Hp1820Metrics, RingBuffer
+
+
+def test_ring_buffer_empty():
+    # Ensure an empty buffer has no percentiles
+    samples = RingBuffer(10)
+    assert len(samples) == 0
+    assert samples.last is None
+    assert samples.percentile(50) is None
+
+
+def test_ring_buffer_percentile():
+    # Ensure percentiles use the nearest rank
+    samples = RingBuffer(100)
+    for value in range(1, 101):
+        samples.add(value)
+    assert samples.percentile(0) == 1
+    assert samples.percentile(50) == 50
+    assert samples.percentile(95) == 95
+    assert samples.percentile(100) == 100
+
+
+def test_ring_buffer_size():
+    # Ensure only the last samples are kept
+    samples = RingBuffer(3)
+    for value in [100, 1, 2, 3]:
+        samples.add(value)
+    assert len(samples) == 3
+    assert samples.last == 3
+    assert samples.percentile(100) == 3
+
+
+def test_metrics_increment():
+    # Ensure counters start from zero
+    metrics = Hp1820Metrics()
+    assert metrics.counters["logins"] == 0
+    metrics.increment("logins")
+    metrics.increment("requests", 3)
+    assert metrics.counters["logins"] == 1
+    assert metrics.counters["requests"] == 3
+
+
+def test_metrics_timer(mocker):
+    # Ensure the timer measures the block in seconds
+    mocker.patch("custom_components.hp1820.metrics.time.perf_counter", side_effect=[1.0, 1.25])
+    metrics = Hp1820Metrics()
+    with metrics.timer("login"):
+        pass
+    assert metrics.latencies["login"].last == 0.25
+
+
+def test_metrics_timer_error():
+    # Ensure the timer measures also blocks that raise
+    metrics = Hp1820Metrics()
+    with pytest.raises(ValueError):
+        with metrics.timer("write"):
+            raise ValueError()
+    assert len(metrics.latencies["write"]) == 1
+
+
+def test_metrics_unknown_latency():
+    # Ensure only known latencies are collected
+    metrics = Hp1820Metrics()
+    with pytest.raises(KeyError):
+        metrics.observe("unknown", 1.0)
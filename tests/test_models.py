@@ -0,0 +1,166 @@
+import json
+
+import pytest
+
+from custom_components.hp1820.models import (
+    AdminMode,
+    DetectType,
+    FaultStatus,
+    HighPowerMode,
+    LimitType,
+    PoePortPower,
+    PoePortState,
+    PoePowerStatus,
+    PoeStatus,
+    Priority,
+    Schedule,
+    SwitchModel,
+)
+
+ROW = ["3", "Enabled", "High", "None", "Disable", "4pt 802.3af + Legacy", "Class Based", "Delivering Power", "No Error"]
+
+
+def test_poe_enum_parse_value():
+    assert Priority.parse("critical") is Priority.CRITICAL
+    assert Schedule.parse("2") is Schedule.SCHEDULE_2
+
+
+def test_poe_enum_parse_label():
+    # Ensure labels are parsed regardless of case and spacing
+    assert PoeStatus.parse("Delivering  Power") is PoeStatus.DELIVERING
+    assert FaultStatus.parse("MPS Absent") is FaultStatus.MPS_ABSENT
+    assert DetectType.parse("4pt 802.3af") is DetectType.DOT3AF
+    assert HighPowerMode.parse("Enable") is HighPowerMode.DOT3AT
+    assert LimitType.parse("User Defined") is LimitType.USER
+
+
+def test_poe_enum_parse_unknown():
+    # Ensure an unexpected label doesn't raise
+    assert AdminMode.parse("Maybe") is AdminMode.UNKNOWN
+    assert FaultStatus.parse("") is FaultStatus.UNKNOWN
+
+
+def test_poe_port_state_from_row():
+    port = PoePortState.from_row(ROW)
+    assert port == PoePortState(
+        "3",
+        AdminMode.ENABLED,
+        Priority.HIGH,
+        Schedule.NONE,
+        HighPowerMode.DISABLE,
+        DetectType.DOT3AF_LEGACY,
+        LimitType.DOT3AF,
+        PoeStatus.DELIVERING,
+        FaultStatus.NO_ERROR,
+    )
+    assert port.enabled is True
+
+
+def test_poe_port_state_from_short_row():
+    # Ensure missing columns are parsed as unknown
+    port = PoePortState.from_row(["3", "Disabled"])
+    assert port.enabled is False
+    assert port.fault_status is FaultStatus.UNKNOWN
+
+
+def test_poe_port_state_to_config():
+    # Ensure the current settings are kept
+    config = PoePortState.from_row(ROW).to_config(False)
+    assert config == {
+        "admin_mode_sel": "disabled",
+        "schedule_sel": "none",
+        "priority_sel": "high",
+        "high_power_mode_sel": "disable",
+        "power_detect_type_sel": "4pt_dot3af_leg",
+        "power_limit_type_sel": "dot3af",
+        "power_limit": "",
+    }
+
+
+def test_poe_port_state_to_config_keep_admin_mode():
+    assert PoePortState.from_row(ROW).to_config()["admin_mode_sel"] == "enabled"
+
+
+def test_poe_port_state_to_config_defaults():
+    # Ensure unknown settings fall back to the switch defaults
+    assert PoePortState("1").to_config(True) == {
+        "admin_mode_sel": "enabled",
+        "schedule_sel": "none",
+        "priority_sel": "low",
+        "high_power_mode_sel": "disable",
+        "power_detect_type_sel": "4pt_dot3af",
+        "power_limit_type_sel": "dot3af",
+        "power_limit": "",
+    }
+
+
+def test_poe_port_state_to_config_power_limit():
+    assert PoePortState.from_row(ROW).to_config(power_limit=15.4)["power_limit"] == "15.4"
+    assert PoePortState.from_row(ROW).to_config(power_limit=30)["power_limit"] == "30"
+
+
+def test_poe_port_state_with_enabled():
+    port = PoePortState.from_row(ROW).with_enabled(False)
+    assert port.admin_mode is AdminMode.DISABLED
+    assert port.priority is Priority.HIGH
+
+
+def test_port_state_dict_round_trip():
+    # Ensure records can be stored as JSON and restored
+    port = PoePortState.from_row(ROW)
+    data = port.to_dict()
+    assert data["admin_mode"] == "enabled"
+    assert data["detect_type"] == "4pt_dot3af_leg"
+    assert json.loads(json.dumps(data)) == data
+    assert PoePortState.from_dict(data) == port
+
+
+def test_port_state_from_dict_missing_fields():
+    # Ensure missing or unknown fields are restored as unknown
+    port = PoePortState.from_dict({"interface": "3", "priority": "unexpected"})
+    assert port.interface == "3"
+    assert port.priority is Priority.UNKNOWN
+    assert port.admin_mode is AdminMode.UNKNOWN
+
+
+def test_port_power_from_row():
+    # Ensure readings are parsed as numbers, also when followed by their unit
+    port = PoePortPower.from_row(["1", "4.2", "78 mA", "53.5"])
+    assert port == PoePortPower("1", 4.2, 78.0, 53.5)
+
+
+def test_port_power_from_row_not_applicable():
+    # Ensure missing or not numeric readings are None
+    port = PoePortPower.from_row(["2", "--"])
+    assert port == PoePortPower("2", None, None, None)
+
+
+def test_power_status_from_rows():
+    # Ensure the budget is read from the summary
+    power = PoePowerStatus.from_rows([["1", "4.2"], ["2", "0.0"]], ["65.0", "4.5"])
+    assert list(power.ports) == ["1", "2"]
+    assert power.budget == 65.0
+    assert power.consumed == 4.5
+    assert power.remaining == 60.5
+
+
+def test_power_status_without_summary():
+    # Ensure the consumed power is the sum of the ports if the summary is missing
+    power = PoePowerStatus.from_rows([["1", "4.2"], ["2", "--"], ["3", "1.3"]])
+    assert power.budget is None
+    assert power.consumed == pytest.approx(5.5)
+    assert power.remaining is None
+
+
+def test_switch_model_detect():
+    # Ensure the smallest model with all the PoE ports is detected
+    assert SwitchModel.detect(str(port) for port in range(1, 5)).ports == 8
+    assert SwitchModel.detect(str(port) for port in range(1, 9)).ports == 24
+    assert SwitchModel.detect(["1", "2", "12"]).ports == 24
+    assert SwitchModel.detect(str(port) for port in range(1, 25)).name == "1820-48G-PoE+"
+
+
+def test_switch_model_detect_unknown():
+    # Ensure no model is detected without ports, or with more ports than any model
+    assert SwitchModel.detect([]) is None
+    assert SwitchModel.detect(["1", "49"]) is None
@@ -1,4 +1,5 @@
 import pytest
+import voluptuous as vol
 
 from custom_components.hp1820.const import DOMAIN, KEY_DEVICE
 
@@ -24,8 +25,33 @@ class TestOptionsFlow:
         assert form["errors"] == {}
         assert list(form["data_schema"].schema.keys()) == [
             "scan_interval",
+            "session_idle_timeout",
+            "adaptive_polling",
+            "scan_interval_min",
+            "scan_interval_max",
+            "ports_scan_interval",
+            "power_scan_interval",
+            "verify_writes",
+            "syslog_port",
+            "stale_max_age",
         ]
-        assert form["data_schema"].schema["scan_interval"] == int
+        schema = form["data_schema"].schema
+        assert schema["adaptive_polling"] == bool
+        assert schema["verify_writes"] == bool
+        # Numbers are integers within their bounds
+        for key in ("scan_interval", "scan_interval_min", "scan_interval_max"):
+            assert schema[key](5) == 5
+            with pytest.raises(vol.Invalid):
+                schema[key](4)
+        for key in ("session_idle_timeout", "ports_scan_interval", "power_scan_interval", "stale_max_age"):
+            assert schema[key](0) == 0
+            with pytest.raises(vol.Invalid):
+                schema[key](-1)
+        assert schema["syslog_port"](5514) == 5514
+        with pytest.raises(vol.Invalid):
+            schema["syslog_port"](65536)
+        with pytest.raises(vol.Invalid):
+            schema["scan_interval"]("60")
 
     async def test_form_submit_successful_empty(self, hass, config_entry):
         # Ensure an empty form can be submitted successfully
@@ -41,7 +67,36 @@ class TestOptionsFlow:
         # Check HA config
         assert result["type"] == "create_entry"
         assert result["title"] == "Hp1820"
-        assert result["data"] == {"scan_interval": 120}
+        assert result["data"] == {
+            "scan_interval": 120,
+            "session_idle_timeout": 0,
+            "adaptive_polling": False,
+            "scan_interval_min": 10,
+            "scan_interval_max": 600,
+            "ports_scan_interval": 0,
+            "power_scan_interval": 0,
+            "verify_writes": True,
+            "syslog_port": 0,
+            "stale_max_age": 0,
+        }
+
+    async def test_form_submit_invalid_interval(self, hass, config_entry):
+        # Ensure the minimum adaptive interval can't be greater than the maximum
+        form = await hass.config_entries.options.async_init(
+            config_entry.entry_id, context={"show_advanced_options": False}
+        )
+        # Test
+        result = await hass.config_entries.options.async_configure(
+            form["flow_id"],
+            user_input={
+                "adaptive_polling": True,
+                "scan_interval_min": 60,
+                "scan_interval_max": 30,
+            },
+        )
+        await hass.async_block_till_done()
+        assert result["type"] == "form"
+        assert result["errors"] == {"base": "invalid_interval"}
 
     # async def test_form_submit_invalid_type(self, hass, config_entry):
     #     # Ensure it fails if a user submits an option with an invalid type
@@ -86,7 +141,7 @@ class TestOptionsFlow:
         result = await hass.config_entries.options.async_configure(
             form["flow_id"],
             user_input={
-                "scan_interval": 1,
+                "scan_interval": 5,
             },
         )
         await hass.async_block_till_done()
@@ -94,6 +149,15 @@ class TestOptionsFlow:
         assert result["type"] == "create_entry"
         assert result["title"] == "Hp1820"
         assert result["data"] == {
-            "scan_interval": 1,
+            "scan_interval": 5,
+            "session_idle_timeout": 0,
+            "adaptive_polling": False,
+            "scan_interval_min": 10,
+            "scan_interval_max": 600,
+            "ports_scan_interval": 0,
+            "power_scan_interval": 0,
+            "verify_writes": True,
+            "syslog_port": 0,
+            "stale_max_age": 0,
         }
         assert result["result"] is True
@@ -0,0 +1,108 @@
+import pytest
+
+from custom_components.hp1820.parser import find_data_set, parse_data_set
+
+PAGE = """<html><head><script type='text/javascript'>
+var aDataSetSize = [10];
+var aDataSet = [['', '1', 'Enabled', 'Low'],
+['', '2', 'Disabled', 'High']];
+var aColumns = [{ 'sTitle': 'Interface' }];
+</script></head></html>"""
+
+
+def test_parse_data_set():
+    # Ensure rows are parsed as lists of strings
+    assert parse_data_set(PAGE) == [["", "1", "Enabled", "Low"], ["", "2", "Disabled", "High"]]
+
+
+def test_parse_data_set_other_table():
+    # Ensure other tables can be parsed from the same page
+    assert parse_data_set(PAGE, "aDataSetSize") == [10]
+
+
+def test_parse_data_set_not_found():
+    # Ensure a missing table is reported
+    with pytest.raises(ValueError):
+        parse_data_set("<html>login</html>")
+
+
+def test_parse_data_set_name_prefix():
+    # Ensure a variable with the same suffix is not matched
+    assert parse_data_set("var xaDataSet = [1]; var aDataSet = [2];") == [2]
+
+
+def test_parse_data_set_empty():
+    assert parse_data_set("var aDataSet = [];") == []
+    assert parse_data_set("var aDataSet = [[], []];") == [[], []]
+
+
+def test_parse_data_set_no_spaces():
+    assert parse_data_set("aDataSet=[['a','b'],['c','d']];") == [["a", "b"], ["c", "d"]]
+
+
+def test_parse_data_set_trailing_comma():
+    assert parse_data_set("var aDataSet = [['a', 'b',], ['c'],];") == [["a", "b"], ["c"]]
+
+
+def test_parse_data_set_escaped_quotes():
+    # Ensure escaped quotes don't terminate the string
+    page = r"""var aDataSet = [['it\'s', "say \"hi\"", 'back\\slash']];"""
+    assert parse_data_set(page) == [["it's", 'say "hi"', "back\\slash"]]
+
+
+def test_parse_data_set_mixed_quotes():
+    # Ensure quotes of the other kind are kept as they are
+    page = """var aDataSet = [['<input type="checkbox">', "it's"]];"""
+    assert parse_data_set(page) == [['<input type="checkbox">', "it's"]]
+
+
+def test_parse_data_set_escape_sequences():
+    page = r"""var aDataSet = [['a\nb', 'tab\there', '\u0041']];"""
+    assert parse_data_set(page) == [["a\nb", "tab\there", "A"]]
+
+
+def test_parse_data_set_literals():
+    page = "var aDataSet = [[1, -2.5, true, false, null], ['x', 3]];"
+    assert parse_data_set(page) == [[1, -2.5, True, False, None], ["x", 3]]
+
+
+def test_parse_data_set_nested():
+    page = "var aDataSet = [[['a', ['b']], 'c']];"
+    assert parse_data_set(page) == [[["a", ["b"]], "c"]]
+
+
+def test_parse_data_set_multiline_string():
+    page = "var aDataSet = [['first\nsecond']];"
+    assert parse_data_set(page) == [["first\nsecond"]]
+
+
+def test_parse_data_set_unterminated_array():
+    with pytest.raises(ValueError):
+        parse_data_set("var aDataSet = [['a', 'b']")
+
+
+def test_parse_data_set_unterminated_string():
+    with pytest.raises(ValueError):
+        parse_data_set("var aDataSet = [['a, 'b']];")
+
+
+def test_parse_data_set_unexpected_token():
+    with pytest.raises(ValueError):
+        parse_data_set("var aDataSet = [[foo]];")
+
+
+def test_find_data_set():
+    # Ensure the span covers the table up to the end of the script
+    start, end = find_data_set(PAGE)
+    assert PAGE[start:].startswith("[['', '1'")
+    assert PAGE[end:].startswith("</script>")
+
+
+def test_find_data_set_without_script_end():
+    page = "var aDataSet = [['a']];"
+    assert find_data_set(page) == (15, len(page))
+
+
+def test_find_data_set_not_found():
+    with pytest.raises(ValueError):
+        find_data_set("<html>login</html>")
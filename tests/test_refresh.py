@@ -0,0 +1,44 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from custom_components.hp1820.refresh import RefreshGroup
+
+
+def test_refresh_group_due_first_poll():
+    # Ensure a page never read is due
+    group = RefreshGroup("ports", AsyncMock(), 600)
+    assert group.due(0) is True
+
+
+def test_refresh_group_interval():
+    # Ensure a page is due once its interval elapsed since the last poll that read it
+    group = RefreshGroup("ports", AsyncMock(), 600)
+    group.refreshed(100)
+    assert group.due(699) is False
+    assert group.due(700) is True
+
+
+def test_refresh_group_every_poll():
+    # Ensure a page without interval is read on every poll
+    group = RefreshGroup("power", AsyncMock())
+    group.refreshed(100)
+    assert group.due(100) is True
+
+
+def test_refresh_group_invalidate():
+    # Ensure an invalidated page is due regardless of the interval
+    group = RefreshGroup("ports", AsyncMock(), 600)
+    group.refreshed(100)
+    group.invalidate()
+    assert group.due(101) is True
+
+
+@pytest.mark.asyncio
+async def test_refresh_group_fetch():
+    # Ensure fetching doesn't record the refresh, so a failed poll reads the page again
+    fetch = AsyncMock(return_value={"1": True})
+    group = RefreshGroup("ports", fetch, 600)
+    assert await group.fetch() == {"1": True}
+    assert fetch.call_count == 1
+    assert group.last_refresh is None
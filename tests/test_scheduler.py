@@ -0,0 +1,108 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.hp1820.scheduler import Hp1820Scheduler
+
+
+def coordinator(interval=60, next_refresh=None):
+    m_coordinator = MagicMock()
+    m_coordinator.current_interval = interval
+    m_coordinator.next_refresh = next_refresh
+    return m_coordinator
+
+
+def test_scheduler_phases():
+    # Ensure switches are spread evenly in order of registration
+    scheduler = Hp1820Scheduler()
+    first, second, third, fourth = coordinator(), coordinator(), coordinator(), coordinator()
+    for index, item in enumerate((first, second, third, fourth)):
+        scheduler.register(f"entry_{index}", item)
+    assert [scheduler.phase(item) for item in (first, second, third, fourth)] == [0, 0.25, 0.5, 0.75]
+
+
+def test_scheduler_unregister():
+    # Ensure phases are redistributed when a switch is removed
+    scheduler = Hp1820Scheduler()
+    first, second = coordinator(), coordinator()
+    scheduler.register("first", first)
+    scheduler.register("second", second)
+    scheduler.unregister("first")
+    assert scheduler.phase(first) is None
+    assert scheduler.phase(second) == 0
+
+
+def test_scheduler_realign():
+    # Ensure all switches are aligned again when phases change
+    scheduler = Hp1820Scheduler()
+    first, second = coordinator(), coordinator()
+    scheduler.register("first", first)
+    first.async_align_phase.reset_mock()
+    # Test
+    scheduler.register("second", second)
+    assert first.async_align_phase.call_count == 1
+    assert second.async_align_phase.call_count == 1
+    scheduler.unregister("second")
+    assert first.async_align_phase.call_count == 2
+    scheduler.unregister("second")
+    assert first.async_align_phase.call_count == 2
+
+
+def test_scheduler_delay_aligned():
+    # Ensure refreshes are aligned to the phase of each switch
+    scheduler = Hp1820Scheduler()
+    first, second = coordinator(), coordinator()
+    scheduler.register("first", first)
+    scheduler.register("second", second)
+    assert scheduler.delay(first, 1000, 60) == 80
+    assert scheduler.delay(second, 1000, 60) == 50
+
+
+def test_scheduler_delay_bounds():
+    # Ensure the next refresh is between half and one and a half intervals from now
+    scheduler = Hp1820Scheduler()
+    switches = [coordinator() for _ in range(7)]
+    for index, item in enumerate(switches):
+        scheduler.register(str(index), item)
+    for now in (0, 13.7, 1000.1, 99999.9):
+        for item in switches:
+            assert 30 <= scheduler.delay(item, now, 60) < 90
+
+
+def test_scheduler_delay_unknown():
+    # Ensure a switch that is not registered waits its interval
+    scheduler = Hp1820Scheduler()
+    assert scheduler.delay(coordinator(), 1000, 60) == 60
+
+
+def test_scheduler_schedule():
+    # Ensure the schedule reports the refreshes scheduled by the coordinators
+    scheduler = Hp1820Scheduler()
+    first, second, third = coordinator(60, 1080), coordinator(120, 1005), coordinator(60)
+    scheduler.register("first", first)
+    scheduler.register("second", second)
+    scheduler.register("third", third)
+    assert scheduler.schedule(1010) == [
+        {"entry_id": "second", "phase": 1 / 3, "interval": 120, "next_refresh": 0},
+        {"entry_id": "first", "phase": 0, "interval": 60, "next_refresh": 70},
+        {"entry_id": "third", "phase": 2 / 3, "interval": 60, "next_refresh": None},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limiter():
+    # Ensure concurrent polls are capped
+    scheduler = Hp1820Scheduler(max_concurrent=2)
+    running = []
+    peak = []
+
+    async def poll():
+        async with scheduler.limiter:
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+
+    await asyncio.gather(*(poll() for _ in range(5)))
+    assert max(peak) == 2
@@ -0,0 +1,211 @@
+from datetime import datetime, timezone
+
+import pytest
+from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.const import EntityCategory
+
+from custom_components.hp1820.const import DOMAIN
+from custom_components.hp1820.sensor import (
+    BUDGET_SENSORS,
+    PORT_POWER_SENSORS,
+    SENSORS,
+    BudgetSensor,
+    LastConfirmedSensor,
+    MetricSensor,
+    PortPowerSensor,
+    async_setup_entry,
+)
+
+from .helpers import power_status
+
+
+def _sensor(hass, config_entry, coordinator, device, key):
+    description = next(description for description in SENSORS if description.key == key)
+    return MetricSensor(hass, f"test_id_{key}", config_entry, description, coordinator, device)
+
+
+@pytest.mark.asyncio
+async def test_async_setup_entry(hass, config_entry, device, coordinator):
+    # Ensure a sensor is created for each metric
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+
+    device.power = power_status({"1": 4.2, "2": None})
+
+    sensors = []
+    # Test
+    await async_setup_entry(hass, config_entry, sensors.extend)
+    assert len([sensor for sensor in sensors if isinstance(sensor, MetricSensor)]) == len(SENSORS)
+    assert len([sensor for sensor in sensors if isinstance(sensor, BudgetSensor)]) == 3
+    assert len([sensor for sensor in sensors if isinstance(sensor, LastConfirmedSensor)]) == 1
+    assert len([sensor for sensor in sensors if isinstance(sensor, PortPowerSensor)]) == 6
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_async_setup_entry_without_power(hass, config_entry, device, coordinator):
+    # Ensure port power sensors are created only once the PoE status page is read
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+
+    sensors = []
+    await async_setup_entry(hass, config_entry, sensors.extend)
+    assert [sensor for sensor in sensors if isinstance(sensor, PortPowerSensor)] == []
+    # Test
+    device.power = power_status({"1": 4.2})
+    coordinator.async_update_listeners()
+    assert [sensor._port_id for sensor in sensors if isinstance(sensor, PortPowerSensor)] == ["1", "1", "1"]
+    await coordinator.async_shutdown()
+
+
+def _power_sensor(hass, config_entry, coordinator, device, port_id, key):
+    description = next(description for description in PORT_POWER_SENSORS if description.key == key)
+    return PortPowerSensor(hass, f"test_id_{key}", port_id, config_entry, description, coordinator, device)
+
+
+def _budget_sensor(hass, config_entry, coordinator, device, key):
+    description = next(description for description in BUDGET_SENSORS if description.key == key)
+    return BudgetSensor(hass, f"test_id_{key}", config_entry, description, coordinator, device)
+
+
+class TestMetricSensor:
+    def test_sensor_name(self, hass, config_entry, coordinator, device):
+        # Ensure the sensor has the right name
+        entity = _sensor(hass, config_entry, coordinator, device, "poll_time")
+        assert entity.name == "Poll time"
+
+    def test_sensor_entity_id(self, hass, config_entry, coordinator, device):
+        # Ensure the sensor has a valid Entity ID
+        entity = _sensor(hass, config_entry, coordinator, device, "poll_time")
+        assert entity.entity_id == "hp1820.test_ip_poll_time"
+
+    def test_sensor_unique_id(self, hass, config_entry, coordinator, device):
+        # Ensure the sensor has the right unique ID
+        entity = _sensor(hass, config_entry, coordinator, device, "poll_time")
+        assert entity.unique_id == "test_id_poll_time"
+
+    def test_sensor_diagnostic(self, hass, config_entry, coordinator, device):
+        # Ensure metrics are diagnostic entities of the switch device
+        entity = _sensor(hass, config_entry, coordinator, device, "retries")
+        assert entity.entity_category is EntityCategory.DIAGNOSTIC
+        assert entity.device_info["identifiers"] == {(DOMAIN, "test_entry_id")}
+
+    def test_sensor_enabled_default(self, hass, config_entry, coordinator, device):
+        # Ensure only the poll time is enabled by default
+        enabled = [description.key for description in SENSORS if description.entity_registry_enabled_default]
+        assert enabled == ["poll_time"]
+
+    def test_sensor_available(self, hass, config_entry, coordinator, device):
+        # Ensure metrics are available while the switch is unreachable
+        coordinator.last_update_success = False
+        entity = _sensor(hass, config_entry, coordinator, device, "poll_failures")
+        assert entity.available is True
+
+    def test_sensor_latency_empty(self, hass, config_entry, coordinator, device):
+        # Ensure latencies are unknown until measured
+        entity = _sensor(hass, config_entry, coordinator, device, "login_time")
+        assert entity.native_value is None
+        assert entity.extra_state_attributes == {"p95": None, "p99": None, "last": None, "samples": 0}
+
+    def test_sensor_latency(self, hass, config_entry, coordinator, device):
+        # Ensure latencies are reported in milliseconds, with the median as state
+        for seconds in [0.1, 0.2, 0.3, 0.4]:
+            device.metrics.observe("fetch", seconds)
+        entity = _sensor(hass, config_entry, coordinator, device, "fetch_time")
+        assert entity.native_value == 200.0
+        assert entity.extra_state_attributes == {"p95": 400.0, "p99": 400.0, "last": 400.0, "samples": 4}
+
+    def test_sensor_counter(self, hass, config_entry, coordinator, device):
+        # Ensure counters are reported as they are
+        device.metrics.increment("logins", 3)
+        entity = _sensor(hass, config_entry, coordinator, device, "logins")
+        assert entity.native_value == 3
+        assert entity.extra_state_attributes is None
+
+    def test_sensor_requests_per_poll(self, hass, config_entry, coordinator, device):
+        # Ensure requests per poll are reported with their percentiles
+        for requests in [1, 1, 3]:
+            device.metrics.requests_per_poll.add(requests)
+        entity = _sensor(hass, config_entry, coordinator, device, "requests_per_poll")
+        assert entity.native_value == 1
+        assert entity.extra_state_attributes == {"p95": 3, "last": 3, "samples": 3}
+
+
+class TestLastConfirmedSensor:
+    def test_sensor_value(self, hass, config_entry, coordinator, device):
+        # Ensure the sensor reports when the switch last answered, also while it is unreachable
+        entity = LastConfirmedSensor(hass, "test_id", config_entry, coordinator, device)
+        assert entity.entity_id == "hp1820.test_ip_last_confirmed"
+        assert entity.native_value is None
+        device.last_confirmed = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+        coordinator.last_update_success = False
+        assert entity.available is True
+        assert entity.native_value == datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+        assert entity.device_class is SensorDeviceClass.TIMESTAMP
+        assert entity.entity_category is EntityCategory.DIAGNOSTIC
+
+
+class TestPortPowerSensor:
+    def test_sensor_name(self, hass, config_entry, coordinator, device):
+        # Ensure the sensor is named after the port
+        entity = _power_sensor(hass, config_entry, coordinator, device, "1", "power")
+        assert entity.name == "01 power"
+        assert entity.entity_id == "hp1820.test_ip_01_power"
+
+    def test_sensor_enabled_default(self, hass, config_entry, coordinator, device):
+        # Ensure only the power is enabled by default
+        power = _power_sensor(hass, config_entry, coordinator, device, "1", "power")
+        current = _power_sensor(hass, config_entry, coordinator, device, "1", "current")
+        voltage = _power_sensor(hass, config_entry, coordinator, device, "1", "voltage")
+        assert power.entity_registry_enabled_default is True
+        assert current.entity_registry_enabled_default is False
+        assert voltage.entity_registry_enabled_default is False
+
+    def test_sensor_value(self, hass, config_entry, coordinator, device):
+        # Ensure the readings of the port are reported
+        device.power = power_status({"1": 5.35, "2": None})
+        assert _power_sensor(hass, config_entry, coordinator, device, "1", "power").native_value == 5.35
+        assert _power_sensor(hass, config_entry, coordinator, device, "1", "current").native_value == 100.0
+        assert _power_sensor(hass, config_entry, coordinator, device, "1", "voltage").native_value == 53.5
+        assert _power_sensor(hass, config_entry, coordinator, device, "2", "power").native_value is None
+
+    def test_sensor_unavailable_without_power(self, hass, config_entry, coordinator, device):
+        # Ensure the sensor is unavailable if the switch doesn't report power
+        entity = _power_sensor(hass, config_entry, coordinator, device, "1", "power")
+        assert entity.available is False
+        assert entity.native_value is None
+
+    def test_sensor_unavailable_unknown_port(self, hass, config_entry, coordinator, device):
+        # Ensure the sensor is unavailable if the port is missing from the status page
+        device.power = power_status({"2": 4.2})
+        entity = _power_sensor(hass, config_entry, coordinator, device, "1", "power")
+        assert entity.available is False
+
+
+class TestBudgetSensor:
+    def test_sensor_value(self, hass, config_entry, coordinator, device):
+        # Ensure the budget of the switch is reported
+        device.power = power_status({"1": 5.4, "2": 10.2}, budget=65.0)
+        assert _budget_sensor(hass, config_entry, coordinator, device, "poe_budget").native_value == 65.0
+        assert _budget_sensor(hass, config_entry, coordinator, device, "poe_consumed").native_value == 15.6
+        assert _budget_sensor(hass, config_entry, coordinator, device, "poe_remaining").native_value == 49.4
+
+    def test_sensor_entity_id(self, hass, config_entry, coordinator, device):
+        # Ensure the sensor has a valid Entity ID
+        entity = _budget_sensor(hass, config_entry, coordinator, device, "poe_budget")
+        assert entity.name == "PoE budget"
+        assert entity.entity_id == "hp1820.test_ip_poe_budget"
+
+    def test_sensor_unknown_budget(self, hass, config_entry, coordinator, device):
+        # Ensure the remaining power is unknown without a budget
+        device.power = power_status({"1": 5.4})
+        assert _budget_sensor(hass, config_entry, coordinator, device, "poe_remaining").native_value is None
+
+    def test_sensor_unavailable_without_power(self, hass, config_entry, coordinator, device):
+        # Ensure the sensor is unavailable if the switch doesn't report power
+        entity = _budget_sensor(hass, config_entry, coordinator, device, "poe_budget")
+        assert entity.available is False
@@ -1,7 +1,16 @@
+import pytest
+import voluptuous as vol
 from homeassistant.core import ServiceCall
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import device_registry as dr
 
 from custom_components.hp1820 import services
-from custom_components.hp1820.const import DOMAIN
+from custom_components.hp1820.backend import PartialWriteError
+from custom_components.hp1820.const import DOMAIN, KEY_SNAPSHOTS
+from custom_components.hp1820.store import Hp1820SnapshotStore
+
+from .hass.fixtures import MockConfigEntry
+from .helpers import _, admin_modes, poe_ports
 
 
 async def test_service_update_state(hass, config_entry, device, coordinator):
@@ -16,6 +25,254 @@ async def test_service_update_state(hass, config_entry, device, coordinator):
         data={},
     )
 
-    await services.update_state(hass, config_entry.entry_id, call)
+    device._groups["ports"].refreshed(0)
+    await services.update_state(hass, call)
     assert device.update.call_count == 1
+    assert device._groups["ports"].last_refresh is None
     assert device.update.call_args == ()
+
+
+async def test_service_set_ports(hass, config_entry, device, coordinator):
+    # Ensure `set_ports` updates all the ports with a single request
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+    call = ServiceCall(
+        domain=DOMAIN,
+        service="set_ports",
+        data=services.SET_PORTS_SCHEMA({"ports": [1, "2"], "state": "off"}),
+    )
+
+    await services.set_ports(hass, call)
+    assert device._client.set_ports_state.call_count == 1
+    assert device._client.set_ports_state.call_args.args[0] == {"1": False, "2": False}
+    assert admin_modes(device.ports) == {"1": False, "2": False}
+
+
+async def test_service_set_ports_with_error(hass, config_entry, device, coordinator, mocker):
+    # Ensure `set_ports` notifies the user if the request fails
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+    device._client.set_ports_state.side_effect = Exception("Unexpected error")
+    m_notify = mocker.patch(_("services.persistent_notification.async_create"))
+    call = ServiceCall(
+        domain=DOMAIN,
+        service="set_ports",
+        data=services.SET_PORTS_SCHEMA({"ports": ["1", "2"], "state": True}),
+    )
+
+    await services.set_ports(hass, call)
+    assert admin_modes(device.ports) == {"1": True, "2": False}
+    assert m_notify.call_count == 1
+
+
+async def test_service_apply_config(hass, config_entry, device, coordinator):
+    # Ensure `apply_config` writes only the ports that need it and reports them
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+    call = ServiceCall(
+        domain=DOMAIN,
+        service="apply_config",
+        data=services.APPLY_CONFIG_SCHEMA({"admin_mode": "on", "priority": "low"}),
+    )
+
+    response = await services.apply_config(hass, call)
+    assert response == {"success": True, "ports": ["2"]}
+    assert device._client.set_ports_config.call_count == 1
+    assert admin_modes(device.ports) == {"1": True, "2": True}
+
+
+async def test_service_apply_config_with_error(hass, config_entry, device, coordinator, mocker):
+    # Ensure `apply_config` notifies the user if the request fails
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+    device._client.set_ports_config.side_effect = Exception("Unexpected error")
+    m_notify = mocker.patch(_("services.persistent_notification.async_create"))
+    call = ServiceCall(
+        domain=DOMAIN,
+        service="apply_config",
+        data=services.APPLY_CONFIG_SCHEMA({"ports": [2], "schedule": 1}),
+    )
+
+    response = await services.apply_config(hass, call)
+    assert response == {"success": False, "ports": []}
+    assert m_notify.call_count == 1
+
+
+async def test_service_apply_config_partial_error(hass, config_entry, device, coordinator, mocker):
+    # Ensure `apply_config` reports the ports written before an error, and updates their entities
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+    device._client.set_ports_config.side_effect = PartialWriteError(["1"], "Unable to write ports ['2']")
+    m_notify = mocker.patch(_("services.persistent_notification.async_create"))
+    m_update = mocker.patch.object(coordinator, "async_set_updated_data")
+    call = ServiceCall(
+        domain=DOMAIN,
+        service="apply_config",
+        data=services.APPLY_CONFIG_SCHEMA({"priority": "critical"}),
+    )
+
+    response = await services.apply_config(hass, call)
+    assert response == {"success": False, "ports": ["1"]}
+    assert m_notify.call_count == 1
+    assert m_update.call_count == 1
+
+
+def test_service_apply_config_schema():
+    # Ensure at least a setting is required, and only values of the configuration form are accepted
+    with pytest.raises(vol.Invalid):
+        services.APPLY_CONFIG_SCHEMA({"ports": ["1"]})
+    with pytest.raises(vol.Invalid):
+        services.APPLY_CONFIG_SCHEMA({"priority": "highest"})
+    assert services.APPLY_CONFIG_SCHEMA({"schedule": 1, "power_limit": "15.4"}) == {
+        "schedule": "1",
+        "power_limit": 15.4,
+    }
+
+
+async def test_service_save_and_restore_snapshot(hass, config_entry, device, coordinator):
+    # Ensure a snapshot is read from the switch, and restored with the ports that changed since
+    hass.data[DOMAIN][KEY_SNAPSHOTS] = Hp1820SnapshotStore(hass)
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+    save = ServiceCall(domain=DOMAIN, service="save_snapshot", data=services.SAVE_SNAPSHOT_SCHEMA({"name": "before"}))
+    restore = ServiceCall(
+        domain=DOMAIN, service="restore_snapshot", data=services.RESTORE_SNAPSHOT_SCHEMA({"name": "before"})
+    )
+
+    response = await services.save_snapshot(hass, save)
+    assert response["success"] is True
+    assert response["ports"] == ["1", "2"]
+    assert device.update.call_count == 1
+    device._ports = poe_ports({"1": False, "2": False})
+    response = await services.restore_snapshot(hass, restore)
+    assert response == {"success": True, "ports": ["1"]}
+    assert device._client.set_ports_config.call_count == 1
+    assert admin_modes(device.ports) == {"1": True, "2": False}
+
+
+async def test_service_save_snapshot_with_error(hass, config_entry, device, coordinator):
+    # Ensure no snapshot is saved if the switch can't be read
+    hass.data[DOMAIN][KEY_SNAPSHOTS] = Hp1820SnapshotStore(hass)
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+    device.update.side_effect = Exception("Unexpected error")
+    call = ServiceCall(domain=DOMAIN, service="save_snapshot", data=services.SAVE_SNAPSHOT_SCHEMA({"name": "before"}))
+
+    response = await services.save_snapshot(hass, call)
+    assert response == {"success": False, "ports": []}
+    assert await hass.data[DOMAIN][KEY_SNAPSHOTS].async_get("before") is None
+
+
+async def test_service_restore_snapshot_missing(hass, config_entry, device, coordinator):
+    # Ensure restoring a missing snapshot raises an error
+    hass.data[DOMAIN][KEY_SNAPSHOTS] = Hp1820SnapshotStore(hass)
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+    call = ServiceCall(
+        domain=DOMAIN, service="restore_snapshot", data=services.RESTORE_SNAPSHOT_SCHEMA({"name": "missing"})
+    )
+
+    with pytest.raises(ValueError):
+        await services.restore_snapshot(hass, call)
+    assert device._client.set_ports_config.call_count == 0
+
+
+async def test_service_power_cycle(hass, config_entry, device, coordinator):
+    # Ensure `power_cycle` turns the ports off and on, and reports each of them
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+    call = ServiceCall(
+        domain=DOMAIN,
+        service="power_cycle",
+        data=services.POWER_CYCLE_SCHEMA({"ports": [1, 2], "off_time": 0}),
+    )
+
+    response = await services.power_cycle(hass, call)
+    assert response["success"] is True
+    assert response["ports"]["1"]["status"] == "cycled"
+    assert response["ports"]["2"]["status"] == "skipped"
+    assert device._client.set_poe_state.call_count == 2
+    assert admin_modes(device.ports) == {"1": True, "2": False}
+
+
+async def test_service_power_cycle_with_error(hass, config_entry, device, coordinator, mocker):
+    # Ensure `power_cycle` notifies the user if a write fails
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": device,
+        "coordinator": coordinator,
+    }
+    device._client.set_poe_state.side_effect = Exception("Unexpected error")
+    m_notify = mocker.patch(_("services.persistent_notification.async_create"))
+    call = ServiceCall(
+        domain=DOMAIN,
+        service="power_cycle",
+        data=services.POWER_CYCLE_SCHEMA({"ports": ["1"], "off_time": 0}),
+    )
+
+    response = await services.power_cycle(hass, call)
+    assert response["success"] is False
+    assert response["ports"]["1"]["status"] == "failed"
+    assert m_notify.call_count == 1
+
+
+def _target_call(**data):
+    return ServiceCall(
+        domain=DOMAIN, service="save_snapshot", data=services.SAVE_SNAPSHOT_SCHEMA({"name": "a", **data})
+    )
+
+
+def test_service_target_single_switch(hass, config_entry):
+    # Ensure the switch can be omitted if a single one is set up
+    assert services.target_entry_id(hass, _target_call()) == "test_entry_id"
+
+
+def test_service_target_many_switches(hass, config_entry):
+    # Ensure each call selects its switch when many are set up
+    other = MockConfigEntry(domain=DOMAIN, entry_id="other_entry_id", data={"system_ip": "other_ip"})
+    other.add_to_hass(hass)
+    hass.data[DOMAIN]["other_entry_id"] = {}
+    device = dr.async_get(hass).async_get_or_create(
+        config_entry_id="other_entry_id", identifiers={(DOMAIN, "other_entry_id")}
+    )
+    # Test
+    assert services.target_entry_id(hass, _target_call(config_entry_id="test_entry_id")) == "test_entry_id"
+    assert services.target_entry_id(hass, _target_call(device_id=device.id)) == "other_entry_id"
+    with pytest.raises(ServiceValidationError) as err:
+        services.target_entry_id(hass, _target_call())
+    assert err.value.translation_key == "many_switches"
+
+
+def test_service_target_not_loaded(hass, config_entry):
+    # Ensure calls to a switch that is not set up fail with a clear error
+    del hass.data[DOMAIN]["test_entry_id"]
+    with pytest.raises(ServiceValidationError) as err:
+        services.target_entry_id(hass, _target_call())
+    assert err.value.translation_key == "switch_not_loaded"
+    with pytest.raises(ServiceValidationError):
+        services.target_entry_id(hass, _target_call(config_entry_id="test_entry_id"))
+    with pytest.raises(ServiceValidationError):
+        services.target_entry_id(hass, _target_call(device_id="missing"))
+
+
+def test_service_target_exclusive():
+    # Ensure a call can't select the switch in both ways
+    with pytest.raises(vol.Invalid):
+        services.SAVE_SNAPSHOT_SCHEMA({"name": "a", "device_id": "1", "config_entry_id": "2"})
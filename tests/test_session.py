@@ -0,0 +1,198 @@
+import asyncio
+
+import pytest
+from aiohttp.client_exceptions import ClientConnectionError, ClientResponseError
+from aiohttp.client_reqrep import RequestInfo
+
+from custom_components.hp1820.client import SessionExpiredError
+from custom_components.hp1820.session import Hp1820Session
+
+
+def session_expired_error():
+    return SessionExpiredError(RequestInfo("", "GET", {}), (), status=401)
+
+
+def test_session_constructor(client):
+    # Ensure that the session is initialized correctly
+    session = Hp1820Session(client, "test_user", "test_password", 42)
+    assert session._client == client
+    assert session._idle_timeout == 42
+    assert session.authenticated is False
+
+
+@pytest.mark.asyncio
+async def test_session_call_login_once(client):
+    # Ensure the login is performed only for the first call
+    session = Hp1820Session(client, "test_user", "test_password")
+    client.get_poe_state.return_value = {"1": True}
+    # Test
+    assert await session.call(client.get_poe_state) == {"1": True}
+    assert await session.call(client.get_poe_state) == {"1": True}
+    assert client.login.call_count == 1
+    assert client.login.call_args.args == ("test_user", "test_password")
+    assert client.logout.call_count == 0
+    assert session.authenticated is True
+
+
+@pytest.mark.asyncio
+async def test_session_call_forwards_arguments(client):
+    # Ensure arguments are forwarded to the operation
+    session = Hp1820Session(client, "test_user", "test_password")
+    # Test
+    await session.call(client.set_poe_state, "1", False)
+    assert client.set_poe_state.call_args.args == ("1", False)
+
+
+@pytest.mark.asyncio
+async def test_session_call_expired(client):
+    # Ensure an expired session is established again and the operation retried
+    session = Hp1820Session(client, "test_user", "test_password")
+    client.get_poe_state.side_effect = [{"1": True}, session_expired_error(), {"1": False}]
+    # Test
+    await session.call(client.get_poe_state)
+    assert await session.call(client.get_poe_state) == {"1": False}
+    assert client.login.call_count == 2
+    assert client.get_poe_state.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_session_call_expired_twice(client):
+    # Ensure the operation is retried only once
+    session = Hp1820Session(client, "test_user", "test_password")
+    client.get_poe_state.side_effect = session_expired_error()
+    # Test
+    with pytest.raises(SessionExpiredError):
+        await session.call(client.get_poe_state)
+    assert client.login.call_count == 2
+    assert client.get_poe_state.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_session_call_login_error(client, client_response_error):
+    # Ensure login errors are not swallowed and the operation is not called
+    session = Hp1820Session(client, "test_user", "test_password")
+    client.login.side_effect = client_response_error(401)
+    # Test
+    with pytest.raises(ClientResponseError):
+        await session.call(client.get_poe_state)
+    assert session.authenticated is False
+    assert client.get_poe_state.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_session_close(client):
+    # Ensure close logs out an active session
+    session = Hp1820Session(client, "test_user", "test_password")
+    await session.call(client.get_poe_state)
+    # Test
+    await session.close()
+    assert client.logout.call_count == 1
+    assert session.authenticated is False
+
+
+@pytest.mark.asyncio
+async def test_session_close_without_login(client):
+    # Ensure close doesn't log out if there is no active session
+    session = Hp1820Session(client, "test_user", "test_password")
+    # Test
+    await session.close()
+    assert client.logout.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_session_close_error(client, client_response_error):
+    # Ensure logout errors are not swallowed, but the session is dropped
+    session = Hp1820Session(client, "test_user", "test_password")
+    client.logout = client_response_error(500)
+    await session.call(client.get_poe_state)
+    # Test
+    with pytest.raises(ClientResponseError):
+        await session.close()
+    assert session.authenticated is False
+
+
+@pytest.mark.asyncio
+async def test_session_idle_timeout(client):
+    # Ensure an unused session is closed after the idle timeout
+    session = Hp1820Session(client, "test_user", "test_password", 0.01)
+    await session.call(client.get_poe_state)
+    # Test
+    await asyncio.sleep(0.05)
+    assert client.logout.call_count == 1
+    assert session.authenticated is False
+
+
+@pytest.mark.asyncio
+async def test_session_idle_timeout_unreachable(client):
+    # Ensure the idle session is dropped even if the switch can't be reached to log out
+    client.logout.side_effect = ClientConnectionError()
+    session = Hp1820Session(client, "test_user", "test_password", 0.01)
+    await session.call(client.get_poe_state)
+    # Test
+    await asyncio.sleep(0.05)
+    assert client.logout.call_count == 1
+    assert session.authenticated is False
+
+
+@pytest.mark.asyncio
+async def test_session_idle_timeout_reset(client):
+    # Ensure the idle timeout is reset by every operation
+    session = Hp1820Session(client, "test_user", "test_password", 0.05)
+    await session.call(client.get_poe_state)
+    await asyncio.sleep(0.03)
+    await session.call(client.get_poe_state)
+    await asyncio.sleep(0.03)
+    # Test
+    assert client.logout.call_count == 0
+    assert session.authenticated is True
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_session_idle_timeout_disabled(client):
+    # Ensure the session is kept open without an idle timeout
+    session = Hp1820Session(client, "test_user", "test_password")
+    await session.call(client.get_poe_state)
+    # Test
+    assert session._idle_handle is None
+    assert client.logout.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_session_set_idle_timeout(client):
+    # Ensure a changed idle timeout applies to the open session
+    session = Hp1820Session(client, "test_user", "test_password")
+    await session.call(client.get_poe_state)
+    # Test
+    session.set_idle_timeout(0.01)
+    await asyncio.sleep(0.05)
+    assert client.logout.call_count == 1
+    assert session.authenticated is False
+
+
+@pytest.mark.asyncio
+async def test_session_set_idle_timeout_disabled(client):
+    # Ensure disabling the idle timeout keeps the open session
+    session = Hp1820Session(client, "test_user", "test_password", 0.01)
+    await session.call(client.get_poe_state)
+    # Test
+    session.set_idle_timeout(0)
+    await asyncio.sleep(0.05)
+    assert session._idle_handle is None
+    assert client.logout.call_count == 0
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_session_call_concurrent(client):
+    # Ensure concurrent calls share the same login
+    session = Hp1820Session(client, "test_user", "test_password")
+
+    async def slow_login(*args):
+        await asyncio.sleep(0.01)
+
+    client.login.side_effect = slow_login
+    # Test
+    await asyncio.gather(session.call(client.get_poe_state), session.call(client.get_poe_state))
+    assert client.login.call_count == 1
+    assert client.get_poe_state.call_count == 2
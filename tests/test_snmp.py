@@ -0,0 +1,188 @@
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.hp1820.backend import PartialWriteError
+from custom_components.hp1820.models import (
+    AdminMode,
+    FaultStatus,
+    PoePortState,
+    PoeStatus,
+    Priority,
+)
+from custom_components.hp1820.snmp import (
+    PSE_PORT_DETECTION_STATUS,
+    PSE_PORT_POWER_PRIORITY,
+    Hp1820SnmpClient,
+    SnmpError,
+)
+
+from .snmp_agent import SnmpAgent, SnmpResponder
+
+
+@pytest.fixture
+def agent():
+    return SnmpAgent(ports=8)
+
+
+@pytest.fixture
+def snmp_client(agent):
+    client = Hp1820SnmpClient("127.0.0.1", "private")
+    agent.attach(client)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_snmp_get_poe_state(agent, snmp_client):
+    # Ensure the port table is read with a single GETBULK
+    agent.objects[f"{PSE_PORT_DETECTION_STATUS}.1.2"] = 4
+    agent.objects[f"{PSE_PORT_POWER_PRIORITY}.1.3"] = 1
+    ports = await snmp_client.get_poe_state()
+    assert list(ports) == [str(port) for port in range(1, 9)]
+    assert ports["1"] == PoePortState(
+        "1", AdminMode.ENABLED, Priority.LOW, status=PoeStatus.DELIVERING, fault_status=FaultStatus.NO_ERROR
+    )
+    assert ports["2"].status is PoeStatus.FAULT
+    assert ports["2"].fault_status is FaultStatus.UNKNOWN
+    assert ports["3"].priority is Priority.CRITICAL
+    assert agent.requests == ["GETBULK"]
+    assert snmp_client.metrics.latencies["fetch"].last is not None
+
+
+@pytest.mark.asyncio
+async def test_snmp_get_poe_state_many_requests(snmp_client):
+    # Ensure columns are walked across many GETBULK when the table doesn't fit a response
+    agent = SnmpAgent(ports=48, max_repetitions=10)
+    agent.attach(snmp_client)
+    ports = await snmp_client.get_poe_state()
+    assert len(ports) == 48
+    assert agent.requests == ["GETBULK"] * 5
+
+
+@pytest.mark.asyncio
+async def test_snmp_get_poe_power(agent, snmp_client):
+    # Ensure the budget and the consumed power of the switch are read
+    agent.objects["1.3.6.1.2.1.105.1.3.1.1.4.1"] = 12
+    power = await snmp_client.get_poe_power()
+    assert power.budget == 65.0
+    assert power.consumed == 12.0
+    assert power.ports == {}
+
+
+@pytest.mark.asyncio
+async def test_snmp_get_poe_power_missing(snmp_client):
+    # Ensure a switch without the PSE table doesn't report power
+    agent = SnmpAgent(ports=8)
+    agent.objects = {oid: value for oid, value in agent.objects.items() if not oid.startswith("1.3.6.1.2.1.105.1.3")}
+    agent.attach(snmp_client)
+    with pytest.raises(ValueError):
+        await snmp_client.get_poe_power()
+
+
+@pytest.mark.asyncio
+async def test_snmp_set_ports_state(agent, snmp_client):
+    # Ensure many ports are written with a single SET
+    await snmp_client.set_ports_state({"1": False, "2": False, "5": False})
+    ports = await snmp_client.get_poe_state()
+    assert [port for port, state in ports.items() if not state.enabled] == ["1", "2", "5"]
+    assert ports["1"].status is PoeStatus.DISABLED
+    assert agent.requests == ["SET", "GETBULK"]
+
+
+@pytest.mark.asyncio
+async def test_snmp_set_ports_config(agent, snmp_client):
+    # Ensure the admin mode and the priority are written, as other settings are not in the MIB
+    config = PoePortState("1", AdminMode.DISABLED, Priority.HIGH).to_config()
+    await snmp_client.set_ports_config({"1": config, "2": config})
+    ports = await snmp_client.get_poe_state()
+    assert ports["1"].admin_mode is AdminMode.DISABLED
+    assert ports["2"].priority is Priority.HIGH
+    assert ports["3"].priority is Priority.LOW
+
+
+@pytest.mark.asyncio
+async def test_snmp_set_partial_error(agent, snmp_client):
+    # Ensure the ports of the SET requests sent before an error are reported
+    config = PoePortState("1", AdminMode.DISABLED, Priority.HIGH).to_config()
+    configs = {str(port): config for port in range(1, 9)}
+    with patch("custom_components.hp1820.snmp.SNMP_SET_CHUNK", 5):
+        with pytest.raises(PartialWriteError) as err:
+            await snmp_client.set_ports_config({**configs, "9": config})
+    # A port is written only once all of its objects are
+    assert err.value.written == ["1", "2", "3", "4", "5", "6", "7"]
+    assert agent.requests == ["SET", "SET", "SET", "SET"]
+
+
+@pytest.mark.asyncio
+async def test_snmp_set_unknown_port(snmp_client):
+    # Ensure errors of the agent are raised
+    with pytest.raises(SnmpError):
+        await snmp_client.set_ports_state({"9": True})
+
+
+@pytest.mark.asyncio
+async def test_snmp_unreachable(agent, snmp_client):
+    # Ensure an unreachable agent raises an error
+    agent.community_valid = False
+    with pytest.raises(SnmpError):
+        await snmp_client.get_poe_state()
+
+
+@pytest.mark.asyncio
+async def test_snmp_session_noop(agent, snmp_client):
+    # Ensure SNMP doesn't need a session
+    await snmp_client.login("admin", "password")
+    await snmp_client.logout()
+    assert agent.requests == []
+
+
+@pytest.fixture
+def responder(socket_enabled):
+    # Tests against the responder exercise pysnmp, which is an optional dependency
+    pytest.importorskip("pysnmp.hlapi.asyncio")
+    m_responder = SnmpResponder(SnmpAgent(ports=8), "private")
+    yield m_responder
+    m_responder.close()
+
+
+@pytest.fixture
+async def udp_client(responder):
+    m_client = Hp1820SnmpClient("127.0.0.1", "private", responder.port)
+    yield m_client
+    await m_client.logout()
+
+
+@pytest.mark.asyncio
+async def test_snmp_responder_read(responder, udp_client):
+    # Ensure the port table and the budget are read over UDP with the requests built by pysnmp
+    responder.agent.objects[f"{PSE_PORT_POWER_PRIORITY}.1.3"] = 1
+    ports = await udp_client.get_poe_state()
+    power = await udp_client.get_poe_power()
+    assert list(ports) == [str(port) for port in range(1, 9)]
+    assert ports["1"].status is PoeStatus.DELIVERING
+    assert ports["3"].priority is Priority.CRITICAL
+    assert power.budget == 65.0
+
+
+@pytest.mark.asyncio
+async def test_snmp_responder_write(responder, udp_client):
+    # Ensure writes are sent with SET requests split in chunks
+    config = PoePortState("1", AdminMode.DISABLED, Priority.HIGH).to_config()
+    with patch("custom_components.hp1820.snmp.SNMP_SET_CHUNK", 4):
+        await udp_client.set_ports_config({"1": config, "2": config, "3": config})
+    await udp_client.set_ports_state({"4": False})
+    ports = await udp_client.get_poe_state()
+    assert [port for port, state in ports.items() if not state.enabled] == ["1", "2", "3", "4"]
+    assert ports["2"].priority is Priority.HIGH
+    assert responder.agent.requests == ["SET", "SET", "SET"]
+
+
+@pytest.mark.asyncio
+async def test_snmp_responder_error(responder, udp_client):
+    # Ensure errors reported by the agent are raised, with the ports written before them
+    with pytest.raises(SnmpError):
+        await udp_client.set_ports_state({"9": True})
+    with patch("custom_components.hp1820.snmp.SNMP_SET_CHUNK", 1):
+        with pytest.raises(PartialWriteError) as err:
+            await udp_client.set_ports_state({"1": False, "9": True})
+    assert err.value.written == ["1"]
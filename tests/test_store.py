@@ -0,0 +1,91 @@
+import pytest
+
+from custom_components.hp1820.store import Hp1820SnapshotStore, Hp1820Store
+
+from .helpers import poe_ports
+
+
+@pytest.mark.asyncio
+async def test_store_load_missing(hass):
+    # Ensure nothing is restored without a cache
+    store = Hp1820Store(hass, "test_entry_id")
+    assert await store.async_load() is None
+
+
+@pytest.mark.asyncio
+async def test_store_save_and_load(hass, hass_storage):
+    # Ensure saved ports are restored with all their settings
+    store = Hp1820Store(hass, "test_entry_id")
+    store.async_save(poe_ports({"1": True, "2": False}))
+    await hass.async_stop(force=True)
+    assert hass_storage["hp1820.test_entry_id"]["data"]["ports"]["2"]["admin_mode"] == "disabled"
+    # Test
+    restored = Hp1820Store(hass, "test_entry_id")
+    assert await restored.async_load() == poe_ports({"1": True, "2": False})
+
+
+@pytest.mark.asyncio
+async def test_store_load_invalid(hass, hass_storage):
+    # Ensure an invalid cache is ignored
+    hass_storage["hp1820.test_entry_id"] = {"version": 1, "key": "hp1820.test_entry_id", "data": {"ports": []}}
+    store = Hp1820Store(hass, "test_entry_id")
+    assert await store.async_load() is None
+
+
+@pytest.mark.asyncio
+async def test_store_save_unchanged(hass, mocker):
+    # Ensure unchanged ports are not written again
+    store = Hp1820Store(hass, "test_entry_id")
+    delay_save = mocker.patch.object(store._store, "async_delay_save")
+    store.async_save(poe_ports({"1": True}))
+    store.async_save(poe_ports({"1": True}))
+    assert delay_save.call_count == 1
+    store.async_save(poe_ports({"1": False}))
+    assert delay_save.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_store_remove(hass, hass_storage):
+    # Ensure the cache is removed with the config entry
+    hass_storage["hp1820.test_entry_id"] = {"version": 1, "key": "hp1820.test_entry_id", "data": {"ports": {}}}
+    store = Hp1820Store(hass, "test_entry_id")
+    await store.async_remove()
+    assert "hp1820.test_entry_id" not in hass_storage
+
+
+@pytest.mark.asyncio
+async def test_snapshot_store_set_and_get(hass, hass_storage):
+    # Ensure snapshots are written right away with all the settings of the ports
+    store = Hp1820SnapshotStore(hass)
+    created = await store.async_set("before", poe_ports({"1": True, "2": False}), "192.168.1.2")
+    snapshot = hass_storage["hp1820.snapshots"]["data"]["snapshots"]["before"]
+    assert snapshot["created"] == created
+    assert snapshot["source"] == "192.168.1.2"
+    assert snapshot["ports"]["2"]["admin_mode"] == "disabled"
+    # Test
+    restored = Hp1820SnapshotStore(hass)
+    assert await restored.async_get("before") == poe_ports({"1": True, "2": False})
+
+
+@pytest.mark.asyncio
+async def test_snapshot_store_replace(hass):
+    # Ensure a snapshot replaces the one with the same name, and keeps the others
+    store = Hp1820SnapshotStore(hass)
+    await store.async_set("before", poe_ports({"1": True}), "192.168.1.2")
+    await store.async_set("other", poe_ports({"1": True}), "192.168.1.3")
+    await store.async_set("before", poe_ports({"1": False}), "192.168.1.2")
+    assert await store.async_get("before") == poe_ports({"1": False})
+    assert await store.async_get("other") == poe_ports({"1": True})
+
+
+@pytest.mark.asyncio
+async def test_snapshot_store_get_missing(hass, hass_storage):
+    # Ensure missing or invalid snapshots are not returned
+    hass_storage["hp1820.snapshots"] = {
+        "version": 1,
+        "key": "hp1820.snapshots",
+        "data": {"snapshots": {"invalid": {"ports": []}}},
+    }
+    store = Hp1820SnapshotStore(hass)
+    assert await store.async_get("missing") is None
+    assert await store.async_get("invalid") is None
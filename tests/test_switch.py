@@ -6,6 +6,8 @@ from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from custom_components.hp1820.const import DOMAIN
 from custom_components.hp1820.switch import PoePortSwitch, async_setup_entry
 
+from .helpers import poe_ports
+
 
 @pytest.mark.asyncio
 async def test_async_setup_entry_in_use(hass, config_entry, device, coordinator):
@@ -14,7 +16,7 @@ async def test_async_setup_entry_in_use(hass, config_entry, device, coordinator)
         "device": device,
         "coordinator": coordinator,
     }
-    device._ports = {"1": True, "2": False}
+    device._ports = poe_ports({"1": True, "2": False})
 
     # Test
     def ensure_only_in_use(ports):
@@ -56,6 +58,12 @@ class TestPoePortSwitch:
         entity = PoePortSwitch(hass, "test_id", "1", config_entry, "01", coordinator, device)
         assert entity.unique_id == "test_id"
 
+    def test_switch_coordinator_context(self, hass, config_entry, device):
+        # Ensure the switch listens to updates of its own port
+        coordinator = DataUpdateCoordinator(hass, logging.getLogger(__name__), name="hp1820")
+        entity = PoePortSwitch(hass, "test_id", "2", config_entry, "02", coordinator, device)
+        assert entity.coordinator_context == "2"
+
     def test_switch_icon(self, hass, config_entry, device):
         # Ensure the switch has the right icon
         coordinator = DataUpdateCoordinator(hass, logging.getLogger(__name__), name="hp1820")
@@ -75,6 +83,12 @@ class TestPoePortSwitch:
 
         assert entity.is_on is True
 
+    def test_switch_unavailable_without_port(self, hass, config_entry, device):
+        # Ensure the switch is unavailable once the port is no longer reported
+        coordinator = DataUpdateCoordinator(hass, logging.getLogger(__name__), name="hp1820")
+        entity = PoePortSwitch(hass, "test_id", "3", config_entry, "03", coordinator, device)
+        assert entity.available is False
+
     async def test_switch_async_turn_off(self, hass, config_entry, device):
         # Ensure turn_off executes the command and updates the state
         coordinator = DataUpdateCoordinator(hass, logging.getLogger(__name__), name="hp1820")
@@ -82,9 +96,9 @@ class TestPoePortSwitch:
 
         await entity.async_turn_off()
 
-        assert device._ports["1"] is False
+        assert device.get_port_state("1") is False
         assert device._client.set_poe_state.call_count == 1
-        assert device._client.set_poe_state.call_args.args == ("1", False)
+        assert device._client.set_poe_state.call_args.args[:2] == ("1", False)
 
     async def test_switch_async_turn_off_with_error(self, hass, config_entry, device):
         # Ensure turn_off does not updates the state if error occurs
@@ -94,9 +108,9 @@ class TestPoePortSwitch:
 
         await entity.async_turn_off()
 
-        assert device._ports["1"] is True
+        assert device.get_port_state("1") is True
         assert device._client.set_poe_state.call_count == 1
-        assert device._client.set_poe_state.call_args.args == ("1", False)
+        assert device._client.set_poe_state.call_args.args[:2] == ("1", False)
 
     async def test_switch_async_turn_on(self, hass, config_entry, device):
         # Ensure turn_on executes the command and updates the state
@@ -105,9 +119,10 @@ class TestPoePortSwitch:
 
         await entity.async_turn_on()
 
-        assert device._ports["2"] is True
+        assert device.get_port_state("2") is True
         assert device._client.set_poe_state.call_count == 1
-        assert device._client.set_poe_state.call_args.args == ("2", True)
+        assert device._client.set_poe_state.call_args.args[:2] == ("2", True)
+        assert entity.extra_state_attributes["pending"] is True
 
     async def test_switch_async_turn_on_with_error(self, hass, config_entry, device):
         # Ensure turn_on does not updates the state if error occurs
@@ -117,6 +132,45 @@ class TestPoePortSwitch:
 
         await entity.async_turn_on()
 
-        assert device._ports["2"] is False
+        assert device.get_port_state("2") is False
         assert device._client.set_poe_state.call_count == 1
-        assert device._client.set_poe_state.call_args.args == ("2", True)
+        assert device._client.set_poe_state.call_args.args[:2] == ("2", True)
+
+    def test_switch_attributes(self, hass, config_entry, device):
+        # Ensure the switch exposes the PoE settings and status of the port
+        coordinator = DataUpdateCoordinator(hass, logging.getLogger(__name__), name="hp1820")
+        entity = PoePortSwitch(hass, "test_id", "1", config_entry, "01", coordinator, device)
+        assert entity.extra_state_attributes == {
+            "priority": "low",
+            "schedule": "none",
+            "high_power_mode": "disable",
+            "detect_type": "4pt_dot3af_leg",
+            "limit_type": "dot3af",
+            "poe_status": "delivering",
+            "fault_status": "no_error",
+            "restored": False,
+            "pending": False,
+            "stale": False,
+        }
+
+    def test_switch_attributes_restored(self, hass, config_entry, device):
+        # Ensure the switch reports values restored from the cache
+        coordinator = DataUpdateCoordinator(hass, logging.getLogger(__name__), name="hp1820")
+        entity = PoePortSwitch(hass, "test_id", "1", config_entry, "01", coordinator, device)
+        device.restore(poe_ports({"1": False}))
+        assert entity.is_on is False
+        assert entity.extra_state_attributes["restored"] is True
+
+    def test_switch_attributes_stale(self, hass, config_entry, device):
+        # Ensure the switch reports when its port is the last known one
+        coordinator = DataUpdateCoordinator(hass, logging.getLogger(__name__), name="hp1820")
+        entity = PoePortSwitch(hass, "test_id", "1", config_entry, "01", coordinator, device)
+        device.stale = True
+        assert entity.extra_state_attributes["stale"] is True
+        assert "last_confirmed" not in entity.extra_state_attributes
+
+    def test_switch_device_info(self, hass, config_entry, device):
+        # Ensure ports are grouped in the switch device
+        coordinator = DataUpdateCoordinator(hass, logging.getLogger(__name__), name="hp1820")
+        entity = PoePortSwitch(hass, "test_id", "1", config_entry, "01", coordinator, device)
+        assert entity.device_info["identifiers"] == {(DOMAIN, "test_entry_id")}
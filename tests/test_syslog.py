@@ -0,0 +1,70 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from custom_components.hp1820.syslog import Hp1820SyslogListener
+
+
+@pytest.fixture
+def m_endpoint(hass, mocker):
+    """Replaces the UDP socket, as tests can't open sockets."""
+    transport = Mock()
+    return mocker.patch.object(hass.loop, "create_datagram_endpoint", AsyncMock(return_value=(transport, Mock())))
+
+
+@pytest.mark.asyncio
+async def test_syslog_handle_event(hass, m_endpoint):
+    # Ensure link and PoE events of a registered switch are forwarded without the priority
+    listener = Hp1820SyslogListener(hass, 5514)
+    event = Mock()
+    unregister = await listener.async_register("192.168.1.2", event)
+    # Test
+    listener.handle(b"<190>Jan  1 00:00:00 switch Link Down: 3", "192.168.1.2")
+    assert event.call_count == 1
+    assert event.call_args.args[0] == "Jan  1 00:00:00 switch Link Down: 3"
+    unregister()
+
+
+@pytest.mark.asyncio
+async def test_syslog_handle_ignored(hass, m_endpoint):
+    # Ensure unknown sources and unrelated messages are ignored
+    listener = Hp1820SyslogListener(hass, 5514)
+    event = Mock()
+    unregister = await listener.async_register("192.168.1.2", event)
+    # Test
+    listener.handle(b"<190>Link Down: 3", "192.168.1.3")
+    listener.handle(b"<190>User admin logged in", "192.168.1.2")
+    listener.handle(b"\xff\xfe", "192.168.1.2")
+    assert event.call_count == 0
+    unregister()
+
+
+@pytest.mark.asyncio
+async def test_syslog_shared_socket(hass, m_endpoint):
+    # Ensure a single socket receives the messages of all switches, and closes with the last one
+    listener = Hp1820SyslogListener(hass, 5514)
+    first, second = Mock(), Mock()
+    unregister_first = await listener.async_register("192.168.1.2", first)
+    unregister_second = await listener.async_register("192.168.1.3", second)
+    assert m_endpoint.call_count == 1
+    assert m_endpoint.call_args.kwargs["local_addr"] == ("0.0.0.0", 5514)
+    protocol = m_endpoint.call_args.args[0]()
+    transport = listener._transport
+    # Test
+    protocol.datagram_received(b"<190>POE: port 1 power on", ("192.168.1.2", 514))
+    assert first.call_count == 1
+    assert second.call_count == 0
+    unregister_first()
+    assert transport.close.call_count == 0
+    unregister_second()
+    assert transport.close.call_count == 1
+    assert listener._transport is None
+
+
+@pytest.mark.asyncio
+async def test_syslog_port_unavailable(hass, mocker):
+    # Ensure the registration fails gracefully if the port can't be opened
+    mocker.patch.object(hass.loop, "create_datagram_endpoint", side_effect=OSError("Address already in use"))
+    listener = Hp1820SyslogListener(hass, 514)
+    # Test
+    assert await listener.async_register("192.168.1.2", Mock()) is None
@@ -0,0 +1,115 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from custom_components.hp1820.writer import Hp1820WriteQueue
+
+
+def _written(states):
+    return {port: True for port in states}
+
+
+@pytest.mark.asyncio
+async def test_write_queue_single():
+    # Ensure a single request is written as it is
+    writer = AsyncMock(side_effect=_written)
+    queue = Hp1820WriteQueue(writer, 0)
+    assert await queue.submit({"1": True}) is True
+    assert writer.call_args.args == ({"1": True},)
+    assert queue.pending is False
+
+
+@pytest.mark.asyncio
+async def test_write_queue_coalesce():
+    # Ensure concurrent requests are merged in a single write
+    writer = AsyncMock(side_effect=_written)
+    queue = Hp1820WriteQueue(writer, 0.01)
+    results = await asyncio.gather(
+        queue.submit({"1": True}),
+        queue.submit({"2": False}),
+        queue.submit({"3": True, "1": True}),
+    )
+    assert results == [True, True, True]
+    assert writer.call_count == 1
+    assert writer.call_args.args == ({"1": True, "2": False, "3": True},)
+    assert queue.batches == 1
+    assert queue.coalesced == 2
+
+
+@pytest.mark.asyncio
+async def test_write_queue_conflict():
+    # Ensure a second change of the same port is written after the first one
+    writer = AsyncMock(side_effect=_written)
+    queue = Hp1820WriteQueue(writer, 0.01)
+    await asyncio.gather(
+        queue.submit({"1": False}),
+        queue.submit({"1": True}),
+        queue.submit({"2": True}),
+    )
+    assert [call.args for call in writer.call_args_list] == [({"1": False},), ({"1": True, "2": True},)]
+
+
+@pytest.mark.asyncio
+async def test_write_queue_results():
+    # Ensure each caller gets the result of its own batch
+    writer = AsyncMock(side_effect=[{"1": False}, {"1": True}])
+    queue = Hp1820WriteQueue(writer, 0.01)
+    results = await asyncio.gather(
+        queue.submit({"1": False}),
+        queue.submit({"1": True}),
+    )
+    assert results == [False, True]
+
+
+@pytest.mark.asyncio
+async def test_write_queue_partial_results():
+    # Ensure callers of the same batch get the result of their own ports
+    writer = AsyncMock(return_value={"1": True, "2": False})
+    queue = Hp1820WriteQueue(writer, 0.01)
+    results = await asyncio.gather(
+        queue.submit({"1": True}),
+        queue.submit({"2": True}),
+    )
+    assert results == [True, False]
+    assert writer.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_write_queue_writer_error():
+    # Ensure an unexpected error is reported as a failed write
+    writer = AsyncMock(side_effect=Exception("Unexpected error"))
+    queue = Hp1820WriteQueue(writer, 0)
+    assert await queue.submit({"1": True}) is False
+    assert queue.pending is False
+
+
+@pytest.mark.asyncio
+async def test_write_queue_wait_idle():
+    # Ensure waiters are released only when all batches are written
+    written = []
+
+    async def writer(states):
+        written.append(states)
+        return _written(states)
+
+    queue = Hp1820WriteQueue(writer, 0.01)
+    task = asyncio.ensure_future(queue.submit({"1": True}))
+    await asyncio.sleep(0)
+    assert queue.pending is True
+    await queue.wait_idle()
+    assert written == [{"1": True}]
+    assert await task is True
+
+
+@pytest.mark.asyncio
+async def test_write_queue_cancelled_caller():
+    # Ensure a cancelled caller doesn't cancel the shared write
+    writer = AsyncMock(side_effect=_written)
+    queue = Hp1820WriteQueue(writer, 0.01)
+    cancelled = asyncio.ensure_future(queue.submit({"1": True}))
+    other = asyncio.ensure_future(queue.submit({"2": True}))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    assert await other is True
+    assert writer.call_args.args == ({"1": True, "2": True},)